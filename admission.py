@@ -0,0 +1,136 @@
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Deque, Dict, Optional
+
+
+class LLMBusyError(RuntimeError):
+    """Sem vaga para chamar o LLM dentro do tempo máximo de espera"""
+
+
+class _Waiter:
+    """Pedido de vaga na fila: thread (Event) ou coroutine (future do seu event loop)"""
+    __slots__ = ("granted", "event", "loop", "future")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.granted = False
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AdmissionGate:
+    """
+    Limita as chamadas simultâneas ao LLM, com fila curta e rejeição rápida.
+    Vale para os caminhos sync (threads) e async (event loops): um único
+    contador de vagas em voo, protegido por lock, e uma única fila FIFO.
+    Quem libera uma vaga a entrega direto ao primeiro da fila, então o teto
+    é `max_concurrency` somando todas as threads e loops.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_waiting: int = 32, max_wait: float = 10.0):
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._waiters: Deque[_Waiter] = deque()
+        self._in_flight = 0
+        self._rejected = 0
+
+    def _acquire(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> Optional[_Waiter]:
+        """Vaga na hora (None) ou lugar na fila; fila cheia levanta LLMBusyError"""
+        with self._lock:
+            if self._in_flight < self.max_concurrency and not self._waiters:
+                self._in_flight += 1
+                return None
+            if len(self._waiters) >= self.max_waiting:
+                self._rejected += 1
+                raise LLMBusyError("Fila do LLM cheia")
+            waiter = _Waiter(loop)
+            self._waiters.append(waiter)
+            return waiter
+
+    def _give_up(self, waiter: _Waiter, rejected: bool = True) -> bool:
+        """Fim da espera sem aviso: True se a vaga chegou mesmo assim (corrida com o release)"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            self._rejected += rejected
+            return False
+
+    def _release(self):
+        with self._lock:
+            if not self._waiters:
+                self._in_flight -= 1
+                return
+            # A vaga passa direto ao próximo da fila: _in_flight não muda
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+        waiter.wake()
+
+    def _wait_limit(self, max_wait: Optional[float]) -> float:
+        return self.max_wait if max_wait is None else min(self.max_wait, max_wait)
+
+    @contextmanager
+    def slot(self, max_wait: Optional[float] = None):
+        """Reserva uma vaga (sync) ou levanta LLMBusyError; `max_wait` só encurta a espera"""
+        wait = self._wait_limit(max_wait)
+        waiter = self._acquire()
+        if waiter is not None and not waiter.event.wait(wait) and not self._give_up(waiter):
+            raise LLMBusyError(f"Sem vaga no LLM após {wait:.1f}s")
+        try:
+            yield
+        finally:
+            self._release()
+
+    def try_slot(self) -> Optional[Callable[[], None]]:
+        """Vaga sem espera (sync), para chamadas extras como o hedge; None se não houver vaga livre"""
+        with self._lock:
+            if self._in_flight >= self.max_concurrency or self._waiters:
+                return None
+            self._in_flight += 1
+        return self._release
+
+    @asynccontextmanager
+    async def aslot(self, max_wait: Optional[float] = None):
+        """Reserva uma vaga (async) ou levanta LLMBusyError"""
+        wait = self._wait_limit(max_wait)
+        waiter = self._acquire(asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await asyncio.wait([waiter.future], timeout=wait)
+            except asyncio.CancelledError:
+                # Cancelado na fila: uma vaga que já tenha chegado segue para o próximo
+                if self._give_up(waiter, rejected=False):
+                    self._release()
+                raise
+            if not waiter.granted and not self._give_up(waiter):
+                raise LLMBusyError(f"Sem vaga no LLM após {wait:.1f}s")
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def atry_slot(self) -> Optional[Callable[[], None]]:
+        """Versão async de try_slot"""
+        return self.try_slot()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "llm_in_flight": self._in_flight,
+                "llm_waiting": len(self._waiters),
+                "llm_rejected": self._rejected
+            }
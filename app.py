@@ -1,3 +1,4 @@
+import os
 import sys
 import gradio as gr
 from career_agent import CareerAgent
@@ -10,20 +11,101 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+# Streaming de respostas parciais (CAREER_AGENT_STREAMING=0 volta ao modo bloqueante)
+STREAMING = os.getenv("CAREER_AGENT_STREAMING", "1") != "0"
+
+# Configuração de serviço: fila do Gradio e admissão das chamadas ao LLM
+QUEUE_MAX_SIZE = int(os.getenv("CAREER_AGENT_QUEUE_MAX_SIZE", "256"))
+LLM_CONCURRENCY = int(os.getenv("CAREER_AGENT_LLM_CONCURRENCY", "8"))
+LLM_QUEUE_SIZE = int(os.getenv("CAREER_AGENT_LLM_QUEUE_SIZE", "32"))
+LLM_MAX_WAIT = float(os.getenv("CAREER_AGENT_LLM_MAX_WAIT", "10"))
+# Classificação de intenção em lote (0 desabilita)
+INTENT_BATCH_SIZE = int(os.getenv("CAREER_AGENT_INTENT_BATCH_SIZE", "0"))
+INTENT_BATCH_DELAY = float(os.getenv("CAREER_AGENT_INTENT_BATCH_DELAY", "0.02"))
+# Modelo local de intenções (treino: python intent_model.py train)
+INTENT_MODEL_PATH = os.getenv("CAREER_AGENT_INTENT_MODEL", "/tmp/career_agent_intent_model.npz")
+INTENT_MODEL_THRESHOLD = float(os.getenv("CAREER_AGENT_INTENT_MODEL_THRESHOLD", "0.8"))
+INTENT_LOG_PATH = os.getenv("CAREER_AGENT_INTENT_LOG") or None
+# Banco: efêmero (recriado a cada início) ou persistente com migrações
+DB_PATH = os.getenv("CAREER_AGENT_DB_PATH", "/tmp/career_agent.db")
+PERSISTENT_DB = os.getenv("CAREER_AGENT_DB_MODE", "ephemeral") == "persistent"
+DB_MAX_READERS = int(os.getenv("CAREER_AGENT_DB_MAX_READERS", "8"))
+# Índice colunar em memória (NumPy) para as consultas de vagas por stack
+JOB_INDEX = os.getenv("CAREER_AGENT_JOB_INDEX", "0") == "1"
+# Entradas do cache de resultados de vagas (invalidado quando o banco muda)
+RESULT_CACHE_SIZE = int(os.getenv("CAREER_AGENT_RESULT_CACHE_SIZE", "512"))
+# Índice semântico local (python semantic_search.py build); usado se existir
+SEMANTIC_INDEX_PATH = os.getenv("CAREER_AGENT_SEMANTIC_INDEX", "/tmp/career_agent_semantic")
+# Feeds de vagas sincronizados em segundo plano (URLs separadas por vírgula)
+FEED_URLS = [url.strip() for url in os.getenv("CAREER_AGENT_FEEDS", "").split(",") if url.strip()]
+FEED_SYNC_INTERVAL = float(os.getenv("CAREER_AGENT_FEED_INTERVAL", "300"))
+# Disjuntor do LLM: abre com essa taxa de erro (ou de chamadas mais lentas que
+# SLOW_CALL segundos) e responde só com o fallback local por OPEN_FOR segundos
+LLM_BREAKER_FAILURE_RATE = float(os.getenv("CAREER_AGENT_LLM_BREAKER_FAILURE_RATE", "0.5"))
+LLM_BREAKER_SLOW_CALL = float(os.getenv("CAREER_AGENT_LLM_BREAKER_SLOW_CALL", "10"))
+LLM_BREAKER_OPEN_FOR = float(os.getenv("CAREER_AGENT_LLM_BREAKER_OPEN_FOR", "30"))
+# Hedge do LLM (opt-in): chamada sem resposta no p95 observado ganha uma segunda
+# cópia; no máximo MAX_RATE das chamadas são duplicadas
+LLM_HEDGE = os.getenv("CAREER_AGENT_LLM_HEDGE", "0") == "1"
+LLM_HEDGE_MAX_RATE = float(os.getenv("CAREER_AGENT_LLM_HEDGE_MAX_RATE", "0.05"))
+# Cadeias de modelos por tarefa (separados por vírgula, preferido primeiro);
+# vazio usa as cadeias padrão do CareerAgent
+LLM_CLASSIFY_MODELS = [m.strip() for m in os.getenv("CAREER_AGENT_LLM_CLASSIFY_MODELS", "").split(",") if m.strip()]
+LLM_GENERATE_MODELS = [m.strip() for m in os.getenv("CAREER_AGENT_LLM_GENERATE_MODELS", "").split(",") if m.strip()]
+# Prazo total de cada requisição (classificação + banco + LLM), em segundos
+REQUEST_BUDGET = float(os.getenv("CAREER_AGENT_REQUEST_BUDGET", "20"))
+# Folga acima das vagas do LLM para que respostas locais nunca esperem atrás dele
+CONCURRENCY_LIMIT = int(os.getenv(
+    "CAREER_AGENT_CONCURRENCY_LIMIT", str(LLM_CONCURRENCY + LLM_QUEUE_SIZE + 32)
+))
+
 def create_interface():
-    agent = CareerAgent()
+    agent = CareerAgent(
+        llm_concurrency=LLM_CONCURRENCY,
+        llm_queue_size=LLM_QUEUE_SIZE,
+        llm_max_wait=LLM_MAX_WAIT,
+        intent_batch_size=INTENT_BATCH_SIZE,
+        intent_batch_delay=INTENT_BATCH_DELAY,
+        intent_model_path=INTENT_MODEL_PATH,
+        intent_model_threshold=INTENT_MODEL_THRESHOLD,
+        intent_log_path=INTENT_LOG_PATH,
+        db_path=DB_PATH,
+        persistent_db=PERSISTENT_DB,
+        db_max_readers=DB_MAX_READERS,
+        feed_urls=FEED_URLS,
+        feed_sync_interval=FEED_SYNC_INTERVAL,
+        job_index=JOB_INDEX,
+        semantic_index_path=SEMANTIC_INDEX_PATH,
+        result_cache_size=RESULT_CACHE_SIZE,
+        llm_breaker_failure_rate=LLM_BREAKER_FAILURE_RATE,
+        llm_breaker_slow_call=LLM_BREAKER_SLOW_CALL,
+        llm_breaker_open_for=LLM_BREAKER_OPEN_FOR,
+        request_budget=REQUEST_BUDGET,
+        llm_hedge=LLM_HEDGE,
+        llm_hedge_max_rate=LLM_HEDGE_MAX_RATE,
+        llm_classify_models=LLM_CLASSIFY_MODELS,
+        llm_generate_models=LLM_GENERATE_MODELS
+    )
     
-    def chat_fn(message: str, history: list):
+    async def chat_fn(message: str, history: list):
         try:
-            response = agent.safe_respond(message, history)
+            response = await agent.async_safe_respond(message, history)
             return response["content"]
         except Exception as e:
             logging.error(f"Erro na interface: {str(e)}")
             return "⚠️ Sistema temporariamente indisponível"
 
+    async def chat_fn_stream(message: str, history: list):
+        try:
+            async for response in agent.async_safe_respond_stream(message, history):
+                yield response["content"]
+        except Exception as e:
+            logging.error(f"Erro na interface: {str(e)}")
+            yield "⚠️ Sistema temporariamente indisponível"
+
     # Interface SIMPLES e FUNCIONAL (versão original)
     interface = gr.ChatInterface(
-        fn=chat_fn,
+        fn=chat_fn_stream if STREAMING else chat_fn,
         examples=[
             "Modelo de currículo para Backend",
             "Salário de desenvolvedor Python",
@@ -34,6 +116,10 @@ def create_interface():
         theme="soft",
         cache_examples=False
     )
+    interface.queue(
+        max_size=QUEUE_MAX_SIZE,
+        default_concurrency_limit=CONCURRENCY_LIMIT
+    )
     
     return interface
 
@@ -3,33 +3,156 @@ import sqlite3
 import glob
 import logging
 import httpx
+import re
+import json
+import asyncio
 import threading
-from huggingface_hub import InferenceClient
-from functools import lru_cache
-from typing import Dict, List, Optional
+from contextlib import aclosing, closing, nullcontext
+from huggingface_hub import AsyncInferenceClient, InferenceClient
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+from keyword_matcher import KeywordMatcher
+from llm_cache import LLMCache
+from llm_client import GenerationProfile, LLMClient
+from model_router import CLASSIFY, GENERATE, ModelRouter, model_alias
+from singleflight import SingleFlight
+from admission import AdmissionGate, LLMBusyError
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from deadline import Deadline, DeadlineExceeded
+from hedging import Hedger
+from intent_batcher import IntentBatcher
+from intent_model import IntentModel
+from job_store import (
+    jobs_for_stack, jobs_near, maybe_refresh_skill_weights, parse_amount, stack_skills_current,
+    sync_stack_skills, upsert_jobs
+)
+from gazetteer import Place, default_gazetteer, fold
+from db_migrations import SCHEMA_VERSION, db_file_lock, migrate, schema_version
+from db_pool import ConnectionPool
+from job_ingest import BATCH_SIZE, ingest, read_jobs
+from feed_sync import FeedSyncWorker
+from job_index import JobIndex
+from result_cache import ResultCache
+from semantic_search import SemanticIndex
 
 logger = logging.getLogger(__name__)
 
 class CareerAgent:
-    def __init__(self):
-        self.db_path = os.path.abspath("/tmp/career_agent.db")  
-        self._nuke_database()
+    # Palavras-chave por intenção/stack; a ordem dos dicionários define a prioridade
+    INTENT_KEYWORDS = {
+        "CURRICULO": ["currículo", "cv", "modelo", "resume", "formatar"],
+        "VAGAS": ["vaga", "emprego", "python", "oportunidade", "contratando", "java", "angular", "react"],
+        "PLANO": ["plano", "carreira", "progressão", "trajetória", "objetivo"],
+        "PREREQ": ["pré-requisitos", "requisitos", "habilidades necessárias", "habilidades técnicas", "como ser", "o que preciso saber"],
+        "SALARIO": ["salário", "remuneração", "ganho", "pagamento", "salariais", "média"]
+    }
+
+    STACK_KEYWORDS = {
+        "Fullstack": ["fullstack", "full-stack", "react e node", "front e back", "angular e java", "react+node", "mern", "mevn", "django", "next.js"],
+        "Frontend": ["frontend", "react", "angular", "vue", "css", "ux/ui", "typescript"],
+        "Backend": ["backend", "java", "python", "api", "microserviços", "spring", "node.js"],
+        "Data Science": ["dados", "data science", "machine learning", "power bi", "pandas"]
+    }
+
+    # Intenções sem resposta local específica: no streaming, o texto vem do LLM token a token
+    STREAMED_INTENTS = ("PLANO", "OUTROS")
+
+    BUSY_MESSAGE = "⏳ Muitas solicitações no momento. Tente novamente em instantes."
+    DEADLINE_MESSAGE = "⏱️ A busca demorou mais que o esperado. Tente novamente ou refine o pedido (stack, cidade)."
+    JOBS_PAGE_SIZE = 5
+
+    # Cadeias de modelos por tarefa, preferido primeiro: rótulo de intenção num
+    # modelo pequeno, texto longo num 7B; o seguinte da cadeia é o fallback
+    LLM_MODELS = {
+        CLASSIFY: ("Qwen/Qwen2.5-1.5B-Instruct", "HuggingFaceH4/zephyr-7b-beta"),
+        GENERATE: ("HuggingFaceH4/zephyr-7b-beta", "mistralai/Mistral-7B-Instruct-v0.3"),
+    }
+
+    # Perfis de geração por tarefa: a classificação quer uma palavra, não 900 tokens
+    GENERATION_PROFILES = {
+        CLASSIFY: GenerationProfile("classify", max_tokens=10, temperature=0.1, stop=("\n\n", "Mensagem:")),
+        GENERATE: GenerationProfile("generate", max_tokens=900),
+    }
+    LLM_INTENTS = ("VAGAS", "CURRICULO", "SALARIO", "PLANO", "OUTROS")
+
+    def __init__(self, llm_concurrency: int = 8, llm_queue_size: int = 32, llm_max_wait: float = 10.0,
+                 intent_batch_size: int = 0, intent_batch_delay: float = 0.02,
+                 intent_model_path: Optional[str] = None, intent_model_threshold: float = 0.8,
+                 intent_log_path: Optional[str] = None,
+                 db_path: str = "/tmp/career_agent.db", persistent_db: bool = False,
+                 db_max_readers: int = 8, feed_urls: Optional[List[str]] = None,
+                 feed_sync_interval: float = 300, job_index: bool = False,
+                 semantic_index_path: Optional[str] = None, result_cache_size: int = 512,
+                 llm_breaker_failure_rate: float = 0.5, llm_breaker_slow_call: float = 10.0,
+                 llm_breaker_open_for: float = 30.0, request_budget: float = 20.0,
+                 llm_hedge: bool = False, llm_hedge_max_rate: float = 0.05,
+                 llm_classify_models: Optional[Sequence[str]] = None,
+                 llm_generate_models: Optional[Sequence[str]] = None):
+        self.db_path = os.path.abspath(db_path)
+        self.persistent_db = persistent_db
+        # Teto de tempo de cada requisição, repartido entre classificação, banco e LLM
+        self.request_budget = request_budget
         self.hf_token = self._validate_hf_token()
-        self.local = threading.local()  
+        self._init_tech_stacks()
         self._init_db_once() 
+        # Leitoras somente leitura + uma escritora, em vez de uma conexão por thread
+        self.db = ConnectionPool(self.db_path, max_readers=db_max_readers)
+        # Índice colunar em memória para "vagas da stack X" (opcional; substitui o SQL)
+        self.job_index = JobIndex(self.db_path) if job_index else None
+        # Listas de vagas e respostas VAGAS renderizadas, invalidadas quando os dados mudam
+        counters = [lambda: self.db.writes]
+        if self.job_index is not None:
+            counters.append(lambda: self.job_index.generation)
+        self.results = ResultCache(self.db_path, counters, max_entries=result_cache_size)
+        # Busca semântica local para pedidos de vaga em texto livre (opcional)
+        self.semantic_index = self._load_semantic_index(semantic_index_path)
+        # Sincronização incremental de feeds em segundo plano (opcional)
+        self.feed_sync = FeedSyncWorker(self.db, feed_urls, feed_sync_interval) if feed_urls else None
+        if self.feed_sync is not None:
+            self.feed_sync.start()
         
-        self.client = self._init_client()
-        self._init_tech_stacks()
+        self.llm_cache = LLMCache(os.getenv("CAREER_AGENT_CACHE_DB", "/tmp/career_agent_cache.db"))
+        # Só chamadas reais ao LLM ocupam vaga; respostas locais nunca esperam na fila
+        self.llm_gate = AdmissionGate(llm_concurrency, llm_queue_size, llm_max_wait)
+        self.llm_flights = SingleFlight()
+        chains = {
+            CLASSIFY: llm_classify_models or self.LLM_MODELS[CLASSIFY],
+            GENERATE: llm_generate_models or self.LLM_MODELS[GENERATE],
+        }
+        # Um LLMClient por modelo, compartilhado entre as cadeias. Disjuntor próprio:
+        # com um modelo degradado, falha na hora e o roteador passa ao próximo
+        clients = {
+            model: LLMClient(self._init_client(model), self._init_async_client(model), self.llm_cache,
+                             self.llm_gate, flights=self.llm_flights,
+                             breaker=CircuitBreaker(failure_rate=llm_breaker_failure_rate,
+                                                    slow_call=llm_breaker_slow_call,
+                                                    open_for=llm_breaker_open_for),
+                             # Hedge (opcional): segunda cópia da chamada que passou do p95
+                             hedger=Hedger(max_rate=llm_hedge_max_rate) if llm_hedge else None)
+            for model in dict.fromkeys(model for chain in chains.values() for model in chain)
+        }
+        # Escolhe o modelo por tarefa pela EWMA de latência/erro, com fallback na ordem da cadeia
+        self.llm = ModelRouter({task: [clients[model] for model in chain] for task, chain in chains.items()},
+                               self.GENERATION_PROFILES)
+        self.client = self.llm.chains[GENERATE][0].client
+        # Classificação em lote é opcional (intent_batch_size > 1 habilita); uma linha por mensagem
+        batch_profile = GenerationProfile("classify_batch", max_tokens=8 * max(intent_batch_size, 1),
+                                          temperature=0.1, stop=("\n\n",))
+        self.intent_batcher = (
+            IntentBatcher(lambda prompt: self._query_llm(prompt, task=CLASSIFY, profile=batch_profile),
+                          intent_batch_size, intent_batch_delay)
+            if intent_batch_size > 1 else None
+        )
+        self.intent_model = self._load_intent_model(intent_model_path)
+        self.intent_model_threshold = intent_model_threshold
+        # Log de rótulos (keyword/LLM) usado para treinar o modelo local
+        self._intent_log = open(intent_log_path, "a", encoding="utf-8", buffering=1) if intent_log_path else None
+        self._intent_log_lock = threading.Lock()
+        self._matcher = KeywordMatcher({
+            "intent": self.INTENT_KEYWORDS,
+            "stack": self.STACK_KEYWORDS
+        })
         logger.info("CareerAgent inicializado com sucesso!")
 
-    def _get_conn(self):
-        """Retorna a conexão da thread atual"""
-        if not hasattr(self.local, "conn") or self.local.conn is None:
-            self.local.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.local.conn.execute("PRAGMA foreign_keys = 1")
-            self.local.conn.execute("PRAGMA journal_mode = WAL")
-        return self.local.conn    
-
     def _nuke_database(self):
         """Destruição total do banco com verificação em 3 níveis"""
         # Nível 1: Remoção padrão
@@ -50,34 +173,30 @@ class CareerAgent:
         if any(os.path.exists(f) for f in [self.db_path] + temp_files):
             raise RuntimeError("FALHA CRÍTICA: Não foi possível limpar o banco!")
 
-    def _create_connection(self):
-        """Cria conexão com configurações de desempenho e verificação"""
-        conn = sqlite3.connect(self.db_path)
-        conn.execute("PRAGMA foreign_keys = 1")
-        conn.execute("PRAGMA journal_mode = WAL")
-        conn.execute("PRAGMA synchronous = NORMAL")
-        return conn
-
     def _init_db_once(self):
-        """Executado apenas na thread principal"""
-        conn = sqlite3.connect(self.db_path)
-        try:
-            cursor = conn.cursor()
-            cursor.execute("DROP TABLE IF EXISTS jobs")
-            cursor.execute("""
-                CREATE TABLE jobs (
-                    id INTEGER PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    company TEXT NOT NULL,
-                    skills TEXT,
-                    salary TEXT,
-                    link TEXT
-                )
-            """)
-            logger.debug("Tabela 'jobs' criada com sucesso!")
-            self._seed_initial_data(conn)  # ← Seed acontece aqui
-        finally:
-            conn.close()  
+        """
+        Executado apenas na thread principal, sob lock de arquivo entre processos.
+        Modo persistente: só aplica migrações pendentes (banco em dia = checagem de versão).
+        Modo efêmero: recria o banco do zero a cada início.
+        """
+        with db_file_lock(self.db_path):
+            if not self.persistent_db:
+                self._nuke_database()
+
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+                if schema_version(conn) == SCHEMA_VERSION and stack_skills_current(conn.cursor(), self.tech_stacks):
+                    logger.info(f"Banco já na versão {SCHEMA_VERSION}: {self.db_path}")
+                    return
+                applied = migrate(conn)
+                if 1 in applied:
+                    self._seed_initial_data(conn)  # ← Seed acontece aqui (banco novo)
+                sync_stack_skills(conn.cursor(), self.tech_stacks)
+                maybe_refresh_skill_weights(conn)
+                conn.commit()
+            finally:
+                conn.close()  
 
     def _clean_database(self):
         """Remove completamente o banco de dados existente"""
@@ -92,11 +211,11 @@ class CareerAgent:
             raise ValueError("HF_TOKEN inválido ou ausente!")
         return token
 
-    def _init_client(self):
+    def _init_client(self, model: str):
         """Deve RETORNAR a instância do client"""
         try:
             return InferenceClient(
-                model="HuggingFaceH4/zephyr-7b-beta",
+                model=model,
                 token=self.hf_token,
                 timeout=30
             )
@@ -104,24 +223,85 @@ class CareerAgent:
             logger.error(f"Falha ao criar client: {str(e)}")
             raise RuntimeError("Serviço de IA indisponível") from e
 
+    def _init_async_client(self, model: str):
+        """Client assíncrono: chamadas em voo não prendem threads do servidor"""
+        try:
+            return AsyncInferenceClient(
+                model=model,
+                token=self.hf_token,
+                timeout=30
+            )
+        except Exception as e:
+            logger.error(f"Falha ao criar client assíncrono: {str(e)}")
+            raise RuntimeError("Serviço de IA indisponível") from e
+
     def _detect_tech_stack(self, message: str) -> str:
         message_lower = message.lower()
         logger.debug(f"Detectando stack para: '{message_lower}'")
-        
-        stack_keywords = {
-            "Fullstack": ["fullstack", "full-stack", "react e node", "front e back", "angular e java", "react+node", "mern", "mevn", "django", "next.js"],
-            "Frontend": ["frontend", "react", "angular", "vue", "css", "ux/ui", "typescript"],
-            "Backend": ["backend", "java", "python", "api", "microserviços", "spring", "node.js"],
-            "Data Science": ["dados", "data science", "machine learning", "power bi", "pandas"]
-        }
-        
-        for stack, keywords in stack_keywords.items():
-            if any(kw in message_lower for kw in keywords):
-                logger.debug(f"Stack detectada: {stack}")
-                return stack
-                
+
+        stack = self._matcher.scan(message_lower)["stack"]
+        if stack:
+            logger.debug(f"Stack detectada: {stack}")
+            return stack
+
         logger.debug("Stack não detectada, usando 'Geral'")
-        return "Geral" 
+        return "Geral"
+
+    def _scan_message(self, message: str) -> Tuple[Optional[str], str]:
+        """
+        Intenção e stack sem sair do processo: keywords (uma única passada) e,
+        se nada casar, o modelo local. Intenção None exige o LLM.
+        """
+        cleaned_msg = message.lower().strip()
+        matches = self._matcher.scan(cleaned_msg)
+        stack = matches["stack"] or "Geral"
+
+        # Fallback rápido para mensagens muito curtas
+        if len(cleaned_msg) < 3:
+            return "OUTROS", stack
+        if matches["intent"] is not None:
+            self._log_intent(cleaned_msg, matches["intent"], "keyword")
+            return matches["intent"], stack
+        return self._classify_intent_local(cleaned_msg), stack
+
+    def _load_intent_model(self, path: Optional[str]) -> Optional[IntentModel]:
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            model = IntentModel.load(path)
+            logger.info(f"Modelo local de intenções carregado: {path}")
+            return model
+        except Exception as e:
+            logger.error(f"Falha ao carregar modelo de intenções: {str(e)}")
+            return None
+
+    def _load_semantic_index(self, path: Optional[str]) -> Optional[SemanticIndex]:
+        if not path or not os.path.exists(f"{path}.npz"):
+            return None
+        try:
+            index = SemanticIndex(path)
+            logger.info(f"Índice semântico carregado: {path} ({len(index.ids)} vagas)")
+            return index
+        except Exception as e:
+            logger.error(f"Falha ao carregar índice semântico: {str(e)}")
+            return None
+
+    def _classify_intent_local(self, message: str) -> Optional[str]:
+        """Modelo local; None quando não há modelo ou a confiança fica abaixo do limiar"""
+        if self.intent_model is None:
+            return None
+        label, confidence = self.intent_model.predict(message)
+        if confidence < self.intent_model_threshold:
+            return None
+        logger.debug(f"Intenção via modelo local: {label} ({confidence:.2f})")
+        return label
+
+    def _log_intent(self, message: str, label: str, source: str):
+        if self._intent_log is None:
+            return
+        line = json.dumps({"message": message, "label": label, "source": source}, ensure_ascii=False)
+        with self._intent_log_lock:
+            self._intent_log.write(line + "\n")
 
     def _init_tech_stacks(self):  
         self.tech_stacks = {
@@ -147,53 +327,151 @@ class CareerAgent:
             }
         }
     
-    def _process_message(self, message: str) -> Dict[str, str]:
+    def _process_message(self, message: str, deadline: Optional[Deadline] = None) -> Dict[str, str]:
         """Fluxo principal com fallback local"""
         try:
-            intent = self._classify_intent(message)
-            
-            if intent == "PREREQ":
-                stack = self._detect_tech_stack(message)
-                return {"role": "assistant", "content": self._get_requirements(stack)}
-
-            elif intent == "PREREQ":  
-                stack = self._detect_tech_stack(message)  
-                return {  
-                    "role": "assistant",  
-                    "content": self._get_requirements(stack)  
-                }     
-                
-            elif intent == "SALARIO":
-                stack = self._detect_tech_stack(message)
-                return {
-                    "role": "assistant", 
-                    "content": self._get_detailed_salary_info(stack)  
-                }
-
-            elif intent == "VAGAS":
-                tech = self._detect_tech_stack(message)  
-                jobs = self._get_jobs(tech)
-                
-                if not jobs:
-                    return {"role": "assistant", "content": "⚠️ Nenhuma vaga encontrada para esta stack"}
-                
-                response = "🚀 **Vagas Encontradas:**\n"
-                for job in jobs:
-                    response += (
-                        f"• **{job['title']}** ({job['company']})\n"
-                        f"  💰 {job['salary']} | 🛠️ {job['skills']}\n"
-                        f"  🔗 {job['link']}\n"
-                    )
-                return {"role": "assistant", "content": response}
-            
-            else:
-                return {"role": "assistant", "content": self._general_response() or "Como posso ajudar?"}
+            intent, stack = self._scan_message(message)
+            if intent is None:
+                intent = self._classify_intent_llm(message, deadline)
+            return self._respond_to_intent(intent, stack, message, deadline)
+
+        except LLMBusyError as e:
+            logger.warning(f"LLM saturado: {str(e)}")
+            return {"role": "assistant", "content": self.BUSY_MESSAGE}
             
-        except (httpx.ReadTimeout, httpx.ConnectError) as e:
-            logger.warning(f"Timeout na API: {str(e)}")
+        except (httpx.ReadTimeout, httpx.ConnectError, CircuitOpenError, DeadlineExceeded) as e:
+            logger.warning(f"LLM indisponível: {str(e)}")
             fallback = self._local_fallback(message)  
             return {"role": "assistant", "content": fallback if fallback else "Sistema temporariamente indisponível"}  
+
+    def _process_message_stream(self, message: str, deadline: Optional[Deadline] = None) -> Iterator[Dict[str, str]]:
+        """
+        Versão em streaming: respostas locais saem de imediato, sem esperar o LLM;
+        intenções sem resposta local (STREAMED_INTENTS) chegam token a token
+        """
+        intent, stack = self._scan_message(message)
+        if intent is None:
+            # Classificação via LLM: mostra um status enquanto a chamada não volta
+            yield {"role": "assistant", "content": "🔎 Analisando sua mensagem..."}
+            try:
+                intent = self._classify_intent_llm(message, deadline)
+            except LLMBusyError as e:
+                logger.warning(f"LLM saturado: {str(e)}")
+                yield {"role": "assistant", "content": self.BUSY_MESSAGE}
+                return
+            except (httpx.ReadTimeout, httpx.ConnectError, CircuitOpenError, DeadlineExceeded) as e:
+                logger.warning(f"LLM indisponível: {str(e)}")
+                fallback = self._local_fallback(message)
+                yield {"role": "assistant", "content": fallback if fallback else "Sistema temporariamente indisponível"}
+                return
+
+        if intent in self.STREAMED_INTENTS:
+            yield from self._stream_answer(intent, stack, message, deadline)
+        else:
+            yield self._respond_to_intent(intent, stack, message, deadline)
+
+    def _generation_prompt(self, message: str, stack: str) -> str:
+        area = f"Área de interesse: {stack}\n            " if stack in self.tech_stacks else ""
+        return f"""Você é um assistente de carreira em tecnologia. Responda em português, de forma objetiva e prática.
+
+            {area}Mensagem: "{message}"
+
+            Resposta:"""
+
+    def _stream_answer(self, intent: str, stack: str, message: str,
+                       deadline: Optional[Deadline] = None) -> Iterator[Dict[str, str]]:
+        """
+        Resposta do LLM com o texto acumulado a cada trecho. Sem nenhum trecho
+        (erro da API, gate cheio, circuito aberto, prazo, stream vazio), a
+        resposta local da intenção; com o prazo esgotado no meio, fica o parcial.
+        """
+        content = ""
+        try:
+            with closing(self._stream_llm(self._generation_prompt(message, stack), deadline)) as deltas:
+                for delta in deltas:
+                    content += delta
+                    yield {"role": "assistant", "content": content}
+        except (LLMBusyError, CircuitOpenError, DeadlineExceeded) as e:
+            logger.warning(f"Stream do LLM indisponível: {str(e)}")
+        if not content:
+            yield self._respond_to_intent(intent, stack, message, deadline)
+
+    def _respond_to_intent(self, intent: str, stack: str, message: str = "",
+                           deadline: Optional[Deadline] = None) -> Dict[str, str]:
+        """Monta a resposta local para a intenção/stack já resolvidas"""
+        if intent == "PREREQ":
+            return {"role": "assistant", "content": self._get_requirements(stack)}
+            
+        elif intent == "SALARIO":
+            return {
+                "role": "assistant", 
+                "content": self._get_detailed_salary_info(stack)  
+            }
+
+        elif intent == "VAGAS":
+            filters = self._extract_job_filters(message)
+            page = filters.pop("page", 1)
+            # Pedido sem stack reconhecida: termos para o FTS5 e texto para o fallback semântico
+            free_text = stack not in self.tech_stacks
+            terms = self._free_text_terms(message) if free_text else ()
+            query = self._semantic_query(message) if free_text else ""
+            key = ("vagas", stack, terms, query, page, tuple(sorted(filters.items())))
+            try:
+                content = self.results.get_or_compute(
+                    key, lambda: self._render_jobs(stack, page, filters, terms, query, deadline)
+                )
+            except DeadlineExceeded as e:
+                logger.warning(f"Busca de vagas interrompida: {str(e)}")
+                content = self.DEADLINE_MESSAGE
+            except Exception as e:
+                logger.error(f"Erro ao buscar vagas: {str(e)}")
+                content = "⚠️ Nenhuma vaga encontrada para esta stack"
+            return {"role": "assistant", "content": content}
+        
+        else:
+            return {"role": "assistant", "content": self._general_response() or "Como posso ajudar?"}
     
+    def _render_jobs(self, stack: str, page: int, filters: Dict, terms: Sequence[str] = (),
+                     query: str = "", deadline: Optional[Deadline] = None) -> str:
+        """Markdown de uma página de vagas (por distância, por stack, por texto livre ou semântica)"""
+        # Só a página pedida (+1 para saber se há próxima) é buscada e renderizada
+        limit, offset = self.JOBS_PAGE_SIZE + 1, (page - 1) * self.JOBS_PAGE_SIZE
+        near = filters.get("near")
+        if near is not None:
+            jobs = self._jobs_near(stack, near, filters["radius_km"], limit, offset, filters.get("min_salary"),
+                                   deadline)
+            next_request = f"vagas {stack} em {near.city}"
+        elif stack in self.tech_stacks:
+            jobs = self._find_jobs(stack, limit, offset=offset, deadline=deadline, **filters)
+            next_request = f"vagas {stack}"
+        else:
+            # Sem stack reconhecida: busca textual no FTS5 com os termos do pedido
+            jobs = self._search_jobs(terms, limit, offset, deadline=deadline, **filters)
+            next_request = f"vagas {' '.join(terms)}"
+            # Índice semântico só quando a busca textual não casa nada (nem na primeira página)
+            if query and not jobs and not (offset and self._search_jobs(terms, 1, deadline=deadline, **filters)):
+                jobs = self._semantic_search(query, limit, offset, deadline=deadline, **filters)
+                next_request = query
+
+        where = f" em {near.label} (raio de {filters['radius_km']} km)" if near is not None else ""
+        if not jobs:
+            if page > 1:
+                return f"⚠️ Não há mais vagas para esta stack{where}"
+            return f"⚠️ Nenhuma vaga encontrada para esta stack{where}"
+
+        response = "🚀 **Vagas Encontradas:**\n"
+        for job in jobs[:self.JOBS_PAGE_SIZE]:
+            response += (
+                f"• **{job['title']}** ({job['company']})\n"
+                f"  💰 {job['salary']} | 🛠️ {job['skills']}\n"
+            )
+            if "distance_km" in job:
+                response += f"  📍 {job['location']} ({job['distance_km']:g} km)\n"
+            response += f"  🔗 {job['link']}\n"
+        if len(jobs) > self.JOBS_PAGE_SIZE:
+            response += f"\n➡️ Peça \"{next_request} página {page + 1}\" para ver mais"
+        return response
+
     def safe_respond(self, message: str, history: List[List[str]]) -> Dict[str, str]:
         """Entry point seguro com validação completa"""
         if not hasattr(self, 'client') or self.client is None:
@@ -205,13 +483,132 @@ class CareerAgent:
             if not isinstance(message, str) or len(message.strip()) < 2:
                 return {"role": "assistant", "content": "Por favor, formule melhor sua pergunta"}
             
-            # Circuit breaker
-            return self._process_message(message.lower())
+            # Com o circuito do LLM aberto ou o prazo esgotado, _process_message responde com o fallback local
+            return self._process_message(message.lower(), Deadline(self.request_budget))
             
         except Exception as e:
             logger.error(f"Erro crítico: {str(e)}")
             return {"role": "assistant", "content": "Sistema temporariamente indisponível"}
 
+    def safe_respond_stream(self, message: str, history: List[List[str]]) -> Iterator[Dict[str, str]]:
+        """Entry point em streaming; cada item traz o conteúdo acumulado até o momento"""
+        if not hasattr(self, 'client') or self.client is None:
+            logger.critical("Cliente de inferência não inicializado!")
+            yield {"role": "assistant", "content": "Sistema temporariamente indisponível"}
+            return
+        try:
+            if not isinstance(message, str) or len(message.strip()) < 2:
+                yield {"role": "assistant", "content": "Por favor, formule melhor sua pergunta"}
+                return
+
+            yield from self._process_message_stream(message.lower(), Deadline(self.request_budget))
+
+        except Exception as e:
+            logger.error(f"Erro crítico: {str(e)}")
+            yield {"role": "assistant", "content": "Sistema temporariamente indisponível"}
+
+    async def _aprocess_message(self, message: str, deadline: Optional[Deadline] = None) -> Dict[str, str]:
+        """Versão assíncrona de _process_message; SQLite roda fora do event loop"""
+        try:
+            intent, stack = self._scan_message(message)
+            if intent is None:
+                intent = await self._aclassify_intent_llm(message, deadline)
+            return await self._arespond_to_intent(intent, stack, message, deadline)
+
+        except LLMBusyError as e:
+            logger.warning(f"LLM saturado: {str(e)}")
+            return {"role": "assistant", "content": self.BUSY_MESSAGE}
+
+        except (httpx.ReadTimeout, httpx.ConnectError, asyncio.TimeoutError, CircuitOpenError,
+                DeadlineExceeded) as e:
+            logger.warning(f"LLM indisponível: {str(e)}")
+            fallback = self._local_fallback(message)
+            return {"role": "assistant", "content": fallback if fallback else "Sistema temporariamente indisponível"}
+
+    async def _aprocess_message_stream(self, message: str,
+                                       deadline: Optional[Deadline] = None) -> AsyncIterator[Dict[str, str]]:
+        """Versão assíncrona de _process_message_stream"""
+        intent, stack = self._scan_message(message)
+        if intent is None:
+            yield {"role": "assistant", "content": "🔎 Analisando sua mensagem..."}
+            try:
+                intent = await self._aclassify_intent_llm(message, deadline)
+            except LLMBusyError as e:
+                logger.warning(f"LLM saturado: {str(e)}")
+                yield {"role": "assistant", "content": self.BUSY_MESSAGE}
+                return
+            except (httpx.ReadTimeout, httpx.ConnectError, asyncio.TimeoutError, CircuitOpenError,
+                    DeadlineExceeded) as e:
+                logger.warning(f"LLM indisponível: {str(e)}")
+                fallback = self._local_fallback(message)
+                yield {"role": "assistant", "content": fallback if fallback else "Sistema temporariamente indisponível"}
+                return
+
+        if intent in self.STREAMED_INTENTS:
+            async for response in self._astream_answer(intent, stack, message, deadline):
+                yield response
+        else:
+            yield await self._arespond_to_intent(intent, stack, message, deadline)
+
+    async def _astream_answer(self, intent: str, stack: str, message: str,
+                              deadline: Optional[Deadline] = None) -> AsyncIterator[Dict[str, str]]:
+        """Versão assíncrona de _stream_answer; o prazo também corta a espera por cada trecho"""
+        content = ""
+        async with aclosing(self.llm.astream(self._generation_prompt(message, stack), deadline)) as deltas:
+            try:
+                while True:
+                    timeout = deadline.remaining() if deadline is not None else None
+                    content += await asyncio.wait_for(deltas.__anext__(), timeout)
+                    yield {"role": "assistant", "content": content}
+            except StopAsyncIteration:
+                pass
+            except asyncio.TimeoutError:
+                logger.warning("Prazo esgotado durante o stream do LLM" + ("; resposta parcial" if content else ""))
+            except (LLMBusyError, CircuitOpenError, DeadlineExceeded) as e:
+                logger.warning(f"Stream do LLM indisponível: {str(e)}")
+        if not content:
+            yield await self._arespond_to_intent(intent, stack, message, deadline)
+
+    async def _arespond_to_intent(self, intent: str, stack: str, message: str = "",
+                                  deadline: Optional[Deadline] = None) -> Dict[str, str]:
+        # Só VAGAS toca o SQLite; o resto é montado em memória
+        if intent == "VAGAS":
+            return await asyncio.to_thread(self._respond_to_intent, intent, stack, message, deadline)
+        return self._respond_to_intent(intent, stack, message, deadline)
+
+    async def async_safe_respond(self, message: str, history: List[List[str]]) -> Dict[str, str]:
+        """Entry point assíncrono com a mesma validação de safe_respond"""
+        if not hasattr(self, 'llm') or self.llm is None:
+            logger.critical("Cliente de inferência não inicializado!")
+            return {"role": "assistant", "content": "Sistema temporariamente indisponível"}
+        try:
+            if not isinstance(message, str) or len(message.strip()) < 2:
+                return {"role": "assistant", "content": "Por favor, formule melhor sua pergunta"}
+
+            return await self._aprocess_message(message.lower(), Deadline(self.request_budget))
+
+        except Exception as e:
+            logger.error(f"Erro crítico: {str(e)}")
+            return {"role": "assistant", "content": "Sistema temporariamente indisponível"}
+
+    async def async_safe_respond_stream(self, message: str, history: List[List[str]]) -> AsyncIterator[Dict[str, str]]:
+        """Entry point assíncrono em streaming"""
+        if not hasattr(self, 'llm') or self.llm is None:
+            logger.critical("Cliente de inferência não inicializado!")
+            yield {"role": "assistant", "content": "Sistema temporariamente indisponível"}
+            return
+        try:
+            if not isinstance(message, str) or len(message.strip()) < 2:
+                yield {"role": "assistant", "content": "Por favor, formule melhor sua pergunta"}
+                return
+
+            async for response in self._aprocess_message_stream(message.lower(), Deadline(self.request_budget)):
+                yield response
+
+        except Exception as e:
+            logger.error(f"Erro crítico: {str(e)}")
+            yield {"role": "assistant", "content": "Sistema temporariamente indisponível"}
+
     def _get_detailed_salary_info(self, stack: str) -> str:
         # Dados atualizados e mais completos
         salary_data = {
@@ -297,82 +694,225 @@ class CareerAgent:
             "Como posso ajudar você hoje?"
         )
 
-    def _get_jobs(self, stack: str) -> List[Dict]:
-        try:
-            conn = self._get_conn()  
-            cursor = conn.cursor()   
-
-            # Obter habilidades da stack (ex: ["Java", "Python"] para Backend)
-            skills = self.tech_stacks.get(stack, {}).get('skills', [])
-            if not skills:
-                logger.warning(f"Nenhuma habilidade encontrada para a stack: {stack}")
-                return []
-            
-            # Criar termos de busca: "%java%", "%python%", etc.
-            search_terms = [f"%{skill.lower()}%" for skill in skills]
-
-            conditions = " OR ".join(["LOWER(skills) LIKE ?" for _ in skills])
-            query = f"""
-                SELECT title, company, skills, salary, link 
-                FROM jobs 
-                WHERE {conditions}
-                ORDER BY salary DESC
-            """
-
-            cursor.execute(query, search_terms)
-            return [
-                {"title": row[0], "company": row[1], "skills": row[2], 
-                 "salary": row[3], "link": row[4]}
-                for row in cursor.fetchall()
-            ]
-                        
-        except Exception as e:
-            logger.error(f"Erro ao buscar vagas: {str(e)}")
-            return []                
-        
-    @lru_cache(maxsize=100)
-    def _classify_intent(self, message: str) -> str:
+    def _find_jobs(self, stack: str, limit: int = 20, min_salary: Optional[int] = None,
+                   by_salary: bool = False, offset: int = 0, deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Top-k das vagas da stack por skills ponderadas por IDF, via cache; erros propagam e não entram no cache"""
+        return self.results.get_or_compute(
+            ("jobs", stack, limit, min_salary, by_salary, offset),
+            lambda: self._load_jobs(stack, limit, min_salary, by_salary, offset, deadline)
+        )
+
+    def _load_jobs(self, stack: str, limit: int, min_salary: Optional[int],
+                   by_salary: bool, offset: int, deadline: Optional[Deadline] = None) -> List[Dict]:
+        if self.job_index is not None:
+            if deadline is not None:
+                deadline.check("índice de vagas")
+            return self.job_index.jobs_for_stack(stack, limit, min_salary, by_salary, offset)
+        with self.db.reader() as conn, self._guard(conn, deadline):
+            rows = jobs_for_stack(conn, stack, limit, min_salary, by_salary, offset)
+        if not rows and stack not in self.tech_stacks:
+            logger.warning(f"Nenhuma habilidade encontrada para a stack: {stack}")
+        return [
+            {"title": row[0], "company": row[1], "skills": row[2], 
+             "salary": row[3], "link": row[4]}
+            for row in rows
+        ]
+
+    def _jobs_near(self, stack: str, place: Place, radius_km: float, limit: int = 20, offset: int = 0,
+                   min_salary: Optional[int] = None, deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Vagas da stack num raio da cidade, mais próximas primeiro (filtro no R*Tree)"""
+        with self.db.reader() as conn, self._guard(conn, deadline):
+            rows = jobs_near(conn, place, radius_km, stack if stack in self.tech_stacks else None,
+                             limit, min_salary, offset)
+        return [
+            {"title": row[0], "company": row[1], "skills": row[2], "salary": row[3],
+             "link": row[4], "location": row[5], "distance_km": row[6]}
+            for row in rows
+        ]
+
+    @staticmethod
+    def _guard(conn, deadline: Optional[Deadline]):
+        """Consulta interrompida quando o prazo da requisição acaba (sem prazo, nada muda)"""
+        return deadline.guard(conn) if deadline is not None else nullcontext(conn)
+
+    _MIN_SALARY_RE = re.compile(
+        r"(?:acima de|mais de|a partir de|pelo menos|m[ií]nimo de|>=?)\s*(?:r\$\s*)?"
+        r"(\d{1,3}(?:[.,]\d{3})+|\d+)(?:[.,](\d{1,2}))?\s*(k|mil)?\b"
+    )
+
+    _PAGE_RE = re.compile(r"p[aá]gina\s+(\d{1,3})\b")
+
+    _RADIUS_RE = re.compile(r"(?:raio de|at[eé])\s*(\d{1,4})\s*km\b")
+
+    # Raio padrão da busca por cidade: a cidade e a região metropolitana
+    DEFAULT_RADIUS_KM = 50
+
+    def _extract_job_filters(self, message: str) -> Dict:
         """
-        Classifica a intenção do usuário com fallback robusto.
-        Retorna uma das opções: VAGAS, CURRICULO, SALARIO, PLANO, OUTROS
+        'acima de R$ 10k' -> min_salary; 'mais bem pagas'/'maiores salários' -> ordena
+        por salário; 'página 2' -> page; 'em Campinas' (+ 'raio de 20 km') -> near/radius_km
         """
-        # Limpeza básica da mensagem
-        cleaned_msg = message.lower().strip()
-        logger.debug(f"Classificando intenção para mensagem: '{cleaned_msg}'")
-        
-        # Fallback rápido para mensagens muito curtas
-        if len(cleaned_msg) < 3:
-            return "OUTROS"
-        
-        # Dicionário de palavras-chave para fallback local
-        keyword_map =  keyword_map = {
-            "CURRICULO": ["currículo", "cv", "modelo", "resume", "formatar"],
-            "VAGAS": ["vaga", "emprego", "python", "oportunidade", "contratando", "java", "angular", "react"],
-            "PLANO": ["plano", "carreira", "progressão", "trajetória", "objetivo"],
-            "PREREQ": ["pré-requisitos", "requisitos", "habilidades necessárias", "habilidades técnicas", "como ser", "o que preciso saber"], 
-            "SALARIO": ["salário", "remuneração", "ganho", "pagamento", "salariais", "média"]  
-            
-        }
+        filters = {}
+        place = default_gazetteer().find(message)
+        if place is not None:
+            filters["near"] = place
+            radius = self._RADIUS_RE.search(message.lower())
+            filters["radius_km"] = int(radius.group(1)) if radius else self.DEFAULT_RADIUS_KM
+        page = self._PAGE_RE.search(message.lower())
+        if page and int(page.group(1)) > 1:
+            filters["page"] = int(page.group(1))
+        match = self._MIN_SALARY_RE.search(message.lower())
+        if match:
+            filters["min_salary"] = parse_amount(match)
+        if any(kw in message.lower() for kw in ("bem pag", "maiores salários", "melhores salários")):
+            filters["by_salary"] = True
+        return filters
+
+    def _semantic_query(self, message: str) -> str:
+        """Texto livre do pedido, sem página/filtro de salário; '' se não houver índice ou texto"""
+        if self.semantic_index is None:
+            return ""
+        if default_gazetteer().find(message) is not None:
+            return ""
+        text = self._PAGE_RE.sub(" ", message.lower())
+        text = " ".join(self._MIN_SALARY_RE.sub(" ", text).split())
+        return text if len(text.split()) >= 3 else ""
+
+    def _semantic_search(self, query: str, limit: int = 20, offset: int = 0,
+                         min_salary: Optional[int] = None, by_salary: bool = False,
+                         deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Vizinhos aproximados no índice semântico, na ordem de similaridade (ou de salário)"""
+        # Filtro e ordenação por salário são aplicados depois: busca mais candidatos para compensar
+        k = (offset + limit) * (4 if min_salary is not None or by_salary else 1)
+        if deadline is not None:
+            deadline.check("busca semântica")
+        ids = [job_id for job_id, _ in self.semantic_index.search(query, k)]
+        if not ids:
+            return []
+        with self.db.reader() as conn, self._guard(conn, deadline):
+            rows = {row[0]: row[1:] for row in conn.execute(f"""
+                SELECT id, title, company, skills, salary, link, salary_max FROM jobs
+                WHERE id IN ({','.join('?' * len(ids))}) AND COALESCE(salary_max, -1) >= ?
+            """, ids + [min_salary if min_salary is not None else -1]).fetchall()}
+        ranked = [row for row in (rows.get(job_id) for job_id in ids) if row is not None]
+        if by_salary:
+            # sort estável: entre salários iguais fica a ordem de similaridade
+            ranked.sort(key=lambda row: row[5] if row[5] is not None else -1, reverse=True)
+        jobs = [
+            {"title": row[0], "company": row[1], "skills": row[2], "salary": row[3], "link": row[4]}
+            for row in ranked
+        ]
+        return jobs[offset:offset + limit]
+
+    def _search_jobs(self, terms: Sequence[str], limit: int = 20, offset: int = 0,
+                     min_salary: Optional[int] = None, by_salary: bool = False,
+                     deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Busca textual livre no índice FTS5 (título e skills), ranqueada por bm25"""
+        if not terms:
+            return []
+        salary_filter = "AND j.salary_max >= ?" if min_salary is not None else ""
+        order = "j.salary_max DESC, rank" if by_salary else "rank, j.salary_max DESC"
+        params = [self._fts_query(terms)] + ([min_salary] if min_salary is not None else []) + [limit, offset]
+        with self.db.reader() as conn, self._guard(conn, deadline):
+            rows = conn.execute(f"""
+                SELECT j.title, j.company, j.skills, j.salary, j.link,
+                       bm25(jobs_fts, 2.0, 0.5, 4.0) AS rank
+                FROM jobs_fts
+                JOIN jobs j ON j.id = jobs_fts.rowid
+                WHERE jobs_fts MATCH ? {salary_filter}
+                ORDER BY {order}, j.id
+                LIMIT ? OFFSET ?
+            """, params).fetchall()
+        return [
+            {"title": row[0], "company": row[1], "skills": row[2],
+             "salary": row[3], "link": row[4]}
+            for row in rows
+        ]
+
+    @staticmethod
+    def _fts_query(terms: Sequence[str]) -> str:
+        """Monta '{title skills} : ("java" OR "node.js" ...)' com cada termo como frase"""
+        phrases = " OR ".join(
+            '"' + term.strip().replace('"', '""') + '"' for term in terms if term.strip()
+        )
+        return f"{{title skills}} : ({phrases})"
+
+    _TERM_RE = re.compile(r"[\w+#][\w+#.]*")
+
+    # Palavras do pedido que não descrevem a vaga (não entram na busca textual)
+    _FREE_TEXT_STOPWORDS = {
+        "de", "da", "do", "das", "dos", "e", "em", "com", "para", "pra", "por", "a", "o", "as", "os",
+        "ou", "na", "no", "nas", "nos", "um", "uma", "uns", "umas", "que", "tem", "ha", "algum", "alguma",
+        "quero", "queria", "procuro", "busco", "buscar", "procurando", "mostre", "mostra", "liste",
+        "me", "eu", "vaga", "vagas", "emprego", "empregos", "oportunidade", "oportunidades",
+        "contratando", "abertas", "aberta", "existe", "existem", "sobre", "mais", "bem", "pagas",
+        "pagos", "maiores", "melhores", "salarios", "salario", "pagina",
+    }
+
+    def _free_text_terms(self, message: str) -> Tuple[str, ...]:
+        """Termos do pedido para o FTS5, sem página/filtro de salário e palavras de pedido"""
+        text = self._PAGE_RE.sub(" ", message.lower())
+        text = fold(self._MIN_SALARY_RE.sub(" ", text))
+        terms = (term.rstrip(".") for term in self._TERM_RE.findall(text))
+        return tuple(dict.fromkeys(
+            term for term in terms
+            if len(term) > 1 and not term.isdigit() and term not in self._FREE_TEXT_STOPWORDS
+        ))
         
-        for intent, keywords in keyword_map.items():
-            if intent == "CURRICULO" and any(kw in cleaned_msg for kw in keywords):
-                return "CURRICULO"
-            elif intent == "VAGAS" and any(kw in cleaned_msg for kw in keywords):
-                return "VAGAS"
-            elif intent == "PLANO" and any(kw in cleaned_msg for kw in keywords):
-                return "PLANO"
-            elif intent == "PREREQ" and any(kw in cleaned_msg for kw in keywords):
-                return "PREREQ"
-            elif intent == "SALARIO" and any(kw in cleaned_msg for kw in keywords):
-                return "SALARIO"
-                
-                
-                logger.debug(f"Intenção detectada via keywords: {intent}")
-                return intent
-            
-        # Se não encontrou, usa o LLM para classificação refinada
+    def _classify_intent_llm(self, message: str, deadline: Optional[Deadline] = None) -> str:
+        """Classificação refinada via LLM quando nenhuma keyword casou"""
         try:
-            prompt = f"""Analise esta mensagem e classifique a intenção:
+            if self.intent_batcher is not None:
+                return self._classify_intent_batched(message, deadline)
+            # Stream com saída antecipada: fecha a conexão no primeiro rótulo válido
+            response = self.llm.complete_until(self._classification_prompt(message), self._first_intent_label,
+                                               deadline)
+            return self._record_llm_intent(message, response)
+
+        except (LLMBusyError, CircuitOpenError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            logger.error(f"Erro na classificação: {str(e)}")
+            return "OUTROS"  
+
+    async def _aclassify_intent_llm(self, message: str, deadline: Optional[Deadline] = None) -> str:
+        """Versão assíncrona de _classify_intent_llm"""
+        try:
+            if self.intent_batcher is not None:
+                return await self._aclassify_intent_batched(message, deadline)
+            response = await self.llm.acomplete_until(self._classification_prompt(message),
+                                                      self._first_intent_label, deadline)
+            return self._record_llm_intent(message, response)
+
+        except (LLMBusyError, CircuitOpenError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            logger.error(f"Erro na classificação: {str(e)}")
+            return "OUTROS"
+
+    def _classify_intent_batched(self, message: str, deadline: Optional[Deadline] = None) -> str:
+        """Classifica via IntentBatcher; o rótulo fica no cache sob a chave do prompt individual"""
+        key = self.llm.cache_key(self._classification_prompt(message), CLASSIFY)
+        cached = self.llm_cache.get(key)
+        if cached is not None:
+            return self._parse_intent(cached)
+        label = self.intent_batcher.classify(message, deadline.remaining() if deadline else None)
+        if label:
+            self.llm_cache.set(key, label)
+        return self._record_llm_intent(message, label)
+
+    async def _aclassify_intent_batched(self, message: str, deadline: Optional[Deadline] = None) -> str:
+        key = self.llm.cache_key(self._classification_prompt(message), CLASSIFY)
+        cached = await asyncio.to_thread(self.llm_cache.get, key)
+        if cached is not None:
+            return self._parse_intent(cached)
+        label = await self.intent_batcher.aclassify(message, deadline.remaining() if deadline else None)
+        if label:
+            await asyncio.to_thread(self.llm_cache.set, key, label)
+        return self._record_llm_intent(message, label)
+
+    def _classification_prompt(self, message: str) -> str:
+        return f"""Analise esta mensagem e classifique a intenção:
     
             Mensagem: "{message}"
     
@@ -384,16 +924,26 @@ class CareerAgent:
             - OUTROS: Qualquer outro assunto não listado
     
             Intenção:"""
-            
-            response = self._query_llm(prompt).strip().upper()
-            
-            # Validação da resposta do LLM
-            valid_intents = ["VAGAS", "CURRICULO", "SALARIO", "PLANO"]
-            return response if response in valid_intents else "OUTROS"
-            
-        except Exception as e:
-            logger.error(f"Erro na classificação: {str(e)}")
-            return "OUTROS"  
+
+    _WORD_RE = re.compile(r"[A-Z]+")
+
+    def _first_intent_label(self, text: str) -> Optional[str]:
+        """Primeiro rótulo válido no texto (mesmo parcial): 'Vagas.' / 'Intenção: SALÁRIO ...' -> rótulo"""
+        for word in self._WORD_RE.findall(fold(text).upper()):
+            if word in self.LLM_INTENTS:
+                return word
+        return None
+
+    def _parse_intent(self, response: str) -> str:
+        """Validação da resposta do LLM"""
+        return self._first_intent_label(response) or "OUTROS"
+
+    def _record_llm_intent(self, message: str, response: str) -> str:
+        """Valida o rótulo do LLM e, se for uma resposta limpa, registra para treino"""
+        intent = self._parse_intent(response)
+        if fold(response).upper().strip(" .:!*\"'") in self.LLM_INTENTS:
+            self._log_intent(message.lower().strip(), intent, "llm")
+        return intent
               
             
     def _local_fallback(self, message: str) -> str:
@@ -412,23 +962,20 @@ class CareerAgent:
 
     
     def _seed_initial_data(self, conn):  
+        """Vagas de exemplo; idempotente (upsert pela job_key derivada do link)"""
         try:
             cursor = conn.cursor()
             
-            # Verificação final antes da inserção
-            cursor.execute("SELECT company FROM jobs LIMIT 1")
             jobs = [
-                (1, "Desenvolvedor Frontend", "Tech Solutions", "React/TypeScript", "R$ 8.000", "https://exemplo.com/vaga1"),
-                (2, "Engenheiro de Dados", "Data Corp", "Python/SQL", "R$ 12.000", "https://exemplo.com/vaga2"),
-                (3, "Cientista de Dados", "AI Tech", "Python/Pandas", "R$ 15.000", "https://exemplo.com/vaga3"),
-                (4, "Arquiteto Backend", "Cloud Systems", "Java/Micronaut/AWS", "R$ 18.000", "https://exemplo.com/arquiteto"),
-                (5, "Desenvolvedor Java Pleno", "Tech Innovations", "Java/Spring/Hibernate", "R$ 12.000", "https://exemplo.com/java")
+                ("Desenvolvedor Frontend", "Tech Solutions", "React/TypeScript", "R$ 8.000", "https://exemplo.com/vaga1", "São Paulo, SP"),
+                ("Engenheiro de Dados", "Data Corp", "Python/SQL", "R$ 12.000", "https://exemplo.com/vaga2", "Rio de Janeiro, RJ"),
+                ("Cientista de Dados", "AI Tech", "Python/Pandas", "R$ 15.000", "https://exemplo.com/vaga3", "Campinas, SP"),
+                ("Arquiteto Backend", "Cloud Systems", "Java/Micronaut/AWS", "R$ 18.000", "https://exemplo.com/arquiteto", "São Paulo, SP"),
+                ("Desenvolvedor Java Pleno", "Tech Innovations", "Java/Spring/Hibernate", "R$ 12.000", "https://exemplo.com/java", "Osasco, SP")
             ]
             
-            cursor.executemany(
-                "INSERT INTO jobs (id, title, company, skills, salary, link) VALUES (?, ?, ?, ?, ?, ?)",
-                jobs
-            )
+            # Skills e salário normalizados na escrita: nenhuma análise de texto na consulta
+            upsert_jobs(cursor, jobs)
             conn.commit()
             logger.info(f"Dados iniciais inseridos: {len(jobs)} vagas") 
                       
@@ -437,20 +984,76 @@ class CareerAgent:
             raise    
         
     
-    @lru_cache(maxsize=100)
-    def _query_llm(self, prompt: str) -> str:
-        try:
-            response = self.client.chat_completion(
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=900
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            logger.error(f"Erro API: {str(e)}")
-            return ""
+    def ingest_jobs(self, path: str, fmt: Optional[str] = None, batch_size: int = BATCH_SIZE) -> Dict[str, float]:
+        """Carga em massa de um feed CSV/JSONL (em streaming) pela conexão de escrita do pool"""
+        stats = {}
+        report = ingest(self.db, read_jobs(path, fmt, stats), batch_size)
+        return dict(report, skipped=stats.get("skipped", 0))
+
+    def metrics(self) -> Dict[str, float]:
+        """Contadores de cache, admissão e deduplicação de chamadas ao LLM, cache de vagas e gauges do pool do banco"""
+        return {
+            **{f"llm_cache_{k}": v for k, v in self.llm_cache.stats().items()},
+            **self.llm_gate.stats(),
+            **{f"llm_singleflight_{k}": v for k, v in self.llm_flights.stats().items()},
+            **{f"llm_router_{k}": v for k, v in self.llm.stats().items()},
+            **self._model_metrics(),
+            **({f"intent_batch_{k}": v for k, v in self.intent_batcher.stats().items()}
+               if self.intent_batcher is not None else {}),
+            **{f"db_{k}": v for k, v in self.db.stats().items()},
+            **{f"result_cache_{k}": v for k, v in self.results.stats().items()},
+            **({f"feed_sync_{k}": v for k, v in self.feed_sync.stats().items()}
+               if self.feed_sync is not None else {}),
+            **({f"job_index_{k}": v for k, v in self.job_index.stats().items()}
+               if self.job_index is not None else {})
+        }
+
+    def _model_metrics(self) -> Dict[str, float]:
+        """EWMA de latência/erro por modelo (alias) e tarefa; disjuntor e hedge por modelo"""
+        metrics = {}
+        for (model, task), health in self.llm.health.items():
+            metrics.update({f"llm_model_{model_alias(model)}_{task}_{k}": v for k, v in health.stats().items()})
+        for client in self.llm.clients:
+            alias = model_alias(client.model)
+            metrics.update({f"llm_circuit_{alias}_{k}": v for k, v in client.breaker.stats().items()})
+            if client.hedger is not None:
+                metrics.update({f"llm_hedge_{alias}_{k}": v for k, v in client.hedger.stats().items()})
+        return metrics
+
+    def _query_llm(self, prompt: str, deadline: Optional[Deadline] = None, task: str = GENERATE,
+                   profile: Optional[GenerationProfile] = None) -> str:
+        """Consulta o modelo da tarefa passando pelo cache L1/L2; falhas ficam em cache negativo"""
+        return self.llm.complete(prompt, deadline, task, profile)
+
+    def _stream_llm(self, prompt: str, deadline: Optional[Deadline] = None) -> Iterator[str]:
+        """Gera os trechos do LLM conforme chegam; um cache hit sai de uma vez"""
+        return self.llm.stream(prompt, deadline)
 
     def enhanced_respond(self, message: str, history: list) -> dict:
-        return {"role": "assistant", "content": self._query_llm(message)}
+        try:
+            return {"role": "assistant", "content": self._query_llm(message, Deadline(self.request_budget))}
+        except (CircuitOpenError, DeadlineExceeded):
+            return {"role": "assistant", "content": self._local_fallback(message)}
+
+    def enhanced_respond_stream(self, message: str, history: list) -> Iterator[dict]:
+        content = ""
+        try:
+            for delta in self._stream_llm(message, Deadline(self.request_budget)):
+                content += delta
+                yield {"role": "assistant", "content": content}
+        except (CircuitOpenError, DeadlineExceeded):
+            if not content:
+                yield {"role": "assistant", "content": self._local_fallback(message)}
+
+    async def async_enhanced_respond_stream(self, message: str, history: list) -> AsyncIterator[dict]:
+        content = ""
+        try:
+            async for delta in self.llm.astream(message, Deadline(self.request_budget)):
+                content += delta
+                yield {"role": "assistant", "content": content}
+        except (CircuitOpenError, DeadlineExceeded):
+            if not content:
+                yield {"role": "assistant", "content": self._local_fallback(message)}
 
     def _generate_resume_template(self, stack: str) -> str:
         templates = {
@@ -559,6 +1162,6 @@ class CareerAgent:
         """
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     agent = CareerAgent()
-    print(agent.client)  
-    print(agent.conn)    
\ No newline at end of file
+    logger.info(f"Cliente de inferência: {agent.client}")
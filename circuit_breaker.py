@@ -0,0 +1,126 @@
+import time
+import threading
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+
+class CircuitOpenError(RuntimeError):
+    """Circuito aberto: o LLM está degradado e a chamada nem é tentada"""
+
+
+class CircuitBreaker:
+    """
+    Disjuntor das chamadas ao LLM.
+    Fechado: registra as chamadas dos últimos `window` segundos; com pelo menos
+    `min_calls`, abre se a taxa de erro passar de `failure_rate` ou a de chamadas
+    lentas (acima de `slow_call` segundos) passar de `slow_rate`.
+    Aberto: rejeita na hora (CircuitOpenError) por `open_for` segundos.
+    Meio-aberto: deixa passar `probes` chamadas de teste; se todas derem certo
+    o circuito fecha, se uma falhar (ou for lenta) volta a abrir.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 0, 1, 2
+    _NAMES = {CLOSED: "closed", OPEN: "open", HALF_OPEN: "half_open"}
+
+    def __init__(self, failure_rate: float = 0.5, slow_rate: float = 0.5, slow_call: float = 10.0,
+                 min_calls: int = 10, window: float = 60.0, open_for: float = 30.0, probes: int = 1):
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_call = slow_call
+        self.min_calls = min_calls
+        self.window = window
+        self.open_for = open_for
+        self.probes = probes
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._calls: Deque[Tuple[float, bool, bool]] = deque()  # (instante, falhou, lenta)
+        self._failures = 0
+        self._slow = 0
+        self._probes_started = 0
+        self._probes_ok = 0
+        self._stats = {"opened": 0, "rejected": 0, "failures": 0, "slow_calls": 0}
+
+    def before_call(self):
+        """Reserva a chamada ou levanta CircuitOpenError (sem I/O, microssegundos)"""
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.open_for:
+                    self._stats["rejected"] += 1
+                    raise CircuitOpenError(f"Circuito do LLM aberto há {time.monotonic() - self._opened_at:.0f}s")
+                self._state = self.HALF_OPEN
+                self._probes_started = self._probes_ok = 0
+            if self._state == self.HALF_OPEN:
+                if self._probes_started >= self.probes:
+                    self._stats["rejected"] += 1
+                    raise CircuitOpenError("Circuito do LLM meio-aberto: aguardando chamada de teste")
+                self._probes_started += 1
+
+    def record(self, ok: bool, duration: float):
+        """Resultado de uma chamada admitida por before_call"""
+        failed, slow = not ok, ok and duration > self.slow_call
+        now = time.monotonic()
+        with self._lock:
+            self._stats["failures"] += failed
+            self._stats["slow_calls"] += slow
+            if self._state == self.HALF_OPEN:
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self._probes_ok += 1
+                    if self._probes_ok >= self.probes:
+                        self._state = self.CLOSED
+                        self._reset()
+                return
+            if self._state == self.OPEN:
+                # Chamada admitida antes de o circuito abrir: só conta nas estatísticas
+                return
+
+            self._calls.append((now, failed, slow))
+            self._failures += failed
+            self._slow += slow
+            self._expire(now)
+            calls = len(self._calls)
+            if calls >= self.min_calls and (self._failures / calls >= self.failure_rate
+                                            or self._slow / calls >= self.slow_rate):
+                self._open(now)
+
+    def release(self):
+        """Chamada admitida que não chegou ao upstream (ex.: fila do gate cheia)"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes_started > 0:
+                self._probes_started -= 1
+
+    def _expire(self, now: float):
+        while self._calls and now - self._calls[0][0] > self.window:
+            _, failed, slow = self._calls.popleft()
+            self._failures -= failed
+            self._slow -= slow
+
+    def _open(self, now: float):
+        self._state = self.OPEN
+        self._opened_at = now
+        self._stats["opened"] += 1
+        self._reset()
+
+    def _reset(self):
+        self._calls.clear()
+        self._failures = self._slow = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_for:
+                return self._NAMES[self.HALF_OPEN]
+            return self._NAMES[self._state]
+
+    def stats(self) -> Dict[str, float]:
+        """state: 0 fechado, 1 aberto, 2 meio-aberto (gauge); o resto são contadores"""
+        with self._lock:
+            self._expire(time.monotonic())
+            calls = len(self._calls)
+            return dict(
+                self._stats, state=self._state, window_calls=calls,
+                failure_rate=round(self._failures / calls, 3) if calls else 0.0,
+                slow_rate=round(self._slow / calls, 3) if calls else 0.0,
+            )
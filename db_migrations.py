@@ -0,0 +1,206 @@
+import os
+import sqlite3
+import logging
+from contextlib import contextmanager
+from typing import List
+
+from job_store import backfill_content_hashes, backfill_job_keys, refresh_skill_weights
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Cada migração é uma lista de comandos (SQL ou função que recebe a conexão)
+# aplicados em uma única transação.
+# Nunca edite uma migração já publicada: acrescente uma nova versão.
+MIGRATIONS = [
+    (1, "tabela jobs e metadados", [
+        """
+        CREATE TABLE jobs (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            company TEXT NOT NULL,
+            skills TEXT,
+            salary TEXT,
+            salary_min INTEGER,
+            salary_max INTEGER,
+            salary_currency TEXT,
+            link TEXT
+        )
+        """,
+        "CREATE UNIQUE INDEX idx_jobs_link ON jobs(link)",
+        "CREATE INDEX idx_jobs_salary ON jobs(salary_max DESC)",
+        "CREATE TABLE schema_meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID",
+    ]),
+    (2, "índice FTS5 sincronizado por triggers", [
+        """
+        CREATE VIRTUAL TABLE jobs_fts USING fts5(
+            title, company, skills,
+            content='jobs', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER jobs_fts_ai AFTER INSERT ON jobs BEGIN
+            INSERT INTO jobs_fts(rowid, title, company, skills)
+            VALUES (new.id, new.title, new.company, new.skills);
+        END
+        """,
+        """
+        CREATE TRIGGER jobs_fts_ad AFTER DELETE ON jobs BEGIN
+            INSERT INTO jobs_fts(jobs_fts, rowid, title, company, skills)
+            VALUES ('delete', old.id, old.title, old.company, old.skills);
+        END
+        """,
+        """
+        CREATE TRIGGER jobs_fts_au AFTER UPDATE ON jobs BEGIN
+            INSERT INTO jobs_fts(jobs_fts, rowid, title, company, skills)
+            VALUES ('delete', old.id, old.title, old.company, old.skills);
+            INSERT INTO jobs_fts(rowid, title, company, skills)
+            VALUES (new.id, new.title, new.company, new.skills);
+        END
+        """,
+    ]),
+    (3, "skills normalizadas", [
+        """
+        CREATE TABLE skills (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+        """,
+        # PK (skill_id, job_id) é o índice de cobertura para skill -> vagas;
+        # salary_max é copiado de jobs para filtrar/ordenar por salário dentro do índice
+        """
+        CREATE TABLE job_skills (
+            skill_id INTEGER NOT NULL REFERENCES skills(id),
+            job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+            salary_max INTEGER,
+            PRIMARY KEY (skill_id, job_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX idx_job_skills_job ON job_skills(job_id, skill_id)",
+        "CREATE INDEX idx_job_skills_salary ON job_skills(skill_id, salary_max DESC, job_id)",
+        """
+        CREATE TABLE stack_skills (
+            stack TEXT NOT NULL,
+            skill_id INTEGER NOT NULL REFERENCES skills(id),
+            PRIMARY KEY (stack, skill_id)
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (4, "chave estável da vaga derivada do link", [
+        "ALTER TABLE jobs ADD COLUMN job_key TEXT",
+        backfill_job_keys,
+        "DROP INDEX idx_jobs_link",
+        "CREATE UNIQUE INDEX idx_jobs_key ON jobs(job_key)",
+    ]),
+    (5, "origem, hash de conteúdo e estado dos feeds sincronizados", [
+        "ALTER TABLE jobs ADD COLUMN content_hash TEXT",
+        "ALTER TABLE jobs ADD COLUMN source TEXT",
+        backfill_content_hashes,
+        # Cobre o diff do sync: (job_key, content_hash) de um feed sem tocar na tabela
+        "CREATE INDEX idx_jobs_source ON jobs(source, job_key, content_hash)",
+        """
+        CREATE TABLE feed_state (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            last_sync REAL,
+            last_status INTEGER
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (6, "pesos IDF das skills para ranquear vagas", [
+        "ALTER TABLE skills ADD COLUMN idf REAL NOT NULL DEFAULT 1.0",
+        "ALTER TABLE jobs ADD COLUMN skill_norm2 REAL NOT NULL DEFAULT 0",
+        refresh_skill_weights,
+    ]),
+    (7, "localização das vagas e índice espacial R*Tree", [
+        "ALTER TABLE jobs ADD COLUMN location TEXT",
+        "ALTER TABLE jobs ADD COLUMN lat REAL",
+        "ALTER TABLE jobs ADD COLUMN lon REAL",
+        # Pontos como caixas degeneradas; id = jobs.id
+        "CREATE VIRTUAL TABLE job_geo USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+        """
+        CREATE TRIGGER jobs_geo_ai AFTER INSERT ON jobs WHEN new.lat IS NOT NULL BEGIN
+            INSERT INTO job_geo VALUES (new.id, new.lat, new.lat, new.lon, new.lon);
+        END
+        """,
+        """
+        CREATE TRIGGER jobs_geo_ad AFTER DELETE ON jobs BEGIN
+            DELETE FROM job_geo WHERE id = old.id;
+        END
+        """,
+        """
+        CREATE TRIGGER jobs_geo_au AFTER UPDATE OF lat, lon ON jobs
+        WHEN old.lat IS NOT new.lat OR old.lon IS NOT new.lon BEGIN
+            DELETE FROM job_geo WHERE id = old.id;
+            INSERT INTO job_geo SELECT new.id, new.lat, new.lat, new.lon, new.lon WHERE new.lat IS NOT NULL;
+        END
+        """,
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> List[int]:
+    """Aplica as migrações pendentes (uma transação cada); retorna as versões aplicadas"""
+    current = schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(f"Banco na versão {current}, código conhece até {SCHEMA_VERSION}")
+
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Falha na migração {version} ({description})")
+            raise
+        logger.info(f"Migração {version} aplicada: {description}")
+        applied.append(version)
+    return applied
+
+
+@contextmanager
+def db_file_lock(db_path: str):
+    """Lock exclusivo entre processos para inicialização/migração do banco"""
+    if fcntl is None:
+        yield
+        return
+    # Fora do padrão '<db>*' que _nuke_database apaga
+    lock_path = os.path.join(os.path.dirname(db_path), f".{os.path.basename(db_path)}.lock")
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def ensure_schema(db_path: str) -> List[int]:
+    """Migra o banco em `db_path` sob o lock de arquivo (uso pelas ferramentas de linha de comando)"""
+    with db_file_lock(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            return migrate(conn)
+        finally:
+            conn.close()
@@ -0,0 +1,156 @@
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(RuntimeError):
+    """Nenhuma conexão livre dentro do tempo de espera"""
+
+
+class ConnectionPool:
+    """
+    Pool limitado de conexões SQLite: até `max_readers` conexões somente
+    leitura e uma única conexão de escrita. PRAGMAs rodam uma vez por conexão;
+    leitoras ociosas por mais de `idle_timeout` segundos são fechadas.
+    """
+
+    def __init__(self, db_path: str, max_readers: int = 8, idle_timeout: float = 300,
+                 acquire_timeout: float = 10):
+        self.db_path = db_path
+        self.max_readers = max_readers
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self._cond = threading.Condition()
+        self._idle: List[Tuple[sqlite3.Connection, float]] = []
+        self._readers_open = 0
+        self._readers_in_use = 0
+        self._readers_waiting = 0
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._writer_waiting = 0
+        self._writer_in_use = False
+        self._writes = 0
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        if readonly:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True,
+                                   timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA query_only = 1")
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA foreign_keys = 1")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def _evict_idle(self, now: float) -> List[sqlite3.Connection]:
+        """Retira do pool as leitoras ociosas há muito tempo (chamado com o lock)"""
+        stale = [conn for conn, since in self._idle if now - since > self.idle_timeout]
+        if stale:
+            self._idle = [(conn, since) for conn, since in self._idle if now - since <= self.idle_timeout]
+            self._readers_open -= len(stale)
+        return stale
+
+    @contextmanager
+    def reader(self):
+        """Conexão somente leitura emprestada do pool"""
+        deadline = time.monotonic() + self.acquire_timeout
+        conn, create = None, False
+        with self._cond:
+            stale = self._evict_idle(time.monotonic())
+            while conn is None and not create:
+                if self._idle:
+                    conn = self._idle.pop()[0]
+                elif self._readers_open < self.max_readers:
+                    self._readers_open += 1
+                    create = True
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(f"Sem conexão de leitura após {self.acquire_timeout}s")
+                    self._readers_waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._readers_waiting -= 1
+            self._readers_in_use += 1
+
+        for old in stale:
+            old.close()
+        if create:
+            try:
+                conn = self._connect(readonly=True)
+            except Exception:
+                with self._cond:
+                    self._readers_open -= 1
+                    self._readers_in_use -= 1
+                    self._cond.notify()
+                raise
+
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            with self._cond:
+                self._readers_in_use -= 1
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    @contextmanager
+    def writer(self):
+        """A conexão de escrita (exclusiva); commit ao sair, rollback em erro"""
+        with self._cond:
+            self._writer_waiting += 1
+        acquired = self._writer_lock.acquire(timeout=self.acquire_timeout)
+        with self._cond:
+            self._writer_waiting -= 1
+        if not acquired:
+            raise PoolTimeoutError(f"Sem conexão de escrita após {self.acquire_timeout}s")
+        try:
+            if self._writer is None:
+                self._writer = self._connect(readonly=False)
+            self._writer_in_use = True
+            try:
+                yield self._writer
+                self._writer.commit()
+                self._writes += 1
+            except BaseException:
+                self._writer.rollback()
+                raise
+        finally:
+            self._writer_in_use = False
+            self._writer_lock.release()
+
+    @property
+    def writes(self) -> int:
+        """Quantas vezes a escritora confirmou (invalida caches do mesmo processo)"""
+        return self._writes
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "readers_open": self._readers_open,
+                "readers_in_use": self._readers_in_use,
+                "readers_waiting": self._readers_waiting,
+                "writer_in_use": int(self._writer_in_use),
+                "writer_waiting": self._writer_waiting,
+                "writes": self._writes,
+            }
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._readers_open -= len(idle)
+        for conn, _ in idle:
+            conn.close()
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
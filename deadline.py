@@ -0,0 +1,45 @@
+import time
+import sqlite3
+from contextlib import contextmanager
+
+
+class DeadlineExceeded(TimeoutError):
+    """O orçamento de tempo da requisição acabou antes da etapa terminar"""
+
+
+class Deadline:
+    """
+    Orçamento de tempo de uma requisição: criado na entrada (safe_respond e
+    afins) e repassado às etapas. Cada etapa usa só o que resta, seja na espera
+    por vaga no gate, no timeout da chamada ao LLM ou na interrupção de uma
+    consulta SQLite, então a latência total tem um teto.
+    """
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self, stage: str):
+        if self.expired:
+            raise DeadlineExceeded(f"Prazo de {self.budget:g}s esgotado antes de: {stage}")
+
+    @contextmanager
+    def guard(self, conn: sqlite3.Connection, stage: str = "consulta ao banco", every: int = 1000):
+        """Interrompe a consulta em andamento em `conn` (progress handler) quando o prazo acaba"""
+        self.check(stage)
+        conn.set_progress_handler(lambda: self.expired, every)
+        try:
+            yield conn
+        except sqlite3.OperationalError as e:
+            if self.expired:
+                raise DeadlineExceeded(f"Prazo de {self.budget:g}s esgotado durante: {stage}") from e
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
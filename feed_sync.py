@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import httpx
+
+from db_migrations import ensure_schema
+from db_pool import ConnectionPool
+from job_ingest import detect_format, parse_jobs
+from job_store import content_hash, job_key, maybe_refresh_skill_weights, upsert_jobs
+
+logger = logging.getLogger(__name__)
+
+
+class FeedSyncWorker:
+    """
+    Mantém `jobs` em dia com feeds externos (CSV/JSONL via HTTP) numa thread
+    própria. Cada rodada faz GET condicional (ETag / If-Modified-Since), compara
+    o feed com as vagas daquela origem pelo hash de conteúdo e grava só o delta
+    (inserções, atualizações e expirações) em lotes pela escritora do pool;
+    as leitoras das requisições nunca esperam pela sincronização.
+    """
+
+    def __init__(self, pool: ConnectionPool, feeds: List[str], interval: float = 300,
+                 batch_size: int = 1000, timeout: float = 30):
+        self.pool = pool
+        self.feeds = list(feeds)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {"runs": 0, "not_modified": 0, "errors": 0,
+                       "inserted": 0, "updated": 0, "expired": 0, "unchanged": 0}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="feed-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sync_all()
+            self._stop.wait(self.interval)
+
+    def sync_all(self) -> List[Dict]:
+        results = []
+        for url in self.feeds:
+            try:
+                results.append(self.sync(url))
+            except Exception as e:
+                with self._lock:
+                    self._stats["errors"] += 1
+                logger.error(f"Falha ao sincronizar feed {url}: {str(e)}")
+        return results
+
+    def sync(self, url: str) -> Dict:
+        """Uma rodada de sincronização de um feed; retorna as contagens do delta"""
+        with self.pool.reader() as conn:
+            state = conn.execute("SELECT etag, last_modified FROM feed_state WHERE url = ?", (url,)).fetchone()
+        headers = {}
+        if state and state[0]:
+            headers["If-None-Match"] = state[0]
+        if state and state[1]:
+            headers["If-Modified-Since"] = state[1]
+
+        result = {"url": url, "status": None, "inserted": 0, "updated": 0, "expired": 0, "unchanged": 0}
+        with httpx.Client(timeout=self.timeout, follow_redirects=True) as client:
+            with client.stream("GET", url, headers=headers) as response:
+                result["status"] = response.status_code
+                if response.status_code == 304:
+                    self._save_state(url, state[0] if state else None, state[1] if state else None, 304)
+                    self._record(result, not_modified=True)
+                    return result
+                response.raise_for_status()
+                fmt = "csv" if "csv" in response.headers.get("content-type", "") else detect_format(url.split("?")[0])
+                self._merge(url, parse_jobs(response.iter_lines(), fmt), result)
+                self._save_state(url, response.headers.get("etag"), response.headers.get("last-modified"),
+                                 response.status_code)
+
+        self._record(result)
+        logger.info(f"Feed {url}: +{result['inserted']} ~{result['updated']} -{result['expired']} "
+                    f"({result['unchanged']} sem mudança)")
+        return result
+
+    def _merge(self, url: str, jobs, result: Dict):
+        """Diff por hash de conteúdo contra as vagas desta origem; grava só o que mudou"""
+        with self.pool.reader() as conn:
+            existing = dict(conn.execute(
+                "SELECT job_key, content_hash FROM jobs WHERE source = ?", (url,)
+            ).fetchall())
+
+        seen, batch = set(), []
+        for job in jobs:
+            key = job_key(job[4], job[0], job[1])
+            if key in seen:
+                continue
+            seen.add(key)
+            current = existing.get(key)
+            if current == content_hash(job):
+                result["unchanged"] += 1
+                continue
+            result["updated" if current is not None else "inserted"] += 1
+            batch.append(job)
+            if len(batch) >= self.batch_size:
+                self._write(url, batch)
+                batch = []
+        if batch:
+            self._write(url, batch)
+
+        # Só expira depois de ler o feed inteiro: feed truncado levanta antes daqui
+        expired = [key for key in existing if key not in seen]
+        for start in range(0, len(expired), self.batch_size):
+            chunk = expired[start:start + self.batch_size]
+            with self.pool.writer() as conn:
+                conn.execute(
+                    f"DELETE FROM jobs WHERE source = ? AND job_key IN ({','.join('?' * len(chunk))})",
+                    [url] + chunk
+                )
+        result["expired"] = len(expired)
+        if result["inserted"] or result["updated"] or result["expired"]:
+            with self.pool.writer() as conn:
+                maybe_refresh_skill_weights(conn)
+
+    def _write(self, url: str, batch: List[tuple]):
+        with self.pool.writer() as conn:
+            upsert_jobs(conn.cursor(), batch, source=url)
+
+    def _save_state(self, url: str, etag: Optional[str], last_modified: Optional[str], status: int):
+        with self.pool.writer() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO feed_state (url, etag, last_modified, last_sync, last_status) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, time.time(), status)
+            )
+
+    def _record(self, result: Dict, not_modified: bool = False):
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["not_modified"] += int(not_modified)
+            for key in ("inserted", "updated", "expired", "unchanged"):
+                self._stats[key] += result[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
+def serve_feed(path: str, port: int = 8765, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Feed local de teste: serve `path` com ETag e Last-Modified do arquivo e
+    responde 304 a requisições condicionais. Edite o arquivo para simular mudanças.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            stat = os.stat(path)
+            etag = '"' + hashlib.md5(f"{stat.st_mtime_ns}-{stat.st_size}".encode()).hexdigest() + '"'
+            last_modified = formatdate(stat.st_mtime, usegmt=True)
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            with open(path, "rb") as f:
+                body = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv" if detect_format(path) == "csv" else "application/x-ndjson")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sincronização incremental de feeds de vagas")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_cmd = sub.add_parser("serve", help="Serve um arquivo CSV/JSONL como feed HTTP local")
+    serve_cmd.add_argument("path")
+    serve_cmd.add_argument("--port", type=int, default=8765)
+
+    sync_cmd = sub.add_parser("sync", help="Sincroniza os feeds uma vez")
+    sync_cmd.add_argument("urls", nargs="+")
+    sync_cmd.add_argument("--db", default=os.getenv("CAREER_AGENT_DB_PATH", "/tmp/career_agent.db"))
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = serve_feed(os.path.abspath(args.path), args.port)
+        print(f"Servindo {args.path} em http://127.0.0.1:{args.port}/feed")
+        server.serve_forever()
+        return 0
+
+    db_path = os.path.abspath(args.db)
+    ensure_schema(db_path)
+    pool = ConnectionPool(db_path, max_readers=1)
+    try:
+        for result in FeedSyncWorker(pool, args.urls).sync_all():
+            print(result)
+    finally:
+        pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import os
+import re
+import csv
+import math
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.csv")
+# km por grau de latitude (e de longitude no equador)
+KM_PER_DEGREE = math.radians(1) * 6371.0
+
+
+class Place(NamedTuple):
+    city: str
+    state: str
+    lat: float
+    lon: float
+
+    @property
+    def label(self) -> str:
+        return f"{self.city}/{self.state}"
+
+
+def fold(text: str) -> str:
+    """Minúsculas, sem acentos e com espaços colapsados (chave de busca)"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return " ".join("".join(ch for ch in text if not unicodedata.combining(ch)).split())
+
+
+class Gazetteer:
+    """
+    Cidades brasileiras com coordenadas, lidas do CSV empacotado com o app
+    (city, state, lat, lon, aliases). Sem rede: geocodifica "Cidade, UF" na
+    ingestão e encontra a cidade citada numa mensagem ("vagas em São Paulo").
+    """
+
+    def __init__(self, path: str = GAZETTEER_PATH):
+        self.places: List[Place] = []
+        self._by_name: Dict[str, List[Place]] = {}
+        with open(path, encoding="utf-8", newline="") as f:
+            for record in csv.DictReader(f):
+                place = Place(record["city"], record["state"], float(record["lat"]), float(record["lon"]))
+                self.places.append(place)
+                aliases = [alias for alias in (record.get("aliases") or "").split(";") if alias.strip()]
+                for name in [place.city] + aliases:
+                    self._by_name.setdefault(fold(name), []).append(place)
+
+        # Nomes mais longos primeiro: "são josé dos campos" antes de "são josé"
+        names = "|".join(re.escape(name) for name in sorted(self._by_name, key=len, reverse=True))
+        states = "|".join(sorted({place.state.lower() for place in self.places}))
+        state = rf"(?:\s*[-/,(]\s*({states})\b\)?)?"
+        # Na mensagem, a cidade precisa de uma preposição de lugar ou da UF
+        # ("em Santos", "Santos/SP"), para não confundir "Natal" ou "Serra" com outra coisa
+        self._message_re = re.compile(
+            r"\b(?:em|no|na|perto de|proximo (?:de|do|da|a|ao)|regiao de|arredores de)\s+"
+            rf"(?:(?:o|a)\s+)?({names})\b{state}"
+        )
+        self._with_state_re = re.compile(rf"\b({names})\s*[-/]\s*({states})\b")
+        self._location_re = re.compile(r"^(.*?)(?:\s*[-/,(]\s*([a-z]{2})\)?)?$")
+
+    def _lookup(self, name: str, state: Optional[str] = None) -> Optional[Place]:
+        places = self._by_name.get(name.strip())
+        if not places:
+            return None
+        if state:
+            places = [place for place in places if place.state.lower() == state] or places
+        return places[0]
+
+    def geocode(self, location: Optional[str]) -> Optional[Place]:
+        """'São Paulo, SP' / 'Sao Paulo - SP' / 'São Paulo/SP' / 'São Paulo' -> Place (ou None)"""
+        if not location:
+            return None
+        match = self._location_re.match(fold(location))
+        return self._lookup(match.group(1), match.group(2))
+
+    def find(self, message: str) -> Optional[Place]:
+        """Cidade citada na mensagem, se houver"""
+        text = fold(message)
+        match = self._message_re.search(text) or self._with_state_re.search(text)
+        return self._lookup(match.group(1), match.group(2)) if match else None
+
+
+@lru_cache(maxsize=1)
+def default_gazetteer() -> Gazetteer:
+    return Gazetteer()
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) que contém o círculo de raio `radius_km`"""
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
@@ -0,0 +1,77 @@
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class Hedger:
+    """
+    Política de hedge das chamadas ao LLM: se a resposta não chegou até o
+    quantil `quantile` (p95) das latências observadas, vale mandar uma segunda
+    cópia e ficar com a que responder primeiro.
+    Só decide quando e quanto: a latência vem das últimas `window` chamadas e
+    só há atraso depois de `min_samples` amostras. A taxa de hedge é limitada
+    por um balde de fichas: cada chamada rende `max_rate` ficha (até `burst`)
+    e cada hedge gasta uma, então no máximo ~`max_rate` das chamadas viram duas.
+    Cada tipo de chamada (`kind`, ex.: o perfil de geração) tem a sua janela de
+    latência, já que rótulo curto e texto longo têm p95 bem diferentes; o
+    balde de fichas é um só.
+    """
+
+    def __init__(self, quantile: float = 0.95, max_rate: float = 0.05, min_samples: int = 20,
+                 window: int = 200, min_delay: float = 0.5, burst: float = 2.0):
+        self.quantile = quantile
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.burst = burst
+        self._lock = threading.Lock()
+        self.window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._tokens = 0.0
+        self._delays: Dict[str, float] = {}
+        self._stats = {"calls": 0, "hedged": 0, "wins": 0, "suppressed": 0}
+
+    def begin(self, kind: str = "default") -> Optional[float]:
+        """Conta uma chamada; retorna quanto esperar antes do hedge (None: ainda sem amostras)"""
+        with self._lock:
+            self._stats["calls"] += 1
+            self._tokens = min(self.burst, self._tokens + self.max_rate)
+            return self._delays.get(kind)
+
+    def allow(self) -> bool:
+        """Gasta uma ficha para mandar a cópia; sem ficha, o hedge é suprimido"""
+        with self._lock:
+            if self._tokens < 1:
+                self._stats["suppressed"] += 1
+                return False
+            self._tokens -= 1
+            self._stats["hedged"] += 1
+            return True
+
+    def refund(self):
+        """Hedge autorizado que não saiu (ex.: sem vaga livre no gate)"""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+            self._stats["hedged"] -= 1
+            self._stats["suppressed"] += 1
+
+    def record(self, latency: float, hedge_won: bool = False, kind: str = "default"):
+        """Latência (até a primeira resposta) de uma chamada bem-sucedida"""
+        with self._lock:
+            self._stats["wins"] += hedge_won
+            latencies = self._latencies.setdefault(kind, deque(maxlen=self.window))
+            latencies.append(latency)
+            if len(latencies) >= self.min_samples:
+                ordered = sorted(latencies)
+                self._delays[kind] = max(self.min_delay, ordered[int(self.quantile * (len(ordered) - 1))])
+
+    def stats(self) -> Dict[str, float]:
+        """wins: hedges que responderam antes da chamada original (o hedge ajudou)"""
+        with self._lock:
+            calls, hedged = self._stats["calls"], self._stats["hedged"]
+            return dict(
+                self._stats,
+                **{f"delay_{kind}_ms": round(delay * 1000) for kind, delay in self._delays.items()},
+                rate=round(hedged / calls, 3) if calls else 0.0,
+                win_rate=round(self._stats["wins"] / hedged, 3) if hedged else 0.0,
+            )
@@ -0,0 +1,155 @@
+import re
+import time
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from deadline import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+_LINE_RE = re.compile(r"^\s*(\d+)\s*[:.)\-]\s*\**\s*([A-ZÇÃÁÉÍÓÚ]+)", re.MULTILINE)
+
+
+class _Pending:
+    __slots__ = ("message", "enqueued_at", "event", "loop", "future", "result", "error")
+
+    def __init__(self, message: str, loop=None, future=None):
+        self.message = message
+        self.enqueued_at = time.monotonic()
+        self.event = threading.Event() if future is None else None
+        self.loop = loop
+        self.future = future
+        self.result = None
+        self.error = None
+
+
+class IntentBatcher:
+    """
+    Micro-batching da classificação de intenção via LLM.
+    Junta os pedidos pendentes por até `max_delay` segundos (ou até `max_batch`
+    pedidos) e envia um único prompt que classifica todas as mensagens.
+    """
+
+    def __init__(self, complete: Callable[[str], str], max_batch: int = 8, max_delay: float = 0.02,
+                 max_in_flight: int = 4):
+        self.complete = complete
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        # Lotes em voo não bloqueiam a coleta do próximo lote
+        self._executor = ThreadPoolExecutor(max_in_flight, thread_name_prefix="intent-batch")
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "requests": 0, "max_batch_size": 0,
+                       "delay_ms_total": 0.0, "delay_ms_max": 0.0}
+        self._worker = threading.Thread(target=self._run, name="intent-batcher", daemon=True)
+        self._worker.start()
+
+    def classify(self, message: str, timeout: Optional[float] = None) -> str:
+        """Bloqueia até o lote da mensagem voltar (ou `timeout`); retorna o rótulo bruto do LLM"""
+        pending = _Pending(message)
+        self._queue.put(pending)
+        if not pending.event.wait(timeout):
+            raise DeadlineExceeded(f"Lote de classificação sem resposta em {timeout:.1f}s")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    async def aclassify(self, message: str, timeout: Optional[float] = None) -> str:
+        """Versão assíncrona: espera o lote sem ocupar uma thread"""
+        loop = asyncio.get_running_loop()
+        pending = _Pending(message, loop, loop.create_future())
+        self._queue.put(pending)
+        done, _ = await asyncio.wait({pending.future}, timeout=timeout)
+        if not done:
+            pending.future.cancel()
+            raise DeadlineExceeded(f"Lote de classificação sem resposta em {timeout:.1f}s")
+        return pending.future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            dispatch_at = batch[0].enqueued_at + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = dispatch_at - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: List[_Pending]):
+        now = time.monotonic()
+        # Atraso adicionado = espera na janela de coleta até o envio do lote
+        delays = [(now - p.enqueued_at) * 1000 for p in batch]
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["requests"] += len(batch)
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(batch))
+            self._stats["delay_ms_total"] += sum(delays)
+            self._stats["delay_ms_max"] = max(self._stats["delay_ms_max"], max(delays))
+
+        try:
+            labels = self.parse(self.complete(self.build_prompt([p.message for p in batch])), len(batch))
+            error = None
+        except Exception as e:
+            logger.error(f"Erro na classificação em lote: {str(e)}")
+            labels, error = [], e
+
+        for i, pending in enumerate(batch):
+            self._resolve(pending, labels[i] if error is None else None, error)
+
+    def _resolve(self, pending: _Pending, result: Optional[str], error: Optional[Exception]):
+        if pending.future is None:
+            pending.result, pending.error = result, error
+            pending.event.set()
+            return
+
+        def settle():
+            if pending.future.done():
+                return
+            if error is not None:
+                pending.future.set_exception(error)
+            else:
+                pending.future.set_result(result)
+        pending.loop.call_soon_threadsafe(settle)
+
+    @staticmethod
+    def build_prompt(messages: List[str]) -> str:
+        numbered = "\n".join(f'{i}: "{msg}"' for i, msg in enumerate(messages, 1))
+        return f"""Classifique a intenção de cada mensagem abaixo.
+
+            Opções:
+            - VAGAS: Perguntas sobre vagas, oportunidades ou processos seletivos
+            - CURRICULO: Pedidos relacionados à criação ou revisão de currículos
+            - SALARIO: Consultas sobre faixas salariais ou benefícios
+            - PLANO: Orientação sobre planejamento de carreira
+            - OUTROS: Qualquer outro assunto não listado
+
+            Responda APENAS com uma linha por mensagem, no formato "<número>: <INTENÇÃO>".
+
+{numbered}
+
+            Intenções:"""
+
+    @staticmethod
+    def parse(response: str, size: int) -> List[str]:
+        """Rótulo por posição; mensagens sem linha na resposta ficam com ''"""
+        labels = [""] * size
+        for match in _LINE_RE.finditer(response.upper()):
+            idx = int(match.group(1)) - 1
+            if 0 <= idx < size and not labels[idx]:
+                labels[idx] = match.group(2)
+        return labels
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_batch_size"] = stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+        stats["avg_delay_ms"] = stats["delay_ms_total"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
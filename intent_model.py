@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import time
+import zlib
+import argparse
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+N_FEATURES = 2 ** 16
+NGRAM_RANGE = (2, 4)
+# Abaixo desta fração de n-gramas conhecidos o modelo não opina (probabilidade uniforme)
+MIN_KNOWN_FRACTION = 0.5
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return f" {' '.join(text.split())} "
+
+
+def featurize(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """N-gramas de caracteres com hashing: (índices, contagens)"""
+    text = _normalize(text)
+    counts = Counter(
+        zlib.crc32(text[i:i + n].encode("utf-8")) % N_FEATURES
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1)
+        for i in range(len(text) - n + 1)
+    )
+    if not counts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return (np.fromiter(counts.keys(), dtype=np.int64, count=len(counts)),
+            np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+
+
+class IntentModel:
+    """Naive Bayes multinomial sobre n-gramas de caracteres (CPU, só NumPy)"""
+
+    def __init__(self, labels: List[str], log_prior: np.ndarray, feature_log_prob: np.ndarray,
+                 known: np.ndarray):
+        self.labels = [str(label) for label in labels]
+        self.log_prior = log_prior.astype(np.float32)
+        self.feature_log_prob = feature_log_prob.astype(np.float32)
+        self.known = known.astype(bool)
+        # Transposta contígua: uma leitura de linha por n-grama na predição
+        self._flp_by_feature = np.ascontiguousarray(self.feature_log_prob.T)
+
+    @classmethod
+    def train(cls, samples: Iterable[Tuple[str, str]], alpha: float = 0.1) -> "IntentModel":
+        samples = list(samples)
+        labels = sorted({label for _, label in samples})
+        index = {label: i for i, label in enumerate(labels)}
+        counts = np.zeros((len(labels), N_FEATURES), dtype=np.float64)
+        docs = np.zeros(len(labels), dtype=np.float64)
+        for text, label in samples:
+            idx, cnt = featurize(text)
+            np.add.at(counts[index[label]], idx, cnt)
+            docs[index[label]] += 1
+
+        smoothed = counts + alpha
+        feature_log_prob = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+        log_prior = np.log(docs / docs.sum())
+        return cls(labels, log_prior, feature_log_prob, counts.sum(axis=0) > 0)
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        idx, cnt = featurize(text)
+        # N-gramas nunca vistos no treino só trariam o viés da suavização
+        mask = self.known[idx]
+        if not mask.any() or cnt[mask].sum() < MIN_KNOWN_FRACTION * cnt.sum():
+            return np.full(len(self.labels), 1.0 / len(self.labels), dtype=np.float32)
+        idx, cnt = idx[mask], cnt[mask]
+        scores = self.log_prior + cnt @ self._flp_by_feature[idx]
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum()
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Rótulo mais provável e sua probabilidade"""
+        proba = self.predict_proba(text)
+        best = int(proba.argmax())
+        return self.labels[best], float(proba[best])
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            np.savez_compressed(f, labels=np.array(self.labels), log_prior=self.log_prior,
+                                feature_log_prob=self.feature_log_prob, known=self.known)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        with np.load(path) as data:
+            return cls(list(data["labels"]), data["log_prior"], data["feature_log_prob"], data["known"])
+
+
+def load_samples(log_path: str, keyword_map: Optional[Dict[str, List[str]]] = None) -> List[Tuple[str, str]]:
+    """Amostras do log de intenções (keyword + LLM) e, opcionalmente, das próprias keywords"""
+    samples = []
+    if keyword_map:
+        samples.extend((kw, label) for label, keywords in keyword_map.items() for kw in keywords)
+    if log_path and os.path.exists(log_path):
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    row = json.loads(line)
+                    samples.append((row["message"], row["label"]))
+    return samples
+
+
+def evaluate(model: IntentModel, samples: List[Tuple[str, str]],
+             thresholds=(0.0, 0.5, 0.7, 0.8, 0.9, 0.95)) -> str:
+    """Relatório de acurácia x cobertura por limiar e latência por mensagem"""
+    predictions, latencies = [], []
+    for text, _ in samples:
+        start = time.perf_counter()
+        predictions.append(model.predict(text))
+        latencies.append((time.perf_counter() - start) * 1e6)
+
+    lat = np.array(latencies)
+    lines = [
+        f"Amostras: {len(samples)}",
+        f"Latência por mensagem: p50={np.percentile(lat, 50):.1f}µs "
+        f"p99={np.percentile(lat, 99):.1f}µs max={lat.max():.1f}µs",
+        "",
+        "limiar  cobertura  acurácia(cobertas)",
+    ]
+    for t in thresholds:
+        covered = [(pred, gold) for (pred, conf), (_, gold) in zip(predictions, samples) if conf >= t]
+        coverage = len(covered) / len(samples) if samples else 0.0
+        accuracy = sum(p == g for p, g in covered) / len(covered) if covered else 0.0
+        lines.append(f"{t:>6.2f}  {coverage:>9.1%}  {accuracy:>18.1%}")
+    lines.append("")
+    lines.append("Mensagens abaixo do limiar continuam indo para o LLM (1–30 s cada).")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classificador local de intenções")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train_cmd = sub.add_parser("train", help="Treina a partir do log de intenções")
+    train_cmd.add_argument("--log", default="/tmp/career_agent_intents.jsonl")
+    train_cmd.add_argument("--out", default="/tmp/career_agent_intent_model.npz")
+    train_cmd.add_argument("--alpha", type=float, default=0.1)
+    train_cmd.add_argument("--holdout", type=float, default=0.2,
+                           help="Fração do log reservada para avaliação")
+
+    eval_cmd = sub.add_parser("evaluate", help="Avalia um modelo salvo contra o log")
+    eval_cmd.add_argument("--log", default="/tmp/career_agent_intents.jsonl")
+    eval_cmd.add_argument("--model", default="/tmp/career_agent_intent_model.npz")
+
+    args = parser.parse_args(argv)
+    from career_agent import CareerAgent
+
+    if args.command == "train":
+        logged = load_samples(args.log)
+        split = int(len(logged) * (1 - args.holdout))
+        train_set = load_samples("", CareerAgent.INTENT_KEYWORDS) + logged[:split]
+        if not train_set:
+            print("Nenhuma amostra para treinar", file=sys.stderr)
+            return 1
+        model = IntentModel.train(train_set, alpha=args.alpha)
+        model.save(args.out)
+        print(f"Modelo salvo em {args.out} ({len(train_set)} amostras, rótulos: {', '.join(model.labels)})")
+        if logged[split:]:
+            print(evaluate(model, logged[split:]))
+    else:
+        print(evaluate(IntentModel.load(args.model), load_samples(args.log)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
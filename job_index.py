@@ -0,0 +1,358 @@
+import sys
+import time
+import random
+import sqlite3
+import logging
+import argparse
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_CHUNK = 500
+_ROW_COLUMNS = ("salary", "title", "company", "skills", "salary_text", "link")
+
+
+class _Interner:
+    """Strings repetidas (empresa, título) viram códigos int32 de um vocabulário"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, items: Iterable[str]) -> np.ndarray:
+        out = []
+        for item in items:
+            code = self.codes.get(item)
+            if code is None:
+                code = self.codes[item] = len(self.values)
+                self.values.append(item)
+            out.append(code)
+        return np.array(out, dtype=np.int32)
+
+
+class _Snapshot:
+    """Colunas imutáveis de uma versão do banco; consultas nunca veem uma troca pela metade"""
+
+    def __init__(self, ids, hashes, norm2, salary, bits, title, company, skills, salary_text, link):
+        self.ids = ids                  # int64, ordenado
+        self.hashes = hashes            # content_hash (U32), para o refresh incremental
+        self.norm2 = norm2              # float64, Σ idf² das skills da vaga
+        self.salary = salary            # int64, salary_max (-1 = sem salário)
+        self.bits = bits                # uint64 (n, palavras): skills da vaga
+        self.title = title              # int32 -> JobIndex._titles
+        self.company = company          # int32 -> JobIndex._companies
+        self.skills = skills            # object: texto original, só para exibir o top-k
+        self.salary_text = salary_text
+        self.link = link
+        self.stack_weights: Dict[str, tuple] = {}  # ver JobIndex._load_stack_weights
+
+
+class JobIndex:
+    """
+    Índice colunar em memória para "vagas da stack X": salário em int64,
+    skills como matriz de bits (uma coluna por skill_id), empresa/título
+    internados. A consulta é soma de pesos IDF por bit + argpartition, sem SQL
+    nem dicts por linha. Quando o PRAGMA data_version da conexão do índice muda
+    (outro processo/conexão gravou), as colunas são refeitas em segundo plano
+    reaproveitando as linhas cujo content_hash não mudou.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # Uma conexão só para o PRAGMA data_version (barato, a cada consulta) e
+        # outra para a carga, que roda numa transação de leitura sob _refresh_lock
+        self._version_conn = self._connect()
+        self._version_lock = threading.Lock()
+        self._conn = self._connect()
+        self._refresh_lock = threading.Lock()
+        self._titles = _Interner()
+        self._companies = _Interner()
+        self._skill_bit: Dict[int, int] = {}
+        self._data_version: Optional[int] = None
+        self._snap: Optional[_Snapshot] = None
+        self._stats = {"refreshes": 0, "rows_reused": 0, "rows_loaded": 0, "last_refresh_ms": 0.0}
+        self.refresh()
+
+    # ---------- carga ----------
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False,
+                               isolation_level=None)
+
+    def _read(self, sql: str, params: Iterable = ()) -> List[tuple]:
+        return self._conn.execute(sql, tuple(params)).fetchall()
+
+    def _version(self) -> int:
+        with self._version_lock:
+            return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _load_rows(self, ids: Optional[np.ndarray] = None) -> Tuple[List[tuple], List[tuple]]:
+        """(linhas de jobs, pares job_id/skill_id) de todas as vagas ou só de `ids`"""
+        columns = "SELECT id, title, company, skills, salary, link, salary_max FROM jobs"
+        if ids is None:
+            return (self._read(f"{columns} ORDER BY id"),
+                    self._read("SELECT job_id, skill_id FROM job_skills"))
+        rows, links = [], []
+        ids = ids.tolist()
+        for start in range(0, len(ids), _CHUNK):
+            chunk = ids[start:start + _CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows.extend(self._read(f"{columns} WHERE id IN ({marks})", chunk))
+            links.extend(self._read(f"SELECT job_id, skill_id FROM job_skills WHERE job_id IN ({marks})", chunk))
+        rows.sort()
+        return rows, links
+
+    def _words(self) -> int:
+        return max(1, (len(self._skill_bit) + 63) // 64)
+
+    def _encode(self, rows: List[tuple], links: List[tuple]) -> dict:
+        """Linhas de jobs -> colunas NumPy (na ordem de id)"""
+        n = len(rows)
+        ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+        for _, skill_id in links:
+            if skill_id not in self._skill_bit:
+                self._skill_bit[skill_id] = len(self._skill_bit)
+        bits = np.zeros((n, self._words()), dtype=np.uint64)
+        if links and n:
+            pairs = np.array(links, dtype=np.int64)
+            pos = np.searchsorted(ids, pairs[:, 0])
+            ok = (pos < n) & (ids[np.minimum(pos, n - 1)] == pairs[:, 0])
+            bit = np.array([self._skill_bit[s] for s in pairs[ok, 1].tolist()], dtype=np.int64)
+            np.bitwise_or.at(bits, (pos[ok], bit // 64), np.left_shift(np.uint64(1), (bit % 64).astype(np.uint64)))
+        return {
+            "ids": ids,
+            "salary": np.fromiter((-1 if r[6] is None else r[6] for r in rows), dtype=np.int64, count=n),
+            "bits": bits,
+            "title": self._titles.encode(r[1] for r in rows),
+            "company": self._companies.encode(r[2] for r in rows),
+            "skills": np.array([r[3] for r in rows], dtype=object),
+            "salary_text": np.array([r[4] for r in rows], dtype=object),
+            "link": np.array([r[5] for r in rows], dtype=object),
+        }
+
+    def refresh(self, force: bool = False) -> bool:
+        """Recarrega se o banco mudou; linhas com o mesmo content_hash são reaproveitadas"""
+        with self._refresh_lock:
+            # Versão lida antes da carga: uma escrita no meio só provoca mais um refresh
+            version = self._version()
+            if not force and self._snap is not None and version == self._data_version:
+                return False
+            start = time.perf_counter()
+            self._conn.execute("BEGIN")
+            try:
+                snap, reused, loaded = self._build(force)
+            finally:
+                self._conn.execute("COMMIT")
+            self._snap = snap
+            self._data_version = version
+            elapsed = (time.perf_counter() - start) * 1000
+            self._stats["refreshes"] += 1
+            self._stats["rows_reused"] += reused
+            self._stats["rows_loaded"] += loaded
+            self._stats["last_refresh_ms"] = round(elapsed, 1)
+            logger.info(f"Índice de vagas: {len(snap.ids)} linhas ({reused} reaproveitadas) em {elapsed:.0f}ms")
+            return True
+
+    def _build(self, force: bool) -> Tuple[_Snapshot, int, int]:
+        current = self._read("SELECT id, content_hash, skill_norm2 FROM jobs ORDER BY id")
+        new_ids = np.fromiter((r[0] for r in current), dtype=np.int64, count=len(current))
+        new_hashes = np.array([r[1] or "" for r in current], dtype="U32")
+        # A norma depende dos IDFs do corpus inteiro: sempre relida, mesmo das linhas reaproveitadas
+        norm2 = np.fromiter((r[2] for r in current), dtype=np.float64, count=len(current))
+
+        old = self._snap
+        if old is None or force or not len(old.ids):
+            reuse = np.zeros(len(new_ids), dtype=bool)
+            pos = reuse.astype(np.int64)
+        else:
+            pos = np.minimum(np.searchsorted(old.ids, new_ids), len(old.ids) - 1)
+            reuse = (old.ids[pos] == new_ids) & (old.hashes[pos] == new_hashes)
+
+        # Só as linhas novas/alteradas são lidas e convertidas; o resto vem do snapshot anterior
+        changed, kept = np.flatnonzero(~reuse), np.flatnonzero(reuse)
+        fresh = self._encode(*self._load_rows(new_ids[changed] if len(kept) else None))
+        n = len(new_ids)
+        snap = _Snapshot(
+            ids=new_ids, hashes=new_hashes, norm2=norm2,
+            salary=np.empty(n, dtype=np.int64), bits=np.zeros((n, self._words()), dtype=np.uint64),
+            title=np.empty(n, dtype=np.int32), company=np.empty(n, dtype=np.int32),
+            skills=np.empty(n, dtype=object), salary_text=np.empty(n, dtype=object),
+            link=np.empty(n, dtype=object),
+        )
+        # Mesma transação de leitura: toda linha alterada está em `fresh`, na mesma ordem de id
+        for name in _ROW_COLUMNS:
+            getattr(snap, name)[changed] = fresh[name]
+        snap.bits[changed, :fresh["bits"].shape[1]] = fresh["bits"]
+        if len(kept):
+            for name in _ROW_COLUMNS:
+                getattr(snap, name)[kept] = getattr(old, name)[pos[kept]]
+            snap.bits[kept, :old.bits.shape[1]] = old.bits[pos[kept]]
+        snap.stack_weights = self._load_stack_weights()
+        return snap, len(kept), len(changed)
+
+    def _load_stack_weights(self) -> Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """stack -> (palavra, deslocamento, idf²) de cada skill da stack presente no índice"""
+        pairs = {}
+        for stack, skill_id, idf in self._read(
+                "SELECT ss.stack, ss.skill_id, s.idf FROM stack_skills ss JOIN skills s ON s.id = ss.skill_id"):
+            bit = self._skill_bit.get(skill_id)
+            if bit is not None:  # skill sem nenhuma vaga: não casa nada
+                pairs.setdefault(stack, []).append((bit // 64, bit % 64, idf * idf))
+        return {
+            stack: (np.array([w for w, _, _ in items], dtype=np.int64),
+                    np.array([b for _, b, _ in items], dtype=np.uint64),
+                    np.array([x for _, _, x in items], dtype=np.float64))
+            for stack, items in pairs.items()
+        }
+
+    def _maybe_refresh(self):
+        """Se o banco mudou, refaz o índice em segundo plano; a consulta usa o snapshot atual"""
+        if self._version() != self._data_version and not self._refresh_lock.locked():
+            threading.Thread(target=self.refresh, name="job-index-refresh", daemon=True).start()
+
+    # ---------- consulta ----------
+
+    def jobs_for_stack(self, stack: str, limit: int = 20, min_salary: Optional[int] = None,
+                       by_salary: bool = False, offset: int = 0) -> List[Dict]:
+        """Mesmo contrato e mesma ordem de job_store.jobs_for_stack (score IDF ou salário)"""
+        self._maybe_refresh()
+        snap = self._snap
+        weights = snap.stack_weights.get(stack)
+        if weights is None or not len(snap.ids):
+            return []
+        # Σ idf² das skills em comum: uma passada vetorizada por skill da stack
+        dot = np.zeros(len(snap.ids), dtype=np.float64)
+        for word, shift, weight in zip(*weights):
+            dot += ((snap.bits[:, word] >> shift) & np.uint64(1)) * weight
+        candidates = dot > 0
+        if min_salary is not None:
+            candidates &= snap.salary >= min_salary
+        idx = np.flatnonzero(candidates)
+        if not len(idx):
+            return []
+        score = np.round(dot[idx] * dot[idx] / snap.norm2[idx], 9)
+        salary = snap.salary[idx]
+        primary, secondary = (salary, score) if by_salary else (score, salary)
+        return self._top_k(snap, idx, primary, secondary, offset + limit)[offset:]
+
+    def _top_k(self, snap: _Snapshot, idx: np.ndarray, primary: np.ndarray, secondary: np.ndarray,
+               k: int) -> List[Dict]:
+        # argpartition só pela chave primária; empates na fronteira do top-k são
+        # desfeitos pela secundária e pelo id apenas entre esses candidatos
+        if len(idx) > k:
+            kth = primary[np.argpartition(primary, len(primary) - k)[len(primary) - k]]
+            sel = np.flatnonzero(primary >= kth)
+        else:
+            sel = np.arange(len(idx))
+        rows = idx[sel[np.lexsort((snap.ids[idx[sel]], -secondary[sel], -primary[sel]))][:k]]
+        titles, companies = self._titles.values, self._companies.values
+        return [
+            {"title": titles[t], "company": companies[c], "skills": skills, "salary": salary_text, "link": link}
+            for t, c, skills, salary_text, link in zip(
+                snap.title[rows].tolist(), snap.company[rows].tolist(),
+                snap.skills[rows], snap.salary_text[rows], snap.link[rows])
+        ]
+
+    @property
+    def generation(self) -> int:
+        """Muda a cada snapshot novo (caches derivados do índice usam como versão)"""
+        return self._stats["refreshes"]
+
+    def stats(self) -> Dict[str, float]:
+        snap = self._snap
+        return dict(self._stats, rows=len(snap.ids) if snap else 0,
+                    skill_bits=len(self._skill_bit), data_version=self._data_version or 0)
+
+    def close(self):
+        with self._refresh_lock:
+            self._conn.close()
+        with self._version_lock:
+            self._version_conn.close()
+
+
+# ---------- benchmark ----------
+
+_BENCH_STACKS = {
+    "Frontend": {"skills": ["react", "typescript", "css", "vue.js", "angular"]},
+    "Backend": {"skills": ["java", "python", "spring", "node.js", "api rest", "postgresql"]},
+    "Data Science": {"skills": ["python", "pandas", "sql", "spark", "machine learning"]},
+}
+_BENCH_SKILLS = sorted({s for data in _BENCH_STACKS.values() for s in data["skills"]} | {
+    "aws", "docker", "kubernetes", "go", "rust", "c#", ".net", "php", "ruby", "scala", "kotlin",
+    "swift", "terraform", "kafka", "redis", "mongodb", "graphql", "django", "flask", "fastapi",
+})
+
+
+def _bench_rows(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield (f"Vaga {i % 2000}", f"Empresa {i % 5000}", "/".join(rng.sample(_BENCH_SKILLS, rng.randint(2, 6))),
+               f"R$ {rng.randint(2, 40)}.000" if rng.random() > 0.1 else "A combinar",
+               f"https://bench.example.com/vaga/{i}")
+
+
+def _percentiles(samples: List[float]) -> str:
+    lat = np.array(samples)
+    return f"p50={np.percentile(lat, 50):8.2f}ms p99={np.percentile(lat, 99):8.2f}ms"
+
+
+def bench(sizes: List[int], queries: int, workdir: str):
+    import os
+    from db_migrations import ensure_schema
+    from db_pool import ConnectionPool
+    from job_ingest import ingest
+    from job_store import jobs_for_stack, sync_stack_skills
+
+    for n in sizes:
+        path = os.path.join(workdir, f"career_agent_bench_{n}.db")
+        fresh_db = not os.path.exists(path)
+        ensure_schema(path)
+        if fresh_db:
+            pool = ConnectionPool(path, max_readers=1)
+            with pool.writer() as conn:
+                sync_stack_skills(conn.cursor(), _BENCH_STACKS)
+            print(f"[{n}] gerando banco sintético em {path}...", file=sys.stderr)
+            ingest(pool, _bench_rows(n), batch_size=10000)
+            pool.close()
+
+        start = time.perf_counter()
+        index = JobIndex(path)
+        build = time.perf_counter() - start
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        cases = [(stack, min_salary, by_salary, offset) for stack in _BENCH_STACKS
+                 for min_salary in (None, 15000) for by_salary in (False, True) for offset in (0, 40)]
+
+        sql_lat, idx_lat, mismatches = [], [], 0
+        for i in range(queries):
+            stack, min_salary, by_salary, offset = cases[i % len(cases)]
+            t0 = time.perf_counter()
+            expected = jobs_for_stack(conn, stack, 20, min_salary, by_salary, offset)
+            t1 = time.perf_counter()
+            got = index.jobs_for_stack(stack, 20, min_salary, by_salary, offset)
+            t2 = time.perf_counter()
+            sql_lat.append((t1 - t0) * 1000)
+            idx_lat.append((t2 - t1) * 1000)
+            mismatches += [r[4] for r in expected] != [r["link"] for r in got]
+
+        print(f"{n:>9} vagas | build {build:6.2f}s | SQLite {_percentiles(sql_lat)} | "
+              f"índice {_percentiles(idx_lat)} | {np.median(sql_lat) / np.median(idx_lat):6.1f}x | "
+              f"divergências {mismatches}/{queries}")
+        conn.close()
+        index.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do índice colunar contra o SQL de jobs_for_stack")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--workdir", default="/tmp", help="Bancos sintéticos ficam aqui e são reaproveitados")
+    args = parser.parse_args(argv)
+    bench(args.sizes, args.queries, args.workdir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
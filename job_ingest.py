@@ -0,0 +1,173 @@
+import io
+import os
+import sys
+import csv
+import gzip
+import json
+import time
+import logging
+import argparse
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from db_migrations import ensure_schema
+from db_pool import ConnectionPool
+from job_store import maybe_refresh_skill_weights, upsert_jobs
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("title", "company", "skills", "salary", "link", "location")
+BATCH_SIZE = 5000
+
+# Só durante a carga: a escritora volta aos valores normais ao final.
+# synchronous=OFF troca durabilidade por velocidade; em caso de queda a carga é
+# simplesmente refeita (o upsert por job_key é idempotente).
+INGEST_PRAGMAS = {
+    "synchronous": ("OFF", "NORMAL"),
+    "cache_size": ("-131072", "-2000"),  # 128 MB de cache de páginas
+}
+
+
+def _open(path: str):
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.lower().endswith(".csv") else "jsonl"
+
+
+def read_jobs(path: str, fmt: Optional[str] = None, stats: Optional[Dict[str, int]] = None) -> Iterator[Tuple]:
+    """
+    Lê um feed CSV (com cabeçalho) ou JSONL linha a linha e produz tuplas
+    (title, company, skills, salary, link, location). Nada é carregado inteiro em memória.
+    Sem coluna location, usa "city, state" quando o feed traz essas colunas.
+    Linhas sem título/empresa ou malformadas são contadas em stats['skipped'].
+    """
+    with _open(path) as f:
+        yield from parse_jobs(f, fmt or detect_format(path), stats)
+
+
+def parse_jobs(lines: Iterable[str], fmt: str, stats: Optional[Dict[str, int]] = None) -> Iterator[Tuple]:
+    """Como read_jobs, para qualquer iterável de linhas (arquivo, resposta HTTP...)"""
+    stats = stats if stats is not None else {}
+    stats.setdefault("skipped", 0)
+    records = csv.DictReader(lines) if fmt == "csv" else _json_lines(lines, stats)
+    for record in records:
+        if not record.get("location") and (record.get("city") or record.get("state")):
+            record["location"] = ", ".join(
+                part.strip() for part in (record.get("city"), record.get("state")) if part and part.strip()
+            )
+        row = tuple((record.get(field) or "").strip() or None for field in FIELDS)
+        if not row[0] or not row[1]:
+            stats["skipped"] += 1
+            continue
+        yield row
+
+
+def _json_lines(f, stats: Dict[str, int]) -> Iterator[dict]:
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            stats["skipped"] += 1
+            continue
+        if isinstance(record, dict):
+            yield {k: v if v is None or isinstance(v, str) else str(v) for k, v in record.items()}
+        else:
+            stats["skipped"] += 1
+
+
+@contextmanager
+def ingest_pragmas(conn):
+    """Aplica INGEST_PRAGMAS na conexão e restaura ao sair"""
+    for name, (value, _) in INGEST_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    try:
+        yield
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        for name, (_, value) in INGEST_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA optimize")
+
+
+def ingest(pool: ConnectionPool, rows: Iterable[Tuple], batch_size: int = BATCH_SIZE,
+           progress: Optional[Callable[[Dict[str, float]], None]] = None) -> Dict[str, float]:
+    """
+    Grava as vagas em transações de `batch_size` linhas pela conexão de escrita
+    do pool (leitoras continuam atendendo em WAL). Retorna linhas, segundos e linhas/s.
+    """
+    start = time.perf_counter()
+    report = {"rows": 0, "batches": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+
+    def update():
+        report["seconds"] = time.perf_counter() - start
+        report["rows_per_sec"] = report["rows"] / report["seconds"] if report["seconds"] else 0.0
+
+    with pool.writer() as conn, ingest_pragmas(conn):
+        cursor = conn.cursor()
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                report["rows"] += upsert_jobs(cursor, batch)
+                report["batches"] += 1
+                conn.commit()
+                batch = []
+                update()
+                if progress:
+                    progress(report)
+        if batch:
+            report["rows"] += upsert_jobs(cursor, batch)
+            report["batches"] += 1
+            conn.commit()
+        # IDF/normas do ranking: recalculados se a carga mudou o corpus de forma relevante
+        maybe_refresh_skill_weights(conn)
+        conn.commit()
+
+    update()
+    logger.info(f"Ingestão concluída: {report['rows']} vagas em {report['seconds']:.1f}s "
+                f"({report['rows_per_sec']:.0f} linhas/s)")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carga em massa de vagas (CSV ou JSONL, opcionalmente .gz)")
+    parser.add_argument("path", help="Arquivo do feed ('-' lê da entrada padrão)")
+    parser.add_argument("--db", default=os.getenv("CAREER_AGENT_DB_PATH", "/tmp/career_agent.db"),
+                        help="Use com CAREER_AGENT_DB_MODE=persistent, ou o agente recria o banco ao iniciar")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default=None)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    db_path = os.path.abspath(args.db)
+    ensure_schema(db_path)
+
+    stats = {}
+    pool = ConnectionPool(db_path, max_readers=1)
+    try:
+        report = ingest(
+            pool, read_jobs(args.path, args.format, stats),
+            args.batch_size,
+            progress=lambda r: print(f"\r{r['rows']} linhas ({r['rows_per_sec']:.0f}/s)", end="", file=sys.stderr)
+        )
+    finally:
+        pool.close()
+    print(file=sys.stderr)
+    print(f"{report['rows']} vagas gravadas, {stats['skipped']} ignoradas, "
+          f"{report['seconds']:.1f}s, {report['rows_per_sec']:.0f} linhas/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,388 @@
+import re
+import json
+import math
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from gazetteer import KM_PER_DEGREE, Place, bounding_box, default_gazetteer
+
+# Grafias alternativas -> nome canônico
+SKILL_ALIASES = {
+    "postegresql": "postgresql",
+    "postgres": "postgresql",
+    "apis restfull": "api rest",
+    "apis restful": "api rest",
+    "api restful": "api rest",
+    "rest api": "api rest",
+    "node": "node.js",
+    "nodejs": "node.js",
+    "vue": "vue.js",
+    "vuejs": "vue.js",
+    "nextjs": "next.js",
+    "reactjs": "react",
+    "react.js": "react",
+    "ts": "typescript",
+    "js": "javascript",
+    "k8s": "kubernetes",
+}
+
+_SPLIT_RE = re.compile(r"\s*[/,;|+]\s*")
+
+# Parâmetros de rastreamento não identificam a vaga
+_TRACKING_PARAMS = ("utm_", "ref", "source", "fbclid", "gclid")
+
+_CURRENCIES = (("US$", "USD"), ("USD", "USD"), ("€", "EUR"), ("EUR", "EUR"), ("R$", "BRL"), ("BRL", "BRL"))
+_AMOUNT_RE = re.compile(r"(\d{1,3}(?:[.,]\d{3})+|\d+)(?:[.,](\d{1,2}))?\s*(k|mil)?\b", re.IGNORECASE)
+
+
+def canonical_skill(name: str) -> str:
+    """Nome canônico: minúsculas, espaços colapsados e aliases resolvidos"""
+    name = " ".join(name.lower().split())
+    return SKILL_ALIASES.get(name, name)
+
+
+def split_skills(text: str) -> List[str]:
+    """'Java/Spring, AWS' -> ['java', 'spring', 'aws'] (sem repetição, na ordem)"""
+    seen = {}
+    for part in _SPLIT_RE.split(text or ""):
+        skill = canonical_skill(part)
+        if skill:
+            seen.setdefault(skill, None)
+    return list(seen)
+
+
+def parse_amount(match: "re.Match") -> int:
+    """'8.000' -> 8000, '3,5 mil' -> 3500, '10k' -> 10000"""
+    whole, decimals, suffix = match.groups()
+    value = float(re.sub(r"[.,]", "", whole) + (f".{decimals}" if decimals else ""))
+    if suffix:
+        value *= 1000
+    return int(round(value))
+
+
+def parse_salary(text: str) -> Tuple[Optional[int], Optional[int], Optional[str]]:
+    """
+    'R$ 3.500 - R$ 14.000' -> (3500, 14000, 'BRL'); valor único vira min = max.
+    Texto sem número retorna (None, None, None).
+    """
+    amounts = [parse_amount(m) for m in _AMOUNT_RE.finditer(text or "")]
+    if not amounts:
+        return None, None, None
+    upper = (text or "").upper()
+    currency = next((code for symbol, code in _CURRENCIES if symbol in upper), "BRL")
+    return min(amounts), max(amounts), currency
+
+
+def normalize_link(link: str) -> str:
+    """Host em minúsculas, sem fragmento, barra final e parâmetros de rastreamento"""
+    link = (link or "").strip()
+    if "?" not in link and "#" not in link:
+        # Caminho rápido da carga em massa: sem query não há o que filtrar
+        scheme, sep, rest = link.partition("://")
+        if sep:
+            host, _, path = rest.partition("/")
+            return f"{scheme.lower()}://{host.lower()}{('/' + path).rstrip('/') or '/'}"
+    parts = urlsplit(link)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith(_TRACKING_PARAMS))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(),
+                       parts.path.rstrip("/") or "/", urlencode(query), ""))
+
+
+def job_key(link: str, title: str = "", company: str = "") -> str:
+    """
+    Chave estável da vaga: hash do link normalizado, de modo que o mesmo anúncio
+    vindo de feeds diferentes (com ou sem utm_*, barra final...) seja uma linha só.
+    Sem link, cai para título + empresa.
+    """
+    if (link or "").strip():
+        basis = normalize_link(link)
+    else:
+        basis = f"{(title or '').lower()}\x00{(company or '').lower()}"
+    return hashlib.blake2b(basis.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def content_hash(job: tuple) -> str:
+    """
+    Hash do conteúdo (title, company, skills, salary, link[, location]): muda só
+    se a vaga mudou. Sem localização, igual ao hash das vagas de 5 campos.
+    """
+    fields = job if len(job) > 5 and job[5] else job[:5]
+    return hashlib.blake2b("\x1f".join(field or "" for field in fields).encode("utf-8"),
+                           digest_size=16).hexdigest()
+
+
+def backfill_job_keys(conn):
+    """Migração 4: preenche job_key das vagas já existentes"""
+    rows = conn.execute("SELECT id, link, title, company FROM jobs").fetchall()
+    conn.executemany("UPDATE jobs SET job_key = ? WHERE id = ?",
+                     [(job_key(link, title, company), job_id) for job_id, link, title, company in rows])
+
+
+def backfill_content_hashes(conn):
+    """Migração 5: preenche content_hash das vagas já existentes"""
+    rows = conn.execute("SELECT id, title, company, skills, salary, link FROM jobs").fetchall()
+    conn.executemany("UPDATE jobs SET content_hash = ? WHERE id = ?",
+                     [(content_hash(row[1:]), row[0]) for row in rows])
+
+
+def skill_ids(cursor, names: Iterable[str]) -> Dict[str, int]:
+    """Garante as skills (já canônicas) na tabela e devolve {nome: id}"""
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    cursor.executemany("INSERT OR IGNORE INTO skills (name) VALUES (?)", [(n,) for n in names])
+    ids = {}
+    for start in range(0, len(names), 500):
+        chunk = names[start:start + 500]
+        cursor.execute(f"SELECT name, id FROM skills WHERE name IN ({','.join('?' * len(chunk))})", chunk)
+        ids.update(cursor.fetchall())
+    return ids
+
+
+def write_job_skills(cursor, jobs: Iterable[tuple]):
+    """Regrava o vínculo vaga-skill para tuplas (job_id, texto de skills, salary_max)"""
+    jobs = [(job_id, split_skills(text), salary_max) for job_id, text, salary_max in jobs]
+    ids = skill_ids(cursor, (skill for _, skills, _ in jobs for skill in skills))
+    cursor.executemany("DELETE FROM job_skills WHERE job_id = ?", [(job_id,) for job_id, _, _ in jobs])
+    cursor.executemany(
+        "INSERT OR IGNORE INTO job_skills (skill_id, job_id, salary_max) VALUES (?, ?, ?)",
+        [(ids[skill], job_id, salary_max) for job_id, skills, salary_max in jobs for skill in skills]
+    )
+    # Norma da vaga com os IDFs atuais (recalculada para todas em refresh_skill_weights)
+    idf = {}
+    distinct = list(set(ids.values()))
+    for start in range(0, len(distinct), 500):
+        chunk = distinct[start:start + 500]
+        cursor.execute(f"SELECT id, idf FROM skills WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        idf.update(cursor.fetchall())
+    cursor.executemany("UPDATE jobs SET skill_norm2 = ? WHERE id = ?", [
+        (sum(idf[ids[skill]] ** 2 for skill in skills), job_id) for job_id, skills, _ in jobs
+    ])
+
+
+def upsert_jobs(cursor, jobs: Iterable[tuple], source: Optional[str] = None) -> int:
+    """
+    Insere/atualiza vagas (title, company, skills, salary, link[, location]) usando
+    job_key (derivada do link) como chave; salário, skills e coordenadas da
+    localização (gazetteer local) são normalizados aqui. Idempotente.
+    `source` marca o feed de origem (usado para expirar vagas que saíram dele).
+    """
+    gazetteer = default_gazetteer()
+    rows = {}
+    for job in jobs:
+        title, company, skills, salary, link = job[:5]
+        location = job[5] if len(job) > 5 else None
+        place = gazetteer.geocode(location)
+        key = job_key(link, title, company)
+        # Repetida no mesmo lote: vale a última ocorrência
+        rows[key] = (title, company, skills, salary) + parse_salary(salary) + (
+            link, location, place.lat if place else None, place.lon if place else None,
+            content_hash(job), source, key)
+    rows = list(rows.values())
+    if not rows:
+        return 0
+    # job_geo (R*Tree) acompanha lat/lon por triggers
+    cursor.executemany("""
+        INSERT INTO jobs (title, company, skills, salary, salary_min, salary_max, salary_currency, link,
+                          location, lat, lon, content_hash, source, job_key)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(job_key) DO UPDATE SET
+            title = excluded.title, company = excluded.company, skills = excluded.skills,
+            salary = excluded.salary, salary_min = excluded.salary_min,
+            salary_max = excluded.salary_max, salary_currency = excluded.salary_currency,
+            link = excluded.link, location = excluded.location, lat = excluded.lat, lon = excluded.lon,
+            content_hash = excluded.content_hash, source = COALESCE(excluded.source, jobs.source)
+    """, rows)
+
+    ids = {}
+    keys = [row[-1] for row in rows]
+    for start in range(0, len(keys), 500):
+        chunk = keys[start:start + 500]
+        cursor.execute(f"SELECT job_key, id FROM jobs WHERE job_key IN ({','.join('?' * len(chunk))})", chunk)
+        ids.update(cursor.fetchall())
+    write_job_skills(cursor, [(ids[row[-1]], row[2], row[5]) for row in rows])
+    return len(rows)
+
+
+def jobs_for_stack(conn, stack: str, limit: int = 20, min_salary: Optional[int] = None,
+                   by_salary: bool = False, offset: int = 0) -> List[tuple]:
+    """
+    (title, company, skills, salary, link) das vagas com alguma skill da stack,
+    ranqueadas pela sobreposição ponderada por IDF (ou por salário, com o score
+    como desempate). stack -> skills -> vagas por join indexado; o filtro de
+    salário usa o índice (skill_id, salary_max) de job_skills.
+
+    score = (Σ idf² das skills em comum)² / Σ idf² das skills da vaga, i.e. o
+    cosseno² entre a stack e a vaga sem o termo da stack, que é constante.
+
+    Por salário, só as candidatas de top_paying_job_ids são agrupadas e
+    ordenadas, em vez de todas as vagas com alguma skill da stack.
+    """
+    salary_filter = "AND js.salary_max >= ?" if min_salary is not None else ""
+    order = "j.salary_max DESC, score DESC" if by_salary else "score DESC, j.salary_max DESC"
+    params = [stack] + ([min_salary] if min_salary is not None else [])
+    if by_salary:
+        candidates = top_paying_job_ids(conn, stack, limit + offset, min_salary)
+        if not candidates:
+            return []
+        salary_filter += f" AND js.job_id IN ({','.join('?' * len(candidates))})"
+        params += candidates
+    params += [limit, offset]
+    return conn.execute(f"""
+        SELECT j.title, j.company, j.skills, j.salary, j.link,
+               ROUND(SUM(s.idf * s.idf) * SUM(s.idf * s.idf) / j.skill_norm2, 9) AS score
+        FROM stack_skills ss
+        JOIN skills s ON s.id = ss.skill_id
+        JOIN job_skills js ON js.skill_id = ss.skill_id
+        JOIN jobs j ON j.id = js.job_id
+        WHERE ss.stack = ? {salary_filter}
+        GROUP BY js.job_id
+        ORDER BY {order}, j.id
+        LIMIT ? OFFSET ?
+    """, params).fetchall()
+
+
+def top_paying_job_ids(conn, stack: str, n: int, min_salary: Optional[int] = None) -> List[int]:
+    """
+    Ids que contêm as `n` vagas mais bem pagas da stack: por skill da stack, um
+    range scan em (skill_id, salary_max DESC) até o n-ésimo salário (empates no
+    corte entram, o desempate por score é de quem ordena). Uma vaga do top n geral está
+    no top n de cada uma das suas skills.
+    """
+    salary_filter = "AND salary_max >= ?" if min_salary is not None else ""
+    floor = [min_salary] if min_salary is not None else []
+    skill_ids = [row[0] for row in conn.execute("SELECT skill_id FROM stack_skills WHERE stack = ?", (stack,))]
+    ids = set()
+    for skill_id in skill_ids:
+        cut = conn.execute(f"""
+            SELECT salary_max FROM job_skills
+            WHERE skill_id = ? {salary_filter}
+            ORDER BY salary_max DESC LIMIT 1 OFFSET ?
+        """, [skill_id] + floor + [n - 1]).fetchone()
+        if cut is None or cut[0] is None:
+            # Menos de n vagas com salário: todas as da skill são candidatas
+            rows = conn.execute(f"SELECT job_id FROM job_skills WHERE skill_id = ? {salary_filter}",
+                                [skill_id] + floor)
+        else:
+            rows = conn.execute("SELECT job_id FROM job_skills WHERE skill_id = ? AND salary_max >= ?",
+                                (skill_id, cut[0]))
+        ids.update(row[0] for row in rows)
+    return sorted(ids)
+
+
+def jobs_near(conn, place: Place, radius_km: float, stack: Optional[str] = None, limit: int = 20,
+              min_salary: Optional[int] = None, offset: int = 0) -> List[tuple]:
+    """
+    (title, company, skills, salary, link, location, distance_km) das vagas a até
+    `radius_km` de `place`, da mais próxima para a mais distante (empate: score
+    IDF da stack, depois salário). A caixa envolvente do raio é resolvida pelo
+    R*Tree job_geo; só as vagas dentro dela chegam ao filtro de stack/salário e
+    ao corte exato do círculo. `stack` None não filtra por skills.
+
+    Distância equiretangular (graus² com a longitude escalada por cos(lat)):
+    em raios de cidade/região ordena igual ao haversine e não depende das
+    funções matemáticas do SQLite.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(place.lat, place.lon, radius_km)
+    params = {
+        "lat": place.lat, "lon": place.lon, "kx2": math.cos(math.radians(place.lat)) ** 2,
+        "r2": (radius_km / KM_PER_DEGREE) ** 2, "stack": stack, "min_salary": min_salary,
+        "min_lat": min_lat, "max_lat": max_lat, "min_lon": min_lon, "max_lon": max_lon,
+        "limit": limit, "offset": offset,
+    }
+    # Soma dos idf² das skills em comum com a stack (NULL: nenhuma em comum)
+    overlap = """(
+        SELECT SUM(s.idf * s.idf) FROM job_skills js
+        JOIN stack_skills ss ON ss.skill_id = js.skill_id AND ss.stack = :stack
+        JOIN skills s ON s.id = js.skill_id
+        WHERE js.job_id = j.id
+    )""" if stack is not None else "NULL"
+    rows = conn.execute(f"""
+        SELECT title, company, skills, salary, link, location, d2 FROM (
+            SELECT j.id, j.title, j.company, j.skills, j.salary, j.link, j.location, j.salary_max,
+                   (j.lat - :lat) * (j.lat - :lat) + (j.lon - :lon) * (j.lon - :lon) * :kx2 AS d2,
+                   {overlap} AS overlap, j.skill_norm2
+            FROM job_geo g JOIN jobs j ON j.id = g.id
+            WHERE g.min_lat >= :min_lat AND g.max_lat <= :max_lat
+              AND g.min_lon >= :min_lon AND g.max_lon <= :max_lon
+              {"AND j.salary_max >= :min_salary" if min_salary is not None else ""}
+        )
+        WHERE d2 <= :r2 {"AND overlap IS NOT NULL" if stack is not None else ""}
+        ORDER BY d2, ROUND(overlap * overlap / skill_norm2, 9) DESC, salary_max DESC, id
+        LIMIT :limit OFFSET :offset
+    """, params).fetchall()
+    return [row[:6] + (round(math.sqrt(row[6]) * KM_PER_DEGREE, 1),) for row in rows]
+
+
+def skill_idf(df: int, total: int) -> float:
+    """IDF suavizado: skills raras pesam mais que as onipresentes (python, sql...)"""
+    return math.log((total + 1) / (df + 1)) + 1.0
+
+
+def refresh_skill_weights(conn):
+    """
+    Recalcula o IDF de todas as skills e a norma (Σ idf²) de todas as vagas.
+    Operação de corpus inteiro: rode após cargas/sincronizações relevantes
+    (ver maybe_refresh_skill_weights), não a cada vaga.
+    """
+    total = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+    df = dict(conn.execute("SELECT skill_id, COUNT(*) FROM job_skills GROUP BY skill_id").fetchall())
+    conn.executemany("UPDATE skills SET idf = ? WHERE id = ?",
+                     [(skill_idf(df.get(skill_id, 0), total), skill_id)
+                      for (skill_id,) in conn.execute("SELECT id FROM skills").fetchall()])
+    conn.execute("""
+        UPDATE jobs SET skill_norm2 = (
+            SELECT COALESCE(SUM(s.idf * s.idf), 0)
+            FROM job_skills js JOIN skills s ON s.id = js.skill_id
+            WHERE js.job_id = jobs.id
+        )
+    """)
+    conn.execute("INSERT OR REPLACE INTO schema_meta (key, value) VALUES ('skill_weights_jobs', ?)", (str(total),))
+
+
+def maybe_refresh_skill_weights(conn, drift: float = 0.1) -> bool:
+    """Recalcula os pesos só se o número de vagas mudou mais que `drift` desde o último cálculo"""
+    row = conn.execute("SELECT value FROM schema_meta WHERE key = 'skill_weights_jobs'").fetchone()
+    total = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+    if row is not None and abs(total - int(row[0])) <= drift * max(int(row[0]), 1):
+        return False
+    refresh_skill_weights(conn)
+    return True
+
+
+def stack_skills_digest(tech_stacks: Dict[str, dict]) -> str:
+    return hashlib.sha256(json.dumps(
+        {stack: data.get("skills", []) for stack, data in tech_stacks.items()}, sort_keys=True
+    ).encode("utf-8")).hexdigest()
+
+
+def stack_skills_current(cursor, tech_stacks: Dict[str, dict]) -> bool:
+    """stack_skills reflete o dicionário de stacks atual? (hash em schema_meta)"""
+    row = cursor.execute("SELECT value FROM schema_meta WHERE key = 'stack_skills_hash'").fetchone()
+    return bool(row) and row[0] == stack_skills_digest(tech_stacks)
+
+
+def sync_stack_skills(cursor, tech_stacks: Dict[str, dict]) -> bool:
+    """Regrava stack_skills só quando o dicionário de stacks mudou"""
+    if stack_skills_current(cursor, tech_stacks):
+        return False
+    digest = stack_skills_digest(tech_stacks)
+    write_stack_skills(cursor, tech_stacks)
+    cursor.execute(
+        "INSERT OR REPLACE INTO schema_meta (key, value) VALUES ('stack_skills_hash', ?)", (digest,)
+    )
+    return True
+
+
+def write_stack_skills(cursor, tech_stacks: Dict[str, dict]):
+    """Sincroniza stack_skills com o dicionário de stacks"""
+    pairs = [(stack, canonical_skill(skill)) for stack, data in tech_stacks.items()
+             for skill in data.get("skills", [])]
+    ids = skill_ids(cursor, (skill for _, skill in pairs))
+    cursor.execute("DELETE FROM stack_skills")
+    cursor.executemany(
+        "INSERT OR IGNORE INTO stack_skills (stack, skill_id) VALUES (?, ?)",
+        [(stack, ids[skill]) for stack, skill in pairs]
+    )
@@ -0,0 +1,75 @@
+from collections import deque
+from typing import Dict, List, Optional
+
+
+class KeywordMatcher:
+    """
+    Autômato Aho-Corasick com várias categorias de palavras-chave.
+    Encontra todas as ocorrências em uma única passada sobre o texto e,
+    por categoria, devolve o rótulo de maior prioridade (ordem do dicionário).
+    """
+
+    def __init__(self, groups: Dict[str, Dict[str, List[str]]]):
+        self.categories = list(groups)
+        self.labels = {cat: list(labels) for cat, labels in groups.items()}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Dict[int, int]] = [{}]
+
+        for cat_idx, cat in enumerate(self.categories):
+            for rank, label in enumerate(self.labels[cat]):
+                for keyword in groups[cat][label]:
+                    self._add(keyword.lower(), cat_idx, rank)
+        self._build_failure_links()
+        # Tupla por estado para o laço de busca não criar objetos
+        self._out_items = [tuple(out.items()) for out in self._out]
+
+    def _add(self, keyword: str, cat_idx: int, rank: int):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append({})
+                self._goto[state][ch] = nxt
+            state = nxt
+        current = self._out[state].get(cat_idx)
+        if current is None or rank < current:
+            self._out[state][cat_idx] = rank
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                # Herda as saídas do sufixo mais longo (mantendo a melhor prioridade)
+                for cat_idx, rank in self._out[self._fail[nxt]].items():
+                    current = self._out[nxt].get(cat_idx)
+                    if current is None or rank < current:
+                        self._out[nxt][cat_idx] = rank
+
+    def scan(self, text: str) -> Dict[str, Optional[str]]:
+        """Retorna {categoria: rótulo de maior prioridade encontrado ou None}"""
+        goto, fail, out_items = self._goto, self._fail, self._out_items
+        best: Dict[int, int] = {}
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for cat_idx, rank in out_items[state]:
+                current = best.get(cat_idx)
+                if current is None or rank < current:
+                    best[cat_idx] = rank
+
+        return {
+            cat: (self.labels[cat][best[idx]] if idx in best else None)
+            for idx, cat in enumerate(self.categories)
+        }
@@ -0,0 +1,128 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from db_pool import ConnectionPool, PoolTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    Cache de respostas do LLM em dois níveis.
+    L1: LRU em memória limitado em bytes. L2: SQLite em disco, sobrevive a
+    reinícios e é compartilhado entre processos (WAL + busy_timeout).
+    Falhas são gravadas com TTL curto (cache negativo), nunca como resposta permanente.
+    """
+
+    def __init__(self, path: str = "/tmp/career_agent_cache.db",
+                 max_bytes: int = 8 * 1024 * 1024,
+                 ttl: float = 7 * 24 * 3600,
+                 negative_ttl: float = 30):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._l1: "OrderedDict[str, tuple]" = OrderedDict()
+        self._l1_bytes = 0
+        self._lock = threading.Lock()
+        self.db = ConnectionPool(self.path, max_readers=4)
+        self._stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "negative_hits": 0}
+        self._init_db()
+
+    @staticmethod
+    def make_key(prompt: str, namespace: str = "") -> str:
+        """Hash do prompt normalizado (NFC, espaços colapsados)"""
+        normalized = re.sub(r"\s+", " ", unicodedata.normalize("NFC", prompt)).strip()
+        return hashlib.sha256(f"{namespace}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    def _init_db(self):
+        with self.db.writer() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    negative INTEGER NOT NULL DEFAULT 0,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+
+    def get(self, key: str) -> Optional[str]:
+        """Retorna o valor em cache ou None; entradas negativas retornam ''"""
+        now = time.time()
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is not None:
+                value, negative, expires_at = entry
+                if expires_at > now:
+                    self._l1.move_to_end(key)
+                    self._stats["negative_hits" if negative else "l1_hits"] += 1
+                    return value
+                self._l1_discard(key)
+
+        try:
+            with self.db.reader() as conn:
+                row = conn.execute(
+                    "SELECT value, negative, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?",
+                    (key, now)
+                ).fetchone()
+        except (sqlite3.Error, PoolTimeoutError) as e:
+            logger.warning(f"Falha na leitura do cache L2: {str(e)}")
+            row = None
+
+        with self._lock:
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            value, negative, expires_at = row
+            self._stats["negative_hits" if negative else "l2_hits"] += 1
+            self._l1_put(key, value, bool(negative), expires_at)
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        self._store(key, value, False, ttl if ttl is not None else self.ttl)
+
+    def set_negative(self, key: str):
+        """Registra uma falha por pouco tempo para não martelar a API"""
+        self._store(key, "", True, self.negative_ttl)
+
+    def _store(self, key: str, value: str, negative: bool, ttl: float):
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._l1_put(key, value, negative, expires_at)
+        try:
+            with self.db.writer() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, negative, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, value, int(negative), expires_at)
+                )
+        except (sqlite3.Error, PoolTimeoutError) as e:
+            logger.warning(f"Falha na escrita do cache L2: {str(e)}")
+
+    def _l1_put(self, key: str, value: str, negative: bool, expires_at: float):
+        self._l1_discard(key)
+        size = len(key) + len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        self._l1[key] = (value, negative, expires_at)
+        self._l1_bytes += size
+        while self._l1_bytes > self.max_bytes:
+            old_key, (old_value, _, _) = self._l1.popitem(last=False)
+            self._l1_bytes -= len(old_key) + len(old_value.encode("utf-8"))
+
+    def _l1_discard(self, key: str):
+        entry = self._l1.pop(key, None)
+        if entry is not None:
+            self._l1_bytes -= len(key) + len(entry[0].encode("utf-8"))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, l1_entries=len(self._l1), l1_bytes=self._l1_bytes)
@@ -0,0 +1,561 @@
+import asyncio
+import copy
+import logging
+import time
+from concurrent import futures
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Awaitable, Callable, Iterator, NamedTuple, Optional, Tuple
+
+import httpx
+from huggingface_hub import AsyncInferenceClient, InferenceClient
+
+from admission import AdmissionGate, LLMBusyError
+from circuit_breaker import CircuitBreaker
+from deadline import Deadline, DeadlineExceeded
+from hedging import Hedger
+from llm_cache import LLMCache
+from model_health import ModelHealth
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_TIMEOUT_ERRORS = (TimeoutError, httpx.TimeoutException)
+
+
+class GenerationProfile(NamedTuple):
+    """Parâmetros de geração de uma tarefa; o nome separa as respostas no cache"""
+    name: str
+    max_tokens: int
+    temperature: Optional[float] = None
+    stop: Tuple[str, ...] = ()
+
+    def params(self) -> dict:
+        params = {"max_tokens": self.max_tokens}
+        if self.temperature is not None:
+            params["temperature"] = self.temperature
+        if self.stop:
+            params["stop"] = list(self.stop)
+        return params
+
+
+class LLMClient:
+    """
+    Camada de acesso a um modelo do LLM (sync e async) com cache de respostas.
+
+    Cada chamada usa uma cópia do client com exit_stack própria (_scoped),
+    fechada ao fim: o huggingface_hub guarda ali as respostas HTTP abertas, e a
+    exit_stack do client compartilhado só cresceria (e seria dividida entre
+    threads). No async, a sessão httpx é uma só durante a vida do app.
+
+    Cache hits não passam pelo AdmissionGate; só chamadas reais ocupam vaga.
+    Prompts idênticos em voo ao mesmo tempo viram uma única chamada (single-flight).
+    Chamadas reais passam antes pelo disjuntor: com o circuito aberto levantam
+    CircuitOpenError na hora, sem ocupar vaga no gate nem esperar timeout.
+    Com um Deadline, a espera no gate e a chamada usam só o tempo que resta;
+    estourar o prazo levanta DeadlineExceeded (sem cache negativo).
+    Com um Hedger (opcional), chamadas que passam do p95 observado (por
+    perfil) ganham uma segunda cópia, numa vaga livre do gate; vale a
+    primeira que responder e a outra é cancelada. Vale para respostas
+    completas e para as de saída antecipada (classificação); o stream de
+    texto para a UI não tem hedge.
+    Cada chamada pode trazer um GenerationProfile (max_tokens, stop,
+    temperature); sem ele vale o perfil padrão com `max_tokens`.
+    A saúde do modelo (ModelHealth) é de quem chama, por tarefa: cada chamada
+    real alimenta a que vier em `health`; o disjuntor é do modelo.
+    """
+
+    def __init__(self, client: InferenceClient, async_client: AsyncInferenceClient,
+                 cache: LLMCache, gate: AdmissionGate, max_tokens: int = 900,
+                 breaker: Optional[CircuitBreaker] = None, hedger: Optional[Hedger] = None,
+                 flights: Optional[SingleFlight] = None):
+        self.client = client
+        self.async_client = async_client
+        self.cache = cache
+        self.gate = gate
+        self.profile = GenerationProfile("default", max_tokens)
+        self.breaker = breaker or CircuitBreaker()
+        # Chaves de cache incluem o modelo: o single-flight pode ser compartilhado entre modelos
+        self.flights = flights or SingleFlight()
+        self.hedger = hedger
+        # Sync: as duas cópias rodam em threads para o chamador ficar com a primeira
+        # (a perdedora não é interrompida no meio; termina em segundo plano)
+        self._hedge_pool = (
+            futures.ThreadPoolExecutor(max_workers=2 * gate.max_concurrency, thread_name_prefix="llm-hedge")
+            if hedger is not None else None
+        )
+
+    @contextmanager
+    def _admitted(self, deadline: Optional[Deadline] = None):
+        """Disjuntor e depois vaga no gate; rejeição do gate não conta como falha do upstream"""
+        self.breaker.before_call()
+        try:
+            with self.gate.slot(deadline.remaining() if deadline else None):
+                yield
+        except LLMBusyError:
+            self.breaker.release()
+            raise
+
+    @asynccontextmanager
+    async def _aadmitted(self, deadline: Optional[Deadline] = None):
+        self.breaker.before_call()
+        try:
+            async with self.gate.aslot(deadline.remaining() if deadline else None):
+                yield
+        except LLMBusyError:
+            self.breaker.release()
+            raise
+
+    @staticmethod
+    def _call_timeout(client, deadline: Optional[Deadline]) -> Tuple[Optional[float], bool]:
+        """Timeout desta chamada e se é o prazo da requisição (e não o do client) que limita"""
+        if deadline is None:
+            return None, False
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Prazo de {deadline.budget:g}s esgotado antes da chamada ao LLM")
+        return remaining, client.timeout is None or remaining < client.timeout
+
+    def _bounded(self, client, timeout: Optional[float], cut: bool):
+        """Cópia de _scoped com o timeout encurtado ao que resta do prazo (o original é compartilhado)"""
+        scoped = self._scoped(client)
+        if cut:
+            scoped.timeout = timeout
+        return scoped
+
+    @property
+    def model(self) -> str:
+        return self.client.model or ""
+
+    def _record(self, ok: bool, duration: float, health: Optional[ModelHealth] = None):
+        """Resultado de uma chamada real: alimenta o disjuntor e a EWMA de saúde de quem chamou"""
+        self.breaker.record(ok, duration)
+        if health is not None:
+            health.record(ok, duration)
+
+    def cache_key(self, prompt: str, profile: Optional[GenerationProfile] = None) -> str:
+        namespace = self.model if profile is None else f"{self.model}:{profile.name}"
+        return self.cache.make_key(prompt, namespace=namespace)
+
+    def _messages(self, prompt: str) -> list:
+        return [{"role": "user", "content": prompt}]
+
+    def _params(self, profile: Optional[GenerationProfile]) -> dict:
+        return (profile or self.profile).params()
+
+    def _kind(self, profile: Optional[GenerationProfile]) -> str:
+        """Janela de latência do hedge: respostas curtas e longas têm p95 bem diferentes"""
+        return (profile or self.profile).name
+
+    @staticmethod
+    def _scoped(client):
+        """Cópia rasa do client com exit_stack própria; fechá-la encerra só as respostas desta chamada"""
+        scoped = copy.copy(client)
+        scoped.exit_stack = type(client.exit_stack)()
+        return scoped
+
+    async def _ascoped(self) -> AsyncInferenceClient:
+        """Versão assíncrona de _scoped; a cópia reaproveita a sessão httpx do client longevo"""
+        await self.async_client._get_async_client()
+        return self._scoped(self.async_client)
+
+    def _chat(self, client: InferenceClient, prompt: str, **params) -> str:
+        """Chamada não-stream num client de _scoped/_bounded, fechado ao fim"""
+        try:
+            response = client.chat_completion(messages=self._messages(prompt), **params)
+            return response.choices[0].message.content or ""
+        finally:
+            client.close()
+
+    async def _achat(self, prompt: str, params: dict) -> str:
+        response = await self.async_client.chat_completion(messages=self._messages(prompt), **params)
+        return response.choices[0].message.content or ""
+
+    def _hedged(self, call: Callable[[], str], kind: str) -> str:
+        """
+        `call` (uma cópia da chamada) com hedge: sem resposta no p95 observado
+        para `kind` (nome do perfil), manda outra cópia e fica com a primeira
+        """
+        if self.hedger is None:
+            return call()
+        start, delay = time.monotonic(), self.hedger.begin(kind)
+        if delay is None:
+            content = call()
+            self.hedger.record(time.monotonic() - start, kind=kind)
+            return content
+
+        primary = self._hedge_pool.submit(call)
+        release = None
+        if not futures.wait([primary], timeout=delay).done and self.hedger.allow():
+            release = self.gate.try_slot()
+            if release is None:
+                self.hedger.refund()
+        if release is None:
+            content = primary.result()
+            self.hedger.record(time.monotonic() - start, kind=kind)
+            return content
+
+        hedge = self._hedge_pool.submit(call)
+        # A vaga extra só volta quando as duas cópias terminam: a perdedora segue no upstream
+        hedge.add_done_callback(lambda _: primary.add_done_callback(lambda _: release()))
+        error = None
+        for future in futures.as_completed([primary, hedge]):
+            if future.exception() is None:
+                (hedge if future is primary else primary).cancel()
+                self.hedger.record(time.monotonic() - start, hedge_won=future is hedge, kind=kind)
+                return future.result()
+            error = error or future.exception()
+        raise error
+
+    async def _ahedged(self, call: Callable[[], Awaitable[str]], kind: str) -> str:
+        """Versão assíncrona de _hedged; a cópia perdedora é cancelada de fato"""
+        if self.hedger is None:
+            return await call()
+        start, delay = time.monotonic(), self.hedger.begin(kind)
+        if delay is None:
+            content = await call()
+            self.hedger.record(time.monotonic() - start, kind=kind)
+            return content
+
+        primary = asyncio.ensure_future(call())
+        copies = [primary]
+        try:
+            done, _ = await asyncio.wait(copies, timeout=delay)
+            if not done and self.hedger.allow():
+                release = await self.gate.atry_slot()
+                if release is None:
+                    self.hedger.refund()
+                else:
+                    copies.append(asyncio.ensure_future(self._ahedge_copy(call, release)))
+            error, pending = None, set(copies)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.hedger.record(time.monotonic() - start, hedge_won=task is not primary, kind=kind)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in copies:
+                task.cancel()
+
+    @staticmethod
+    async def _ahedge_copy(call: Callable[[], Awaitable[str]], release) -> str:
+        try:
+            return await call()
+        finally:
+            release()
+
+    def _store(self, key: str, content: str):
+        if content:
+            self.cache.set(key, content)
+        else:
+            self.cache.set_negative(key)
+
+    def complete(self, prompt: str, deadline: Optional[Deadline] = None,
+                 profile: Optional[GenerationProfile] = None, health: Optional[ModelHealth] = None) -> str:
+        """Resposta completa; falhas retornam '' e ficam em cache negativo"""
+        key = self.cache_key(prompt, profile)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return self.flights.do(key, lambda: self._fetch(key, prompt, deadline, profile, health),
+                               deadline.remaining() if deadline else None)
+
+    def _fetch(self, key: str, prompt: str, deadline: Optional[Deadline] = None,
+               profile: Optional[GenerationProfile] = None, health: Optional[ModelHealth] = None) -> str:
+        with self._admitted(deadline):
+            try:
+                timeout, cut = self._call_timeout(self.client, deadline)
+            except DeadlineExceeded:
+                self.breaker.release()
+                raise
+            params = self._params(profile)
+            start, failed = time.monotonic(), False
+            try:
+                content = self._hedged(
+                    lambda: self._chat(self._bounded(self.client, timeout, cut), prompt, **params),
+                    self._kind(profile)
+                )
+            except Exception as e:
+                # Prazo da requisição, não falha do upstream: o disjuntor julga só pela lentidão
+                if cut and isinstance(e, _TIMEOUT_ERRORS):
+                    raise DeadlineExceeded(f"LLM sem resposta nos {timeout:.1f}s que restavam") from e
+                failed = True
+                logger.error(f"Erro API: {str(e)}")
+                self.cache.set_negative(key)
+                return ""
+            finally:
+                self._record(not failed, time.monotonic() - start, health)
+
+        self._store(key, content)
+        return content
+
+    def stream(self, prompt: str, deadline: Optional[Deadline] = None,
+               profile: Optional[GenerationProfile] = None, health: Optional[ModelHealth] = None) -> Iterator[str]:
+        """
+        Gera os trechos conforme chegam; um cache hit sai de uma vez. Com
+        `deadline`, a espera no gate e o timeout de cada leitura usam só o que
+        resta, e o stream para (sem cache) quando o prazo acaba no meio.
+        """
+        key = self.cache_key(prompt, profile)
+        cached = self.cache.get(key)
+        if cached is not None:
+            if cached:
+                yield cached
+            return
+
+        parts = []
+        with self._admitted(deadline):
+            try:
+                timeout, cut = self._call_timeout(self.client, deadline)
+            except DeadlineExceeded:
+                self.breaker.release()
+                raise
+            client = self._bounded(self.client, timeout, cut)
+            # Latência do stream para o disjuntor = tempo até o primeiro trecho
+            start, first, failed = time.monotonic(), None, False
+            try:
+                stream = client.chat_completion(
+                    messages=self._messages(prompt),
+                    stream=True,
+                    **self._params(profile)
+                )
+                for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        first = first or time.monotonic()
+                        parts.append(delta)
+                        yield delta
+                    if deadline is not None and deadline.expired:
+                        logger.warning("Prazo esgotado durante o stream do LLM; resposta parcial")
+                        return
+            except Exception as e:
+                if cut and isinstance(e, _TIMEOUT_ERRORS):
+                    raise DeadlineExceeded(f"LLM sem resposta nos {timeout:.1f}s que restavam") from e
+                failed = True
+                logger.error(f"Erro API (stream): {str(e)}")
+                self.cache.set_negative(key)
+                return
+            finally:
+                self._record(not failed, (first or time.monotonic()) - start, health)
+                client.close()
+
+        # Só respostas completas entram no cache
+        self._store(key, "".join(parts))
+
+    def complete_until(self, prompt: str, parse: Callable[[str], Optional[str]],
+                       deadline: Optional[Deadline] = None, profile: Optional[GenerationProfile] = None,
+                       health: Optional[ModelHealth] = None) -> str:
+        """
+        Resposta curta em stream com saída antecipada: a cada trecho `parse`
+        recebe o texto acumulado e, quando reconhece a resposta (ex.: o primeiro
+        rótulo válido), o stream é fechado e o upstream para de gerar.
+        Retorna (e guarda no cache) o valor reconhecido; sem ele, o texto inteiro.
+        """
+        key = self.cache_key(prompt, profile)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return self.flights.do(key, lambda: self._fetch_until(key, prompt, parse, deadline, profile, health),
+                               deadline.remaining() if deadline else None)
+
+    @staticmethod
+    def _read_until(chunks, parse: Callable[[str], Optional[str]]) -> str:
+        text = ""
+        for chunk in chunks:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                text += delta
+                value = parse(text)
+                if value is not None:
+                    return value
+        return text
+
+    def _chat_until(self, client: InferenceClient, prompt: str, parse: Callable[[str], Optional[str]],
+                    params: dict) -> str:
+        """Uma cópia da chamada em stream, num client de _bounded (cada cópia do hedge fecha só o seu)"""
+        try:
+            return self._read_until(client.chat_completion(messages=self._messages(prompt), stream=True,
+                                                           **params), parse)
+        finally:
+            # Fecha a resposta mesmo no meio do stream: o servidor deixa de gerar
+            client.close()
+
+    def _fetch_until(self, key: str, prompt: str, parse: Callable[[str], Optional[str]],
+                     deadline: Optional[Deadline], profile: Optional[GenerationProfile],
+                     health: Optional[ModelHealth]) -> str:
+        with self._admitted(deadline):
+            try:
+                timeout, cut = self._call_timeout(self.client, deadline)
+            except DeadlineExceeded:
+                self.breaker.release()
+                raise
+            params = self._params(profile)
+            start, failed = time.monotonic(), False
+            try:
+                content = self._hedged(
+                    lambda: self._chat_until(self._bounded(self.client, timeout, cut), prompt, parse, params),
+                    self._kind(profile)
+                )
+            except Exception as e:
+                if cut and isinstance(e, _TIMEOUT_ERRORS):
+                    raise DeadlineExceeded(f"LLM sem resposta nos {timeout:.1f}s que restavam") from e
+                failed = True
+                logger.error(f"Erro API (stream): {str(e)}")
+                self.cache.set_negative(key)
+                return ""
+            finally:
+                self._record(not failed, time.monotonic() - start, health)
+
+        self._store(key, content)
+        return content
+
+    async def acomplete(self, prompt: str, deadline: Optional[Deadline] = None,
+                        profile: Optional[GenerationProfile] = None,
+                        health: Optional[ModelHealth] = None) -> str:
+        """Versão assíncrona de complete; o SQLite do cache roda fora do event loop"""
+        key = self.cache_key(prompt, profile)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return cached
+        return await self.flights.ado(key, lambda: self._afetch(key, prompt, deadline, profile, health),
+                                      deadline.remaining() if deadline else None)
+
+    async def _afetch(self, key: str, prompt: str, deadline: Optional[Deadline] = None,
+                      profile: Optional[GenerationProfile] = None,
+                      health: Optional[ModelHealth] = None) -> str:
+        async with self._aadmitted(deadline):
+            try:
+                timeout, cut = self._call_timeout(self.async_client, deadline)
+            except DeadlineExceeded:
+                self.breaker.release()
+                raise
+            params = self._params(profile)
+            start, failed = time.monotonic(), False
+            try:
+                # wait_for cancela a chamada: teto rígido, não só por leitura
+                content = await asyncio.wait_for(
+                    self._ahedged(lambda: self._achat(prompt, params), self._kind(profile)),
+                    timeout if cut else None
+                )
+            except Exception as e:
+                if cut and isinstance(e, _TIMEOUT_ERRORS):
+                    raise DeadlineExceeded(f"LLM sem resposta nos {timeout:.1f}s que restavam") from e
+                failed = True
+                logger.error(f"Erro API: {str(e)}")
+                await asyncio.to_thread(self.cache.set_negative, key)
+                return ""
+            finally:
+                self._record(not failed, time.monotonic() - start, health)
+
+        await asyncio.to_thread(self._store, key, content)
+        return content
+
+    async def acomplete_until(self, prompt: str, parse: Callable[[str], Optional[str]],
+                              deadline: Optional[Deadline] = None,
+                              profile: Optional[GenerationProfile] = None,
+                              health: Optional[ModelHealth] = None) -> str:
+        """Versão assíncrona de complete_until"""
+        key = self.cache_key(prompt, profile)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return cached
+        return await self.flights.ado(key, lambda: self._afetch_until(key, prompt, parse, deadline, profile, health),
+                                      deadline.remaining() if deadline else None)
+
+    async def _achat_until(self, prompt: str, parse: Callable[[str], Optional[str]], params: dict) -> str:
+        """Versão assíncrona de _chat_until; cancelada (hedge perdedor, prazo), também fecha o stream"""
+        client = await self._ascoped()
+        try:
+            stream = await client.chat_completion(messages=self._messages(prompt), stream=True, **params)
+            text = ""
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    text += delta
+                    value = parse(text)
+                    if value is not None:
+                        return value
+            return text
+        finally:
+            await client.close()
+
+    async def _afetch_until(self, key: str, prompt: str, parse: Callable[[str], Optional[str]],
+                            deadline: Optional[Deadline], profile: Optional[GenerationProfile],
+                            health: Optional[ModelHealth]) -> str:
+        async with self._aadmitted(deadline):
+            try:
+                timeout, cut = self._call_timeout(self.async_client, deadline)
+            except DeadlineExceeded:
+                self.breaker.release()
+                raise
+            params = self._params(profile)
+            start, failed = time.monotonic(), False
+            try:
+                content = await asyncio.wait_for(
+                    self._ahedged(lambda: self._achat_until(prompt, parse, params), self._kind(profile)),
+                    timeout if cut else None
+                )
+            except Exception as e:
+                if cut and isinstance(e, _TIMEOUT_ERRORS):
+                    raise DeadlineExceeded(f"LLM sem resposta nos {timeout:.1f}s que restavam") from e
+                failed = True
+                logger.error(f"Erro API (stream): {str(e)}")
+                await asyncio.to_thread(self.cache.set_negative, key)
+                return ""
+            finally:
+                self._record(not failed, time.monotonic() - start, health)
+
+        await asyncio.to_thread(self._store, key, content)
+        return content
+
+    async def astream(self, prompt: str, deadline: Optional[Deadline] = None,
+                      profile: Optional[GenerationProfile] = None,
+                      health: Optional[ModelHealth] = None) -> AsyncIterator[str]:
+        """Versão assíncrona de stream, com os mesmos limites de `deadline`"""
+        key = self.cache_key(prompt, profile)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            if cached:
+                yield cached
+            return
+
+        parts = []
+        async with self._aadmitted(deadline):
+            try:
+                timeout, cut = self._call_timeout(self.async_client, deadline)
+            except DeadlineExceeded:
+                self.breaker.release()
+                raise
+            client = await self._ascoped()
+            if cut:
+                client.timeout = timeout
+            start, first, failed = time.monotonic(), None, False
+            try:
+                stream = await client.chat_completion(
+                    messages=self._messages(prompt),
+                    stream=True,
+                    **self._params(profile)
+                )
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        first = first or time.monotonic()
+                        parts.append(delta)
+                        yield delta
+                    if deadline is not None and deadline.expired:
+                        logger.warning("Prazo esgotado durante o stream do LLM; resposta parcial")
+                        return
+            except Exception as e:
+                if cut and isinstance(e, _TIMEOUT_ERRORS):
+                    raise DeadlineExceeded(f"LLM sem resposta nos {timeout:.1f}s que restavam") from e
+                failed = True
+                logger.error(f"Erro API (stream): {str(e)}")
+                await asyncio.to_thread(self.cache.set_negative, key)
+                return
+            finally:
+                self._record(not failed, (first or time.monotonic()) - start, health)
+                await client.close()
+
+        await asyncio.to_thread(self._store, key, "".join(parts))
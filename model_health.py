@@ -0,0 +1,60 @@
+import time
+import threading
+from typing import Dict, Optional
+
+
+class ModelHealth:
+    """
+    Saúde de um modelo vista pelas chamadas reais: latência e taxa de erro
+    em média móvel exponencial (EWMA, peso `alpha` para a chamada mais nova).
+    A latência só conta chamadas bem-sucedidas (erro rápido não é modelo
+    rápido). A taxa de erro decai pela metade a cada `half_life` segundos sem
+    chamadas, então um modelo deixado de lado volta a ser tentado.
+    """
+
+    def __init__(self, alpha: float = 0.2, half_life: float = 60.0):
+        self.alpha = alpha
+        self.half_life = half_life
+        self._lock = threading.Lock()
+        self._latency: Optional[float] = None
+        self._error = 0.0
+        self._updated_at = time.monotonic()
+        self._calls = 0
+
+    def record(self, ok: bool, duration: float):
+        now = time.monotonic()
+        with self._lock:
+            self._error = self.alpha * (not ok) + (1 - self.alpha) * self._decayed(now)
+            self._updated_at = now
+            self._calls += 1
+            if ok:
+                self._latency = duration if self._latency is None else (
+                    self.alpha * duration + (1 - self.alpha) * self._latency
+                )
+
+    def _decayed(self, now: float) -> float:
+        return self._error * 0.5 ** ((now - self._updated_at) / self.half_life)
+
+    @property
+    def latency(self) -> Optional[float]:
+        """EWMA da latência em segundos (None antes da primeira chamada bem-sucedida)"""
+        with self._lock:
+            return self._latency
+
+    @property
+    def calls(self) -> int:
+        with self._lock:
+            return self._calls
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "latency_ms": round(self._latency * 1000) if self._latency is not None else 0,
+                "error_rate": round(self._decayed(time.monotonic()), 3),
+            }
@@ -0,0 +1,212 @@
+import re
+import logging
+import threading
+from contextlib import aclosing, closing
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from circuit_breaker import CircuitOpenError
+from deadline import Deadline
+from llm_client import GenerationProfile, LLMClient
+from model_health import ModelHealth
+
+logger = logging.getLogger(__name__)
+
+# Tarefas roteadas: rótulo de intenção (curto) e geração de texto longo
+CLASSIFY = "classify"
+GENERATE = "generate"
+
+
+def model_alias(model: str) -> str:
+    """'HuggingFaceH4/zephyr-7b-beta' -> 'zephyr_7b_beta' (prefixo de métricas)"""
+    return re.sub(r"\W+", "_", model.rsplit("/", 1)[-1].lower()).strip("_")
+
+
+class ModelRouter:
+    """
+    Escolhe o modelo de cada tarefa numa cadeia ordenada de LLMClients
+    (preferido primeiro). Modelos com o circuito aberto ou EWMA de erro acima
+    de `max_error_rate` vão para o fim da fila. Entre os saudáveis vale a ordem
+    da cadeia, a não ser que um modelo posterior esteja `switch_ratio` vezes
+    mais rápido (EWMA de latência) que o preferido.
+    A saúde é por (modelo, tarefa): um modelo lento para gerar texto pode
+    seguir bom para classificar. Antes de `min_calls` chamadas reais na
+    tarefa, a EWMA não tira um modelo da ordem da cadeia (só o disjuntor).
+    Se o escolhido falhar (circuito aberto, erro ou resposta vazia), tenta o
+    próximo da cadeia. LLMBusyError e DeadlineExceeded não trocam de modelo:
+    o gate é o mesmo e o prazo é da requisição.
+    Cada tarefa usa o seu GenerationProfile (`profiles`), que vale para todos
+    os modelos da cadeia; uma chamada pode trocá-lo (ex.: lote de classificação).
+    """
+
+    def __init__(self, chains: Dict[str, Sequence[LLMClient]],
+                 profiles: Optional[Dict[str, GenerationProfile]] = None,
+                 max_error_rate: float = 0.5, switch_ratio: float = 2.0, min_calls: int = 5):
+        self.chains = {task: list(chain) for task, chain in chains.items()}
+        self.profiles = dict(profiles or {})
+        self.max_error_rate = max_error_rate
+        self.switch_ratio = switch_ratio
+        self.min_calls = min_calls
+        self.health: Dict[Tuple[str, str], ModelHealth] = {
+            (client.model, task): ModelHealth() for task, chain in self.chains.items() for client in chain
+        }
+        self._lock = threading.Lock()
+        self._stats = {"rerouted": 0, "fallbacks": 0}
+
+    @property
+    def clients(self) -> List[LLMClient]:
+        """Cada LLMClient uma vez, na ordem em que aparece nas cadeias"""
+        seen = {}
+        for chain in self.chains.values():
+            for client in chain:
+                seen.setdefault(id(client), client)
+        return list(seen.values())
+
+    def _health(self, client: LLMClient, task: str) -> ModelHealth:
+        return self.health[(client.model, task)]
+
+    def _latency(self, client: LLMClient, task: str) -> Optional[float]:
+        """EWMA de latência na tarefa; None enquanto houver poucas amostras para comparar"""
+        health = self._health(client, task)
+        return health.latency if health.calls >= self.min_calls else None
+
+    def _healthy(self, client: LLMClient, task: str) -> bool:
+        if client.breaker.state == "open":
+            return False
+        health = self._health(client, task)
+        return health.calls < self.min_calls or health.error_rate < self.max_error_rate
+
+    def route(self, task: str) -> List[LLMClient]:
+        """Ordem de tentativa para a tarefa: o escolhido primeiro, depois o restante da cadeia"""
+        chain = self.chains[task]
+        healthy = [client for client in chain if self._healthy(client, task)]
+        order = healthy + [client for client in chain if client not in healthy]
+        latency = {client.model: self._latency(client, task) for client in healthy}
+        if len(healthy) > 1 and latency[healthy[0].model] is not None:
+            preferred = latency[healthy[0].model]
+            faster = [
+                client for client in healthy[1:]
+                if latency[client.model] is not None and latency[client.model] * self.switch_ratio < preferred
+            ]
+            if faster:
+                best = min(faster, key=lambda client: latency[client.model])
+                order.remove(best)
+                order.insert(0, best)
+        if order[0] is not chain[0]:
+            self._count("rerouted")
+        return order
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _fallback(self, client: LLMClient, task: str, reason: str):
+        self._count("fallbacks")
+        logger.warning(f"Modelo {client.model} falhou em {task} ({reason}); tentando o próximo da cadeia")
+
+    def cache_key(self, prompt: str, task: str = GENERATE) -> str:
+        """Chave do prompt no modelo preferido da tarefa"""
+        return self.chains[task][0].cache_key(prompt, self.profiles.get(task))
+
+    def _first(self, task: str, call: Callable[[LLMClient, ModelHealth], str]) -> str:
+        """Primeira resposta não vazia seguindo a rota da tarefa"""
+        error = None
+        for client in self.route(task):
+            try:
+                content = call(client, self._health(client, task))
+            except CircuitOpenError as e:
+                error = e
+                continue
+            if content:
+                return content
+            self._fallback(client, task, "resposta vazia")
+        if error is not None:
+            raise error
+        return ""
+
+    async def _afirst(self, task: str, call) -> str:
+        error = None
+        for client in self.route(task):
+            try:
+                content = await call(client, self._health(client, task))
+            except CircuitOpenError as e:
+                error = e
+                continue
+            if content:
+                return content
+            self._fallback(client, task, "resposta vazia")
+        if error is not None:
+            raise error
+        return ""
+
+    def complete(self, prompt: str, deadline: Optional[Deadline] = None, task: str = GENERATE,
+                 profile: Optional[GenerationProfile] = None) -> str:
+        profile = profile or self.profiles.get(task)
+        return self._first(task, lambda client, health: client.complete(prompt, deadline, profile, health))
+
+    async def acomplete(self, prompt: str, deadline: Optional[Deadline] = None, task: str = GENERATE,
+                        profile: Optional[GenerationProfile] = None) -> str:
+        profile = profile or self.profiles.get(task)
+        return await self._afirst(task, lambda client, health: client.acomplete(prompt, deadline, profile, health))
+
+    def complete_until(self, prompt: str, parse: Callable[[str], Optional[str]],
+                       deadline: Optional[Deadline] = None, task: str = CLASSIFY) -> str:
+        """LLMClient.complete_until (stream com saída antecipada) na rota da tarefa"""
+        profile = self.profiles.get(task)
+        return self._first(
+            task, lambda client, health: client.complete_until(prompt, parse, deadline, profile, health)
+        )
+
+    async def acomplete_until(self, prompt: str, parse: Callable[[str], Optional[str]],
+                              deadline: Optional[Deadline] = None, task: str = CLASSIFY) -> str:
+        profile = self.profiles.get(task)
+        return await self._afirst(
+            task, lambda client, health: client.acomplete_until(prompt, parse, deadline, profile, health)
+        )
+
+    def stream(self, prompt: str, deadline: Optional[Deadline] = None, task: str = GENERATE) -> Iterator[str]:
+        """
+        Troca de modelo só enquanto nada foi enviado; falha no meio do texto encerra o stream.
+        Fechar este stream fecha o do modelo na hora (e a resposta HTTP dele).
+        """
+        error = None
+        profile = self.profiles.get(task)
+        for client in self.route(task):
+            produced = False
+            try:
+                with closing(client.stream(prompt, deadline, profile, self._health(client, task))) as deltas:
+                    for delta in deltas:
+                        produced = True
+                        yield delta
+            except CircuitOpenError as e:
+                error = e
+                continue
+            if produced:
+                return
+            self._fallback(client, task, "stream vazio")
+        if error is not None:
+            raise error
+
+    async def astream(self, prompt: str, deadline: Optional[Deadline] = None,
+                      task: str = GENERATE) -> AsyncIterator[str]:
+        error = None
+        profile = self.profiles.get(task)
+        for client in self.route(task):
+            produced = False
+            try:
+                async with aclosing(client.astream(prompt, deadline, profile,
+                                                   self._health(client, task))) as deltas:
+                    async for delta in deltas:
+                        produced = True
+                        yield delta
+            except CircuitOpenError as e:
+                error = e
+                continue
+            if produced:
+                return
+            self._fallback(client, task, "stream vazio")
+        if error is not None:
+            raise error
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
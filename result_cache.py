@@ -0,0 +1,77 @@
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    LRU de resultados derivados da tabela de vagas (listas de vagas e
+    respostas VAGAS já renderizadas). Cada consulta confere a versão dos dados:
+    o PRAGMA data_version de uma conexão própria (muda quando qualquer outra
+    conexão ou processo grava) e os contadores recebidos, como as escritas do
+    pool ou a geração do JobIndex. Se a versão mudou, o cache inteiro é
+    descartado antes de responder.
+    Valores em cache são compartilhados: quem lê não deve alterá-los.
+    """
+
+    def __init__(self, db_path: str, counters: Iterable[Callable[[], int]] = (),
+                 max_entries: int = 512):
+        self.db_path = db_path
+        self.counters = tuple(counters)
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False,
+                                     isolation_level=None)
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._version: Optional[Tuple[Tuple[int, ...], int]] = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def _current_version(self) -> Tuple[Tuple[int, ...], int]:
+        counts = tuple(counter() for counter in self.counters)
+        with self._lock:
+            return counts, self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Valor em cache para `key` ou o resultado de `compute()`; exceções não entram no cache"""
+        version = self._current_version()
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self._stats["invalidations"] += 1
+                self._entries.clear()
+                self._version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._entries[key]
+            self._stats["misses"] += 1
+
+        # Versão lida antes de computar: se houver escrita no meio, a próxima
+        # consulta vê outra versão e descarta este valor
+        value = compute()
+        with self._lock:
+            if self._version == version:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return dict(self._stats, entries=len(self._entries),
+                        hit_rate=round(self._stats["hits"] / lookups, 3) if lookups else 0.0)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,332 @@
+import os
+import re
+import sys
+import time
+import zlib
+import random
+import sqlite3
+import logging
+import argparse
+import unicodedata
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DIM = 128
+N_BUCKETS = 2 ** 16
+SEED = 20240601
+# Pesos por tipo de feature: palavras e bigramas carregam o sentido; trigramas
+# de caracteres toleram flexões e erros de digitação ("engenheira", "pyhton")
+WORD_WEIGHT, BIGRAM_WEIGHT, CHAR_WEIGHT = 1.0, 0.7, 0.25
+
+# Equivalências pt/en mais comuns em anúncios de vaga (sem rede, sem modelo)
+SYNONYMS = {
+    "engenheiro": "engenharia", "engenheira": "engenharia", "engineer": "engenharia", "engineering": "engenharia",
+    "dados": "data", "cientista": "ciencia", "scientist": "ciencia", "science": "ciencia",
+    "desenvolvedor": "dev", "desenvolvedora": "dev", "developer": "dev", "desenvolvimento": "dev",
+    "remota": "remoto", "remote": "remoto", "homeoffice": "remoto", "hibrida": "hibrido", "hybrid": "hibrido",
+    "analista": "analyst", "arquiteta": "arquiteto", "architect": "arquiteto",
+    "aprendizado": "ml", "machine": "ml", "learning": "ml",
+    "senior": "sr", "junior": "jr", "pleno": "pl",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+_STOPWORDS = {"de", "da", "do", "das", "dos", "e", "em", "com", "para", "a", "o", "as", "os", "na", "no",
+              "uma", "um", "vaga", "vagas", "of", "and", "the", "for", "with"}
+
+
+def _tokens(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    words = [w.rstrip(".") for w in _TOKEN_RE.findall(text)]
+    return [SYNONYMS.get(w, w) for w in words if w and w not in _STOPWORDS]
+
+
+def _bucket(feature: str) -> int:
+    return zlib.crc32(feature.encode("utf-8")) % N_BUCKETS
+
+
+def features(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Hashing vectorizer: (buckets, pesos) de palavras, bigramas e trigramas de caracteres"""
+    words = _tokens(text)
+    feats = {}
+    for w in words:
+        key = _bucket("w:" + w)
+        feats[key] = feats.get(key, 0.0) + WORD_WEIGHT
+        padded = f"<{w}>"
+        for i in range(len(padded) - 2):
+            b = _bucket("c:" + padded[i:i + 3])
+            feats[b] = feats.get(b, 0.0) + CHAR_WEIGHT
+    for a, b in zip(words, words[1:]):
+        key = _bucket(f"b:{a} {b}")
+        feats[key] = feats.get(key, 0.0) + BIGRAM_WEIGHT
+    if not feats:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return (np.fromiter(feats.keys(), dtype=np.int64, count=len(feats)),
+            np.fromiter(feats.values(), dtype=np.float32, count=len(feats)))
+
+
+class HashingEmbedder:
+    """
+    Vetor esparso do hashing vectorizer projetado em DIM dimensões por uma matriz
+    gaussiana fixa (Johnson-Lindenstrauss): a projeção de um bucket é uma linha da
+    matriz, gerada da semente, nunca treinada nem baixada.
+    """
+
+    def __init__(self, dim: int = DIM, seed: int = SEED):
+        self.dim = dim
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.projection = (rng.standard_normal((N_BUCKETS, dim), dtype=np.float32) / np.sqrt(dim)).astype(np.float32)
+
+    def embed(self, text: str) -> np.ndarray:
+        idx, weights = features(text)
+        vec = weights @ self.projection[idx] if len(idx) else np.zeros(self.dim, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm > 0 else vec).astype(np.float32)
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        """Lote de textos -> matriz (n, dim) normalizada; um gather + reduceat por lote"""
+        feats = [features(t) for t in texts]
+        sizes = np.array([len(idx) for idx, _ in feats], dtype=np.int64)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        nonempty = sizes > 0
+        if nonempty.any():
+            idx = np.concatenate([f[0] for f in feats])
+            weights = np.concatenate([f[1] for f in feats])
+            starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])[nonempty]
+            out[nonempty] = np.add.reduceat(self.projection[idx] * weights[:, None], starts, axis=0)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+def job_text(title: str, skills: str) -> str:
+    """Texto embutido de uma vaga: título duas vezes (pesa mais que a lista de skills)"""
+    return f"{title or ''} {title or ''} {(skills or '').replace('/', ' ')}"
+
+
+class SemanticIndex:
+    """
+    Busca semântica aproximada: vetores float32 num arquivo mapeado em memória,
+    agrupados por lista do IVF (k-means), de modo que cada lista é uma fatia
+    contígua do arquivo. A consulta compara com os centróides, visita as
+    `nprobe` listas mais próximas e reordena os candidatos pelo cosseno exato.
+    """
+
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        with np.load(f"{base_path}.npz") as meta:
+            self.ids = meta["ids"]
+            self.centroids = meta["centroids"]
+            self.offsets = meta["offsets"]
+            self.embedder = HashingEmbedder(int(meta["dim"]), int(meta["seed"]))
+        self.vectors = np.memmap(f"{base_path}.f32", dtype=np.float32, mode="r",
+                                 shape=(len(self.ids), self.embedder.dim)) if len(self.ids) else \
+            np.zeros((0, self.embedder.dim), dtype=np.float32)
+
+    @classmethod
+    def build(cls, base_path: str, docs: Iterable[Tuple[int, str]], nlist: Optional[int] = None,
+              train_size: int = 50_000, iterations: int = 12, chunk: int = 4096) -> "SemanticIndex":
+        """Embute (id, texto) em streaming, treina o IVF numa amostra e grava as listas contíguas"""
+        embedder = HashingEmbedder()
+        tmp_path = f"{base_path}.f32.tmp"
+        ids = []
+        with open(tmp_path, "wb") as tmp:
+            batch_ids, batch_texts = [], []
+            for doc_id, text in docs:
+                batch_ids.append(doc_id)
+                batch_texts.append(text)
+                if len(batch_texts) >= chunk:
+                    tmp.write(embedder.embed_many(batch_texts).tobytes())
+                    ids.extend(batch_ids)
+                    batch_ids, batch_texts = [], []
+            if batch_texts:
+                tmp.write(embedder.embed_many(batch_texts).tobytes())
+                ids.extend(batch_ids)
+        n = len(ids)
+        raw = np.memmap(tmp_path, dtype=np.float32, mode="r", shape=(n, embedder.dim)) if n else \
+            np.zeros((0, embedder.dim), dtype=np.float32)
+
+        nlist = nlist or max(1, min(4096, int(np.sqrt(n))))
+        centroids = _kmeans(raw, nlist, train_size, iterations)
+        assign = np.concatenate([
+            _nearest(raw[start:start + 65536], centroids) for start in range(0, n, 65536)
+        ]) if n else np.zeros(0, dtype=np.int64)
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=len(centroids)))]).astype(np.int64)
+
+        out = np.memmap(f"{base_path}.f32", dtype=np.float32, mode="w+", shape=(max(n, 1), embedder.dim))
+        for start in range(0, n, 65536):
+            # Leitura do arquivo temporário em ordem crescente, escrita na ordem das listas
+            idx = order[start:start + 65536]
+            srt = np.argsort(idx)
+            block = np.empty((len(idx), embedder.dim), dtype=np.float32)
+            block[srt] = raw[idx[srt]]
+            out[start:start + len(idx)] = block
+        out.flush()
+        del out, raw
+        os.remove(tmp_path)
+        np.savez(f"{base_path}.npz", ids=np.array(ids, dtype=np.int64)[order], centroids=centroids,
+                 offsets=offsets, dim=embedder.dim, seed=embedder.seed)
+        return cls(base_path)
+
+    def search(self, query: str, k: int = 10, nprobe: int = 16) -> List[Tuple[int, float]]:
+        """(id da vaga, cosseno) dos k vizinhos aproximados"""
+        q = self.embedder.embed(query)
+        if not q.any() or not len(self.ids):
+            return []
+        lists = np.argsort(-(self.centroids @ q))[:nprobe]
+        spans = [(self.offsets[c], self.offsets[c + 1]) for c in lists if self.offsets[c + 1] > self.offsets[c]]
+        if not spans:
+            return []
+        positions = np.concatenate([np.arange(a, b) for a, b in spans])
+        scores = np.concatenate([np.asarray(self.vectors[a:b]) @ q for a, b in spans])
+        return self._top(positions, scores, k)
+
+    def brute_force(self, query: str, k: int = 10, chunk: int = 262144) -> List[Tuple[int, float]]:
+        """Busca exata em todos os vetores (referência para recall)"""
+        q = self.embedder.embed(query)
+        if not q.any() or not len(self.ids):
+            return []
+        scores = np.concatenate([np.asarray(self.vectors[s:s + chunk]) @ q
+                                 for s in range(0, len(self.ids), chunk)])
+        return self._top(np.arange(len(self.ids)), scores, k)
+
+    def _top(self, positions: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        if len(scores) > k:
+            best = np.argpartition(-scores, k)[:k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(self.ids[positions[i]]), float(scores[i])) for i in best if scores[i] > 0]
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Centróide mais próximo por cosseno (vetores e centróides normalizados)"""
+    return np.argmax(np.asarray(vectors) @ centroids.T, axis=1)
+
+
+def _kmeans(vectors: np.ndarray, nlist: int, train_size: int, iterations: int) -> np.ndarray:
+    """k-means esférico numa amostra; centróides normalizados"""
+    n = len(vectors)
+    if n == 0:
+        return np.zeros((1, vectors.shape[1]), dtype=np.float32)
+    rng = np.random.default_rng(SEED)
+    sample = np.asarray(vectors[np.sort(rng.choice(n, size=min(n, max(train_size, nlist)), replace=False))])
+    nlist = min(nlist, len(sample))
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        # Lista vazia recomeça num ponto aleatório da amostra
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = (sums / np.maximum(norms, 1e-12)).astype(np.float32)
+    return centroids
+
+
+def jobs_from_db(db_path: str) -> Iterator[Tuple[int, str]]:
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        for job_id, title, skills in conn.execute("SELECT id, title, skills FROM jobs ORDER BY id"):
+            yield job_id, job_text(title, skills)
+    finally:
+        conn.close()
+
+
+# ---------- benchmark ----------
+
+_ROLES = ["engenheiro de dados", "cientista de dados", "desenvolvedor backend", "desenvolvedor frontend",
+          "desenvolvedor fullstack", "analista de dados", "engenheiro de machine learning", "devops",
+          "engenheiro de software", "arquiteto de soluções", "desenvolvedor mobile", "analista de qa"]
+_AREA_SKILLS = {
+    "dados": ["spark", "airflow", "sql", "python", "kafka", "dbt", "databricks", "bigquery", "etl"],
+    "ciencia": ["python", "pandas", "scikit-learn", "pytorch", "estatística", "machine learning", "nlp"],
+    "backend": ["java", "spring", "python", "django", "node.js", "postgresql", "api rest", "microserviços"],
+    "frontend": ["react", "typescript", "css", "next.js", "vue.js", "angular", "figma"],
+    "infra": ["aws", "kubernetes", "docker", "terraform", "linux", "ci/cd", "observabilidade"],
+    "mobile": ["kotlin", "swift", "flutter", "react native", "android", "ios"],
+}
+_MODIFIERS = ["remoto", "híbrido", "presencial", "sênior", "pleno", "júnior", "são paulo", "recife",
+              "porto alegre", "belo horizonte", "pj", "clt", "startup", "banco", "varejo"]
+
+
+def _synthetic_text(rng: random.Random) -> str:
+    role = rng.choice(_ROLES)
+    areas = rng.sample(list(_AREA_SKILLS), 2)
+    skills = rng.sample(_AREA_SKILLS[areas[0]], 3) + rng.sample(_AREA_SKILLS[areas[1]], 1)
+    return f"{role} {' '.join(rng.sample(_MODIFIERS, 2))} {' '.join(skills)}"
+
+
+def bench(n: int, queries: int, k: int, nprobe: int, workdir: str):
+    base = os.path.join(workdir, f"career_agent_semantic_{n}")
+    if not os.path.exists(f"{base}.npz"):
+        rng = random.Random(1)
+        start = time.perf_counter()
+        SemanticIndex.build(base, ((i, _synthetic_text(rng)) for i in range(n)))
+        print(f"Índice de {n} vetores construído em {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    index = SemanticIndex(base)
+    rng = random.Random(2)
+    texts = [_synthetic_text(rng) for _ in range(queries)] + [
+        "vaga remota de engenharia de dados com spark", "desenvolvedora react typescript híbrido"]
+
+    ann_lat, exact_lat, recall = [], [], []
+    for text in texts:
+        t0 = time.perf_counter()
+        approx = index.search(text, k, nprobe)
+        t1 = time.perf_counter()
+        exact = index.brute_force(text, k)
+        t2 = time.perf_counter()
+        ann_lat.append((t1 - t0) * 1000)
+        exact_lat.append((t2 - t1) * 1000)
+        if exact:
+            recall.append(len({i for i, _ in approx} & {i for i, _ in exact}) / len(exact))
+
+    ann, exact = np.array(ann_lat), np.array(exact_lat)
+    print(f"{n} vetores, dim={index.embedder.dim}, listas={len(index.centroids)}, nprobe={nprobe}, k={k}")
+    print(f"recall@{k}: {np.mean(recall):.3f}")
+    print(f"IVF   p50={np.percentile(ann, 50):.2f}ms p99={np.percentile(ann, 99):.2f}ms")
+    print(f"exata p50={np.percentile(exact, 50):.2f}ms p99={np.percentile(exact, 99):.2f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Busca semântica local de vagas (hashing + IVF)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = sub.add_parser("build", help="Constrói o índice a partir do banco de vagas")
+    build_cmd.add_argument("--db", default=os.getenv("CAREER_AGENT_DB_PATH", "/tmp/career_agent.db"))
+    build_cmd.add_argument("--out", default="/tmp/career_agent_semantic")
+
+    query_cmd = sub.add_parser("query", help="Consulta um índice construído")
+    query_cmd.add_argument("text")
+    query_cmd.add_argument("--index", default="/tmp/career_agent_semantic")
+    query_cmd.add_argument("-k", type=int, default=10)
+
+    bench_cmd = sub.add_parser("bench", help="Recall e latência do IVF contra a busca exata")
+    bench_cmd.add_argument("--n", type=int, default=1_000_000)
+    bench_cmd.add_argument("--queries", type=int, default=200)
+    bench_cmd.add_argument("-k", type=int, default=10)
+    bench_cmd.add_argument("--nprobe", type=int, default=16)
+    bench_cmd.add_argument("--workdir", default="/tmp")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        index = SemanticIndex.build(args.out, jobs_from_db(os.path.abspath(args.db)))
+        print(f"{len(index.ids)} vagas indexadas em {time.perf_counter() - start:.1f}s -> {args.out}.f32/.npz")
+    elif args.command == "query":
+        for job_id, score in SemanticIndex(args.index).search(args.text, args.k):
+            print(f"{job_id}\t{score:.3f}")
+    else:
+        bench(args.n, args.queries, args.k, args.nprobe, args.workdir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
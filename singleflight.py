@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from deadline import DeadlineExceeded
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplica chamadas concorrentes com a mesma chave: a primeira executa,
+    as demais esperam e recebem o mesmo resultado (ou a mesma exceção).
+    Quem desiste de esperar (timeout, cancelamento) sai sozinho: a chamada
+    compartilhada continua e os demais recebem o resultado dela.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[Tuple[int, str], asyncio.Task] = {}
+        self._stats = {"leaders": 0, "coalesced": 0}
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """`timeout` limita só a espera dos seguidores (o líder executa `fn`)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._stats["leaders" if leader else "coalesced"] += 1
+
+        if not leader:
+            if not call.event.wait(timeout):
+                raise DeadlineExceeded(f"Prazo esgotado aguardando chamada idêntica em andamento ({timeout:g}s)")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """
+        Versão assíncrona; as chamadas são agrupadas por event loop.
+        `fn` roda numa task própria, que não pertence a nenhum chamador:
+        cancelar o líder (ou um seguidor) não cancela a chamada dos demais.
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        with self._lock:
+            task = self._async_calls.get(loop_key)
+            leader = task is None
+            if leader:
+                task = self._async_calls[loop_key] = loop.create_task(fn())
+                task.add_done_callback(lambda t: self._finish(loop_key, t))
+            self._stats["leaders" if leader else "coalesced"] += 1
+
+        if leader:
+            # shield: quem é cancelado sai da espera, a task segue para os demais
+            return await asyncio.shield(task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceeded(f"Prazo esgotado aguardando chamada idêntica em andamento ({timeout:g}s)") from e
+
+    def _finish(self, loop_key: Tuple[int, str], task: asyncio.Task):
+        with self._lock:
+            if self._async_calls.get(loop_key) is task:
+                del self._async_calls[loop_key]
+        # Evita aviso de exceção não consumida quando ninguém mais espera
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionGate, LLMBusyError
+
+
+def test_cap_is_shared_by_threads_and_event_loops():
+    gate = AdmissionGate(max_concurrency=3, max_waiting=100, max_wait=5)
+    lock = threading.Lock()
+    current, peak = [0], [0]
+
+    def enter():
+        with lock:
+            current[0] += 1
+            peak[0] = max(peak[0], current[0])
+
+    def leave():
+        with lock:
+            current[0] -= 1
+
+    def sync_worker():
+        for _ in range(5):
+            with gate.slot():
+                enter()
+                time.sleep(0.005)
+                leave()
+
+    async def async_worker():
+        for _ in range(5):
+            async with gate.aslot():
+                enter()
+                await asyncio.sleep(0.005)
+                leave()
+
+    def loop_worker():
+        async def run():
+            await asyncio.gather(*(async_worker() for _ in range(4)))
+        asyncio.run(run())
+
+    threads = [threading.Thread(target=sync_worker) for _ in range(4)]
+    threads += [threading.Thread(target=loop_worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak[0] == 3
+    assert gate.stats() == {"llm_in_flight": 0, "llm_waiting": 0, "llm_rejected": 0}
+
+
+def test_full_gate_times_out_and_counts_the_rejection():
+    gate = AdmissionGate(max_concurrency=1, max_waiting=1, max_wait=0.01)
+    with gate.slot():
+        with pytest.raises(LLMBusyError):
+            with gate.slot():
+                pass
+    assert gate.stats() == {"llm_in_flight": 0, "llm_waiting": 0, "llm_rejected": 1}
+
+
+def test_try_slot_never_waits_or_jumps_the_queue():
+    gate = AdmissionGate(max_concurrency=1, max_waiting=1, max_wait=5)
+    release = gate.try_slot()
+    assert release is not None
+    assert gate.try_slot() is None
+    release()
+    assert gate.stats() == {"llm_in_flight": 0, "llm_waiting": 0, "llm_rejected": 0}
+
+
+def test_cancelled_waiter_passes_the_slot_on():
+    async def scenario():
+        gate = AdmissionGate(max_concurrency=1, max_waiting=4, max_wait=5)
+        held, done = asyncio.Event(), asyncio.Event()
+
+        async def hold():
+            async with gate.aslot():
+                held.set()
+                await done.wait()
+
+        async def take():
+            async with gate.aslot():
+                return "ok"
+
+        holder = asyncio.create_task(hold())
+        await held.wait()
+        cancelled = asyncio.create_task(take())
+        waiting = asyncio.create_task(take())
+        await asyncio.sleep(0.01)
+        # A vaga chega ao primeiro da fila e ele é cancelado antes de acordar
+        done.set()
+        await holder
+        cancelled.cancel()
+
+        assert await waiting == "ok"
+        assert gate.stats() == {"llm_in_flight": 0, "llm_waiting": 0, "llm_rejected": 0}
+
+    asyncio.run(scenario())
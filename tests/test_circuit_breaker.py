@@ -0,0 +1,160 @@
+import contextlib
+import copy
+from types import SimpleNamespace
+
+import pytest
+
+import circuit_breaker
+import llm_client
+from admission import AdmissionGate
+from career_agent import CareerAgent
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from llm_cache import LLMCache
+from llm_client import LLMClient
+from model_router import CLASSIFY, model_alias
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeClient:
+    """InferenceClient mínimo: falha enquanto `failing`, senão responde 'ok'"""
+
+    model = "fake-model"
+    timeout = None
+
+    def __init__(self, failing=True):
+        self.failing = failing
+        self.requests = []  # compartilhada com as cópias de LLMClient._scoped
+        self.exit_stack = contextlib.ExitStack()
+
+    @property
+    def calls(self):
+        return len(self.requests)
+
+    def chat_completion(self, messages, **params):
+        self.requests.append(messages)
+        if self.failing:
+            raise ConnectionError("upstream fora do ar")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    def close(self):
+        self.exit_stack.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, "time", clock)
+    monkeypatch.setattr(llm_client, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(str(tmp_path / "cache.db"))
+
+
+def _llm(cache, client, breaker):
+    return LLMClient(client, None, cache, AdmissionGate(2, 2, 1.0), breaker=breaker)
+
+
+def test_closed_open_half_open_closed(clock, cache):
+    client = FakeClient()
+    breaker = CircuitBreaker(min_calls=3, open_for=30)
+    llm = _llm(cache, client, breaker)
+
+    for i in range(3):
+        assert llm.complete(f"pergunta {i}") == ""
+    assert breaker.state == "open"
+
+    # Aberto: rejeita sem tocar no upstream
+    with pytest.raises(CircuitOpenError):
+        llm.complete("pergunta 3")
+    assert client.calls == 3
+
+    clock.advance(30)
+    assert breaker.state == "half_open"
+    client.failing = False
+    assert llm.complete("pergunta 4") == "ok"
+    assert breaker.state == "closed"
+    assert breaker.stats()["opened"] == 1
+
+
+def test_failed_probe_reopens_and_only_one_probe_passes(clock):
+    breaker = CircuitBreaker(min_calls=1, open_for=30)
+    breaker.before_call()
+    breaker.record(False, 0.1)
+    assert breaker.state == "open"
+
+    clock.advance(30)
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(False, 0.1)
+    assert breaker.state == "open"
+
+    clock.advance(29)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_opens_only_at_the_failure_threshold(clock):
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, window=60)
+    # Poucas chamadas: nem 100% de erro abre antes de min_calls
+    for _ in range(3):
+        breaker.record(False, 0.1)
+    assert breaker.state == "closed"
+
+    # Falhas antigas saem da janela
+    clock.advance(61)
+    for ok in (True, True, False):
+        breaker.record(ok, 0.1)
+    assert breaker.state == "closed"
+    breaker.record(True, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == "closed"  # 2/5
+    breaker.record(False, 0.1)
+    assert breaker.state == "open"  # 3/6
+
+
+def test_slow_calls_open_the_circuit(clock):
+    breaker = CircuitBreaker(slow_rate=0.5, slow_call=10, min_calls=2)
+    breaker.record(True, 0.5)
+    breaker.record(True, 12)
+    assert breaker.state == "open"
+    assert breaker.stats()["slow_calls"] == 1
+
+
+def test_safe_respond_falls_back_locally_when_open(tmp_path, monkeypatch):
+    monkeypatch.setenv("HF_TOKEN", "hf_" + "x" * 34)
+    monkeypatch.setenv("CAREER_AGENT_CACHE_DB", str(tmp_path / "cache.db"))
+    agent = CareerAgent(db_path=str(tmp_path / "jobs.db"))
+    client = FakeClient()
+    models = agent.llm.chains[CLASSIFY]
+    for model in models:
+        # Cópias que mantêm o nome do modelo e dividem a lista de chamadas
+        fake = copy.copy(client)
+        fake.model = model.client.model
+        model.client = fake
+    fallback = agent._local_fallback("")
+
+    # Sem keyword, cada mensagem vai ao LLM para classificar e passa por toda a
+    # cadeia; a 10ª falha de cada modelo abre o circuito dele
+    for i in range(10):
+        agent.safe_respond(f"me ajude com isso número {i}", [])
+    assert all(model.breaker.state == "open" for model in models)
+
+    assert agent.safe_respond("me ajude com outra coisa", [])["content"] == fallback
+    assert client.calls == 10 * len(models)
+    alias = model_alias(models[-1].model)
+    assert agent.metrics()[f"llm_circuit_{alias}_rejected"] == 1
+    agent.db.close()
@@ -0,0 +1,49 @@
+import sqlite3
+
+import pytest
+
+from db_migrations import MIGRATIONS, SCHEMA_VERSION, migrate, schema_version
+from job_store import upsert_jobs
+
+JOBS = [
+    ("Desenvolvedor Java Pleno", "Tech Innovations", "Java/Spring", "R$ 12.000", "https://exemplo.com/java"),
+    ("Cientista de Dados", "AI Tech", "Python/Pandas", "R$ 15.000", "https://exemplo.com/dados"),
+]
+
+
+def _objects(conn):
+    return conn.execute("SELECT type, name, sql FROM sqlite_master ORDER BY type, name").fetchall()
+
+
+def test_migrate_twice_is_noop(tmp_path):
+    conn = sqlite3.connect(tmp_path / "jobs.db")
+    assert migrate(conn) == [version for version, _, _ in MIGRATIONS]
+    schema = _objects(conn)
+
+    assert migrate(conn) == []
+    assert schema_version(conn) == SCHEMA_VERSION
+    assert _objects(conn) == schema
+
+
+def test_reopened_database_keeps_data(tmp_path):
+    path = tmp_path / "jobs.db"
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    upsert_jobs(conn.cursor(), JOBS)
+    upsert_jobs(conn.cursor(), JOBS)
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(path)
+    assert migrate(conn) == []
+    assert schema_version(conn) == SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == len(JOBS)
+    # Triggers da migração do FTS5 seguem sincronizando o índice
+    assert conn.execute("SELECT COUNT(*) FROM jobs_fts WHERE jobs_fts MATCH 'pandas'").fetchone()[0] == 1
+
+
+def test_newer_database_is_rejected(tmp_path):
+    conn = sqlite3.connect(tmp_path / "jobs.db")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+    with pytest.raises(RuntimeError):
+        migrate(conn)
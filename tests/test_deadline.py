@@ -0,0 +1,88 @@
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+
+import deadline as deadline_module
+import llm_client
+from admission import AdmissionGate
+from deadline import Deadline, DeadlineExceeded
+from llm_cache import LLMCache
+from llm_client import LLMClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class StreamingClient:
+    """InferenceClient mínimo que faz stream de `chunks`, avançando o relógio a cada trecho"""
+
+    model = "fake-model"
+    timeout = 120
+
+    def __init__(self, clock, chunks, step):
+        self.clock = clock
+        self.chunks = chunks
+        self.step = step
+        self.timeouts = []  # timeout visto por cada cópia de LLMClient._scoped
+        self.exit_stack = contextlib.ExitStack()
+
+    def chat_completion(self, messages, stream=False, **params):
+        self.timeouts.append(self.timeout)
+        for text in self.chunks:
+            self.clock.now += self.step
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    def close(self):
+        self.exit_stack.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    for module in (deadline_module, llm_client):
+        monkeypatch.setattr(module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(str(tmp_path / "cache.db"))
+
+
+def test_stream_uses_remaining_budget_and_stops_when_it_ends(clock, cache):
+    client = StreamingClient(clock, ["a", "b", "c", "d"], step=1.0)
+    llm = LLMClient(client, None, cache, AdmissionGate(2, 2, 1.0))
+
+    parts = list(llm.stream("pergunta", Deadline(2.5)))
+
+    assert client.timeouts == [2.5]
+    assert client.timeout == 120  # o client compartilhado não é alterado
+    assert parts == ["a", "b", "c"]
+    assert cache.get(llm.cache_key("pergunta")) is None  # resposta parcial não entra no cache
+
+
+def test_stream_without_deadline_keeps_client_timeout_and_caches(clock, cache):
+    client = StreamingClient(clock, ["a", "b"], step=1.0)
+    llm = LLMClient(client, None, cache, AdmissionGate(2, 2, 1.0))
+
+    assert "".join(llm.stream("pergunta")) == "ab"
+    assert client.timeouts == [120]
+    assert cache.get(llm.cache_key("pergunta")) == "ab"
+
+
+def test_stream_with_expired_deadline_raises_before_calling(clock, cache):
+    client = StreamingClient(clock, ["a"], step=1.0)
+    llm = LLMClient(client, None, cache, AdmissionGate(2, 2, 1.0))
+    expired = Deadline(1.0)
+    clock.now += 1.0
+
+    with pytest.raises(DeadlineExceeded):
+        list(llm.stream("pergunta", expired))
+    assert client.timeouts == []
+    assert llm.breaker.stats()["window_calls"] == 0
@@ -0,0 +1,130 @@
+import asyncio
+import contextlib
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from admission import AdmissionGate
+from llm_cache import LLMCache
+from llm_client import GenerationProfile, LLMClient
+
+LABELS = {"VAGAS", "SALARIO", "CURRICULO", "OUTROS"}
+CLASSIFY = GenerationProfile("classify", max_tokens=10, temperature=0.1, stop=("\n\n",))
+# Rótulo no 4º de 33 trechos; o resto é texto que o modelo geraria à toa
+CHUNKS = ["Inten", "ção", ": ", "SALARIO", "."] + [" explicação"] * 28
+
+
+def first_label(text):
+    for word in re.findall(r"[A-Z]+", text):
+        if word in LABELS:
+            return word
+    return None
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class Upstream:
+    """Estado compartilhado pelas cópias do client: trechos lidos e respostas fechadas"""
+
+    def __init__(self):
+        self.read = 0
+        self.closed = 0
+        self.requests = []
+
+
+class StreamingClient:
+    """InferenceClient mínimo: a resposta em stream fica na exit_stack, como no huggingface_hub"""
+
+    model = "fake-model"
+    timeout = None
+
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self.exit_stack = contextlib.ExitStack()
+
+    def chat_completion(self, messages, stream=False, **params):
+        self.upstream.requests.append(params)
+        response = self._response()
+        self.exit_stack.callback(response.close)
+        return response
+
+    def _response(self):
+        try:
+            for text in CHUNKS:
+                self.upstream.read += 1
+                yield _chunk(text)
+        finally:
+            self.upstream.closed += 1
+
+    def close(self):
+        self.exit_stack.close()
+
+
+class AsyncStreamingClient:
+    model = "fake-model"
+    timeout = None
+
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self.exit_stack = contextlib.AsyncExitStack()
+
+    async def _get_async_client(self):
+        pass
+
+    async def chat_completion(self, messages, stream=False, **params):
+        self.upstream.requests.append(params)
+        response = self._response()
+        self.exit_stack.push_async_callback(response.aclose)
+        return response
+
+    async def _response(self):
+        try:
+            for text in CHUNKS:
+                self.upstream.read += 1
+                yield _chunk(text)
+        finally:
+            self.upstream.closed += 1
+
+    async def close(self):
+        await self.exit_stack.aclose()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(str(tmp_path / "cache.db"))
+
+
+def test_stream_closes_on_first_label_and_caches_only_it(cache):
+    upstream = Upstream()
+    llm = LLMClient(StreamingClient(upstream), None, cache, AdmissionGate(2, 2, 1.0))
+
+    assert llm.complete_until("mensagem", first_label, profile=CLASSIFY) == "SALARIO"
+    assert upstream.read == 4 and upstream.closed == 1
+    assert upstream.requests == [CLASSIFY.params()]
+    assert cache.get(llm.cache_key("mensagem", CLASSIFY)) == "SALARIO"
+    # O perfil separa as respostas no cache
+    assert cache.get(llm.cache_key("mensagem")) is None
+
+    assert llm.complete_until("mensagem", first_label, profile=CLASSIFY) == "SALARIO"
+    assert len(upstream.requests) == 1
+
+
+def test_async_stream_closes_on_first_label_and_caches_only_it(cache):
+    upstream = Upstream()
+    llm = LLMClient(StreamingClient(Upstream()), AsyncStreamingClient(upstream), cache, AdmissionGate(2, 2, 1.0))
+
+    label = asyncio.run(llm.acomplete_until("mensagem", first_label, profile=CLASSIFY))
+    assert label == "SALARIO"
+    assert upstream.read == 4 and upstream.closed == 1
+    assert cache.get(llm.cache_key("mensagem", CLASSIFY)) == "SALARIO"
+
+
+def test_without_a_label_the_whole_text_is_returned(cache):
+    upstream = Upstream()
+    llm = LLMClient(StreamingClient(upstream), None, cache, AdmissionGate(2, 2, 1.0))
+
+    assert llm.complete_until("mensagem", lambda text: None, profile=CLASSIFY) == "".join(CHUNKS)
+    assert upstream.read == len(CHUNKS) and upstream.closed == 1
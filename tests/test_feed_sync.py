@@ -0,0 +1,90 @@
+import os
+import threading
+
+import pytest
+
+from db_migrations import ensure_schema
+from db_pool import ConnectionPool
+from feed_sync import FeedSyncWorker, serve_feed
+
+HEADER = "title,company,skills,salary,link\n"
+JAVA = "Desenvolvedor Java Pleno,Tech Innovations,Java/Spring,R$ 12.000,https://exemplo.com/java\n"
+DADOS = "Cientista de Dados,AI Tech,Python/Pandas,R$ 15.000,https://exemplo.com/dados\n"
+ENG = "Engenheiro de Dados,Data Corp,Python/SQL,R$ 12.000,https://exemplo.com/eng\n"
+GO = "Desenvolvedor Go,Cloud Systems,Go/Kubernetes,R$ 16.000,https://exemplo.com/go\n"
+
+
+@pytest.fixture
+def pool(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    ensure_schema(path)
+    pool = ConnectionPool(path, max_readers=1)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def feed(tmp_path):
+    path = tmp_path / "feed.csv"
+    path.write_text(HEADER + JAVA + DADOS + ENG, encoding="utf-8")
+    server = serve_feed(str(path), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path, f"http://127.0.0.1:{server.server_address[1]}/feed.csv"
+    server.shutdown()
+    server.server_close()
+
+
+def _rewrite(path, text):
+    # ETag vem de mtime/tamanho: garante um mtime novo mesmo em sistemas de arquivos lentos
+    mtime = os.stat(path).st_mtime_ns
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime + 10**9, mtime + 10**9))
+
+
+def _jobs(pool):
+    with pool.reader() as conn:
+        return conn.execute("SELECT title, skills, salary_max FROM jobs ORDER BY title").fetchall()
+
+
+def test_first_sync_inserts_then_not_modified(pool, feed):
+    path, url = feed
+    worker = FeedSyncWorker(pool, [url])
+
+    first = worker.sync(url)
+    assert (first["status"], first["inserted"], first["updated"], first["expired"]) == (200, 3, 0, 0)
+    rows = _jobs(pool)
+    assert len(rows) == 3
+
+    writes = []
+    worker._write = lambda url, batch: writes.append(batch)
+    second = worker.sync(url)
+    assert second["status"] == 304
+    assert (second["inserted"], second["updated"], second["expired"]) == (0, 0, 0)
+    assert writes == []
+    assert _jobs(pool) == rows
+    assert worker.stats()["not_modified"] == 1
+
+
+def test_changed_feed_writes_only_the_delta(pool, feed):
+    path, url = feed
+    worker = FeedSyncWorker(pool, [url])
+    worker.sync(url)
+
+    # Dados muda de salário, Engenheiro sai do feed e Go entra
+    _rewrite(path, HEADER + JAVA + DADOS.replace("R$ 15.000", "R$ 18.000") + GO)
+    result = worker.sync(url)
+
+    assert result["status"] == 200
+    assert (result["inserted"], result["updated"], result["expired"], result["unchanged"]) == (1, 1, 1, 1)
+    assert _jobs(pool) == [
+        ("Cientista de Dados", "Python/Pandas", 18000),
+        ("Desenvolvedor Go", "Go/Kubernetes", 16000),
+        ("Desenvolvedor Java Pleno", "Java/Spring", 12000),
+    ]
+    with pool.reader() as conn:
+        # job_skills acompanha a expiração (ON DELETE CASCADE)
+        orphans = conn.execute(
+            "SELECT COUNT(*) FROM job_skills WHERE job_id NOT IN (SELECT id FROM jobs)"
+        ).fetchone()[0]
+    assert orphans == 0
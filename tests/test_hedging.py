@@ -0,0 +1,161 @@
+import asyncio
+import contextlib
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from admission import AdmissionGate
+from hedging import Hedger
+from llm_cache import LLMCache
+from llm_client import LLMClient
+
+
+def _response(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class SlowFirstClient:
+    """InferenceClient mínimo: a 1ª chamada demora `slow`s, as seguintes respondem na hora"""
+
+    model = "fake-model"
+    timeout = None
+
+    def __init__(self, slow=0.5):
+        self.slow = slow
+        self.calls = []  # compartilhadas com as cópias de LLMClient._scoped
+        self.answered = []
+        self.lock = threading.Lock()
+        self.exit_stack = contextlib.ExitStack()
+
+    def chat_completion(self, messages, **params):
+        with self.lock:
+            first = not self.calls
+            self.calls.append(messages)
+        if first:
+            time.sleep(self.slow)
+        content = "lenta" if first else "rápida"
+        self.answered.append(content)
+        return _response(content)
+
+    def close(self):
+        self.exit_stack.close()
+
+
+class AsyncSlowFirstClient:
+    model = "fake-model"
+
+    def __init__(self, slow=0.5):
+        self.slow = slow
+        self.calls = 0
+        self.cancelled = 0
+
+    async def chat_completion(self, messages, **params):
+        self.calls += 1
+        if self.calls == 1:
+            try:
+                await asyncio.sleep(self.slow)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            return _response("lenta")
+        return _response("rápida")
+
+
+def _trained(**kwargs):
+    """Hedger já com amostras: hedge após 50ms e ficha para todas as chamadas"""
+    hedger = Hedger(min_samples=1, min_delay=0.05, max_rate=1.0, **kwargs)
+    hedger.record(0.01)
+    return hedger
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(str(tmp_path / "cache.db"))
+
+
+def test_delay_is_observed_p95_after_min_samples():
+    hedger = Hedger(min_samples=20, min_delay=0.0)
+    for ms in range(1, 20):
+        hedger.record(ms / 1000)
+    assert hedger.begin() is None
+
+    for ms in range(20, 101):
+        hedger.record(ms / 1000)
+    assert hedger.begin() == pytest.approx(0.095)
+    assert hedger.stats()["delay_default_ms"] == 95
+
+    # Piso: latências muito baixas não viram hedge agressivo
+    floored = Hedger(min_samples=1, min_delay=0.5)
+    floored.record(0.01)
+    assert floored.begin() == 0.5
+
+
+def test_each_kind_has_its_own_latency_window():
+    hedger = Hedger(min_samples=5, min_delay=0.0)
+    for _ in range(5):
+        hedger.record(0.1, kind="classify")
+        hedger.record(4.0, kind="generate")
+    assert hedger.begin("classify") == pytest.approx(0.1)
+    assert hedger.begin("generate") == pytest.approx(4.0)
+    assert hedger.begin("classify_batch") is None
+    stats = hedger.stats()
+    assert (stats["delay_classify_ms"], stats["delay_generate_ms"]) == (100, 4000)
+    # O balde de fichas é um só para todos os tipos
+    assert stats["calls"] == 3
+
+
+def test_hedge_rate_is_capped():
+    hedger = Hedger(max_rate=0.05, burst=1.0)
+    hedged = 0
+    for _ in range(1000):
+        hedger.begin()
+        hedged += hedger.allow()
+    assert hedged == 50
+    assert hedger.stats()["rate"] == 0.05
+    assert hedger.stats()["suppressed"] == 950
+
+
+def test_sync_first_copy_wins_and_extra_slot_returns(cache):
+    client = SlowFirstClient(slow=0.5)
+    gate = AdmissionGate(2, 2, 1.0)
+    llm = LLMClient(client, None, cache, gate, hedger=_trained())
+
+    begin = time.monotonic()
+    assert llm.complete("pergunta") == "rápida"
+    assert time.monotonic() - begin < 0.4
+    stats = llm.hedger.stats()
+    assert (stats["hedged"], stats["wins"]) == (1, 1)
+
+    # A cópia perdedora termina em segundo plano e só então devolve a vaga extra
+    time.sleep(0.6)
+    assert gate.stats()["llm_in_flight"] == 0
+    assert client.answered == ["rápida", "lenta"]
+
+
+def test_async_first_copy_wins_and_loser_is_cancelled(cache):
+    client = AsyncSlowFirstClient(slow=5)
+    gate = AdmissionGate(2, 2, 1.0)
+    llm = LLMClient(SlowFirstClient(), client, cache, gate, hedger=_trained())
+
+    async def scenario():
+        begin = time.monotonic()
+        assert await llm.acomplete("pergunta") == "rápida"
+        assert time.monotonic() - begin < 1
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert client.calls == 2 and client.cancelled == 1
+    assert llm.hedger.stats()["wins"] == 1
+    assert gate.stats()["llm_in_flight"] == 0
+
+
+def test_no_hedge_without_a_free_gate_slot(cache):
+    client = SlowFirstClient(slow=0.2)
+    llm = LLMClient(client, None, cache, AdmissionGate(1, 2, 1.0), hedger=_trained())
+
+    assert llm.complete("pergunta") == "lenta"
+    assert len(client.calls) == 1
+    stats = llm.hedger.stats()
+    assert (stats["hedged"], stats["suppressed"]) == (0, 1)
@@ -0,0 +1,85 @@
+import sqlite3
+
+import pytest
+
+from db_migrations import migrate
+from db_pool import ConnectionPool
+from job_ingest import ingest, read_jobs
+
+CSV = """title,company,skills,salary,link
+Desenvolvedor Java Pleno,Tech Innovations,Java/Spring,R$ 12.000,https://exemplo.com/java
+Cientista de Dados,AI Tech,Python/Pandas,R$ 15.000,https://exemplo.com/dados
+Engenheiro de Dados,Data Corp,Python/SQL,R$ 12.000,https://exemplo.com/eng?utm_source=feed
+Engenheiro de Dados,Data Corp,Python/SQL,R$ 12.000,https://exemplo.com/eng
+,Sem Título,Go,,https://exemplo.com/invalida
+"""
+
+
+@pytest.fixture
+def pool(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.close()
+    pool = ConnectionPool(path, max_readers=1)
+    yield pool
+    pool.close()
+
+
+def _counts(pool):
+    with pool.reader() as conn:
+        return tuple(conn.execute(sql).fetchone()[0] for sql in (
+            "SELECT COUNT(*) FROM jobs",
+            "SELECT COUNT(*) FROM job_skills",
+            "SELECT COUNT(*) FROM jobs_fts",
+        ))
+
+
+def test_ingest_twice_has_no_duplicates(pool, tmp_path):
+    feed = tmp_path / "feed.csv"
+    feed.write_text(CSV, encoding="utf-8")
+
+    stats = {}
+    ingest(pool, read_jobs(str(feed), stats=stats), batch_size=2)
+    first = _counts(pool)
+    ingest(pool, read_jobs(str(feed)), batch_size=2)
+
+    assert stats["skipped"] == 1
+    # Link com parâmetro de rastreamento é a mesma vaga
+    assert first[0] == 3
+    assert _counts(pool) == first
+
+
+def test_ingest_updates_in_place(pool, tmp_path):
+    feed = tmp_path / "feed.csv"
+    feed.write_text(CSV, encoding="utf-8")
+    ingest(pool, read_jobs(str(feed)))
+
+    feed.write_text(CSV.replace("Python/Pandas,R$ 15.000", "Python/Pandas/Spark,R$ 18.000"), encoding="utf-8")
+    ingest(pool, read_jobs(str(feed)))
+
+    with pool.reader() as conn:
+        rows = conn.execute("SELECT skills, salary_max FROM jobs WHERE company = 'AI Tech'").fetchall()
+        spark = conn.execute("SELECT COUNT(*) FROM jobs_fts WHERE jobs_fts MATCH 'spark'").fetchone()[0]
+    assert rows == [("Python/Pandas/Spark", 18000)]
+    assert spark == 1
+
+
+def test_ingest_geocodes_city_and_state(pool, tmp_path):
+    feed = tmp_path / "feed.csv"
+    feed.write_text(
+        "title,company,skills,salary,link,city,state\n"
+        "Desenvolvedor Java,Tech Innovations,Java/Spring,R$ 12.000,https://exemplo.com/java,Campinas,SP\n"
+        "Engenheiro de Dados,Data Corp,Python/SQL,R$ 12.000,https://exemplo.com/eng,Recife,\n"
+        "Cientista de Dados,AI Tech,Python/Pandas,R$ 15.000,https://exemplo.com/dados,,\n",
+        encoding="utf-8",
+    )
+    ingest(pool, read_jobs(str(feed)))
+
+    with pool.reader() as conn:
+        located = conn.execute(
+            "SELECT location FROM jobs WHERE lat IS NOT NULL ORDER BY location"
+        ).fetchall()
+        geo = conn.execute("SELECT COUNT(*) FROM job_geo").fetchone()[0]
+    assert located == [("Campinas, SP",), ("Recife",)]
+    assert geo == 2
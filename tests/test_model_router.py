@@ -0,0 +1,108 @@
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+
+from admission import AdmissionGate
+from llm_cache import LLMCache
+from llm_client import LLMClient
+from model_router import CLASSIFY, GENERATE, ModelRouter
+
+
+class FakeClient:
+    """InferenceClient mínimo de um modelo: responde o próprio nome (letra a letra no stream) ou falha enquanto `failing`"""
+
+    timeout = None
+
+    def __init__(self, model, failing=False):
+        self.model = model
+        self.failing = failing
+        self.closes = []  # compartilhada com as cópias de LLMClient._scoped
+        self.exit_stack = contextlib.ExitStack()
+
+    @property
+    def closed(self):
+        return len(self.closes)
+
+    def chat_completion(self, messages, stream=False, **params):
+        if self.failing:
+            raise ConnectionError(f"{self.model} fora do ar")
+        if stream:
+            return (SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=c))]) for c in self.model)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.model))])
+
+    def close(self):
+        self.closes.append(True)
+        self.exit_stack.close()
+
+
+@pytest.fixture
+def models(tmp_path):
+    cache, gate = LLMCache(str(tmp_path / "cache.db")), AdmissionGate(2, 2, 1.0)
+    return [LLMClient(FakeClient(name), None, cache, gate) for name in ("preferido", "reserva")]
+
+
+def _router(models, **kwargs):
+    return ModelRouter({CLASSIFY: models, GENERATE: models}, **kwargs)
+
+
+def test_health_is_tracked_per_model_and_task(models):
+    preferred, backup = models
+    router = _router(models)
+    preferred.client.failing = True
+
+    assert router.complete("texto longo", task=GENERATE) == "reserva"
+    assert router.stats()["fallbacks"] == 1
+    failed = router.health[("preferido", GENERATE)]
+    assert failed.calls == 1 and failed.error_rate > 0
+    assert router.health[("reserva", GENERATE)].calls == 1
+    assert router.health[("preferido", CLASSIFY)].calls == 0
+
+
+def test_errors_reroute_only_after_min_calls(models):
+    preferred, backup = models
+    router = _router(models, min_calls=3, max_error_rate=0.3)
+    preferred.client.failing = True
+
+    for i in range(2):
+        router.complete(f"texto {i}", task=GENERATE)
+    # EWMA de erro já acima do limite, mas com poucas amostras
+    assert router.health[("preferido", GENERATE)].error_rate >= 0.3
+    assert router.route(GENERATE)[0] is preferred
+    router.complete("texto 2", task=GENERATE)
+
+    assert router.route(GENERATE) == [backup, preferred]
+    # Os erros em geração não afetam a classificação
+    assert router.route(CLASSIFY) == [preferred, backup]
+    assert preferred.breaker.state == "closed"
+
+
+def test_latency_switch_needs_min_calls_of_both_models(models):
+    preferred, backup = models
+    router = _router(models, min_calls=5)
+    for _ in range(5):
+        router.health[("preferido", GENERATE)].record(True, 1.0)
+    for _ in range(4):
+        router.health[("reserva", GENERATE)].record(True, 0.1)
+    assert router.route(GENERATE)[0] is preferred
+
+    router.health[("reserva", GENERATE)].record(True, 0.1)
+    assert router.route(GENERATE)[0] is backup
+    assert router.route(CLASSIFY)[0] is preferred
+    assert router.stats()["rerouted"] == 1
+
+
+def test_stream_falls_back_before_the_first_chunk_and_closes_early(models):
+    preferred, backup = models
+    router = _router(models)
+    preferred.client.failing = True
+
+    assert "".join(router.stream("texto", task=GENERATE)) == "reserva"
+    assert router.health[("preferido", GENERATE)].error_rate > 0
+
+    # Fechar o stream do roteador fecha o do modelo (e o client da chamada) na hora
+    deltas = router.stream("outro texto", task=GENERATE)
+    assert next(deltas) == "r"
+    deltas.close()
+    assert backup.client.closed == 2
+    assert router.health[("reserva", GENERATE)].calls == 2
@@ -0,0 +1,56 @@
+import re
+
+import pytest
+
+from career_agent import CareerAgent
+from semantic_search import SemanticIndex, jobs_from_db
+
+STACK_QUERIES = [
+    "vagas backend",
+    "vagas backend mais bem pagas",
+    "vagas de java acima de 12k",
+    "vagas de micronaut com aws",
+]
+# Nenhum termo casa no FTS (anúncios em português); só o índice semântico acha algo
+ENGLISH_QUERY = "vagas data engineer scientist"
+
+
+@pytest.fixture
+def agents(tmp_path, monkeypatch):
+    monkeypatch.setenv("HF_TOKEN", "hf_" + "x" * 34)
+    monkeypatch.setenv("CAREER_AGENT_CACHE_DB", str(tmp_path / "cache.db"))
+    plain = CareerAgent(db_path=str(tmp_path / "plain.db"))
+    index_path = str(tmp_path / "semantic")
+    SemanticIndex.build(index_path, jobs_from_db(plain.db_path))
+    semantic = CareerAgent(db_path=str(tmp_path / "semantic.db"), semantic_index_path=index_path)
+    assert semantic.semantic_index is not None
+    yield plain, semantic
+    for agent in (plain, semantic):
+        agent.db.close()
+
+
+def _salaries(content):
+    return [int(value.replace(".", "")) for value in re.findall(r"R\$ ([\d.]+)", content)]
+
+
+def test_stack_and_keyword_queries_keep_their_ordering(agents):
+    plain, semantic = agents
+    for query in STACK_QUERIES:
+        expected = plain._process_message(query)["content"]
+        assert "Vagas Encontradas" in expected
+        assert semantic._process_message(query)["content"] == expected
+
+
+def test_semantic_search_only_when_text_search_finds_nothing(agents):
+    plain, semantic = agents
+    assert "Nenhuma vaga" in plain._process_message(ENGLISH_QUERY)["content"]
+    assert "Vagas Encontradas" in semantic._process_message(ENGLISH_QUERY)["content"]
+
+
+def test_semantic_fallback_applies_salary_filters(agents):
+    _, semantic = agents
+    content = semantic._process_message(f"{ENGLISH_QUERY} acima de 13k")["content"]
+    assert _salaries(content) and min(_salaries(content)) >= 13000
+
+    salaries = _salaries(semantic._process_message(f"{ENGLISH_QUERY} mais bem pagas")["content"])
+    assert len(salaries) > 1 and salaries == sorted(salaries, reverse=True)
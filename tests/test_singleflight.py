@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from deadline import DeadlineExceeded
+from singleflight import SingleFlight
+
+
+def test_async_leader_cancelled_followers_get_result():
+    async def scenario():
+        flights = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.1)
+            return "resposta"
+
+        leader = asyncio.create_task(flights.ado("k", fetch))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.create_task(flights.ado("k", fetch)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await asyncio.gather(*followers) == ["resposta"] * 3
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert calls == 1
+        assert flights.stats() == {"leaders": 1, "coalesced": 3}
+        assert not flights._async_calls
+
+    asyncio.run(scenario())
+
+
+def test_async_follower_cancelled_leader_unaffected():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return 42
+
+        leader = asyncio.create_task(flights.ado("k", fetch))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(flights.ado("k", fetch))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+
+        assert await leader == 42
+
+    asyncio.run(scenario())
+
+
+def test_async_error_is_shared():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            raise ValueError("upstream")
+
+        results = await asyncio.gather(flights.ado("k", fetch), flights.ado("k", fetch), return_exceptions=True)
+        assert [type(r) for r in results] == [ValueError, ValueError]
+
+    asyncio.run(scenario())
+
+
+def test_async_follower_timeout():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.2)
+            return "ok"
+
+        leader = asyncio.create_task(flights.ado("k", fetch))
+        await asyncio.sleep(0.01)
+        with pytest.raises(DeadlineExceeded):
+            await flights.ado("k", fetch, timeout=0.02)
+        assert await leader == "ok"
+
+    asyncio.run(scenario())
+
+
+def test_sync_follower_timeout():
+    flights = SingleFlight()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.2)
+        return "ok"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("k", slow)))
+    leader.start()
+    started.wait()
+
+    begin = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        flights.do("k", slow, timeout=0.02)
+    assert time.monotonic() - begin < 0.15
+
+    leader.join()
+    assert results == ["ok"]
+
+
+def test_sync_followers_share_result():
+    flights = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait()
+        return "ok"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do("k", fetch))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while flights.stats()["leaders"] + flights.stats()["coalesced"] < 4:
+        time.sleep(0.005)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["ok"] * 4
+    assert len(calls) == 1